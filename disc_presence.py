@@ -77,6 +77,10 @@ class Presence:
          except Exception as e:
             logger.warning(f'Failed to send update to API: {e}')
 
+   def next_update_at(self) -> float:
+      # Discord only takes an update every 15 seconds
+      return self._last_updated + 15
+
    def __check_changed(self) -> None:
       time_now = time.time()
       if (time_now - self._last_updated) >= 15:
@@ -1,13 +1,21 @@
 import time
+import asyncio
 import typing as t
 import logging
 
 logger = logging.getLogger(__name__)
 
 from ..presence import BasePresence
+from .capture_worker import CaptureWorker
+from .reading_filter import FilteredResult, ReadingFilter
+from .round_clock import RoundClock
+from .scheduler import CaptureScheduler, default_cpu_budget
 
 from riot_client.exceptions import PhaseError
 
+# seconds between presence updates while the top bar is being read
+presence_update_interval = 3
+
 class IngamePresence(BasePresence):
    def __init__(self, vrpc_client) -> None:
       self.vrpc_client = vrpc_client
@@ -15,15 +23,19 @@ class IngamePresence(BasePresence):
       self.match_details_last_fetched = time.time()
       self.match_info = {}
       self.started = None
+      # tells the capture worker when the round timer has to be read
+      self.round_clock = RoundClock()
+      # smooths the readings over time and holds back implausible ones
+      self.reading_filter = ReadingFilter()
 
-   def start_with_event_data(self, event_data: dict) -> None:
+   async def start_with_event_data(self, event_data: dict) -> None:
       match_id = super()._get_match_id_from_chat_event(event_data, 'ingame')
       if match_id:
-         self.start_with_match_id(match_id)
+         await self.start_with_match_id(match_id)
 
-   def start_with_match_id(self, match_id: str = None) -> None:
+   async def start_with_match_id(self, match_id: str = None) -> None:
       try:
-         match_details = self.vrpc_client.riot_client.coregame_fetch_match(match_id)
+         match_details = await self.vrpc_client.async_riot_client.coregame_fetch_match(match_id)
       except PhaseError:
          return
 
@@ -34,9 +46,9 @@ class IngamePresence(BasePresence):
       logger.info('CONTINUING CORE MATCH %s', match_id)
 
       _, mode = self.vrpc_client.assets_manager.get_mode_from_url(match_details['ModeID'])
-      self.__loop(match_details['MatchID'], mode['name'])
+      await self.__loop(match_details['MatchID'], mode['name'])
 
-   def update_standard_presence(self, results: t.Tuple[t.Tuple[int, int], t.Tuple[int, int], str]) -> None:
+   async def update_standard_presence(self, results: t.Tuple[t.Tuple[int, int], t.Tuple[int, int], str]) -> None:
       scores, times, state = results
       b_score, r_score = scores
       start, end = times
@@ -52,7 +64,7 @@ class IngamePresence(BasePresence):
       elif state == 'spike planted':
          state = 'Spike Planted'
 
-      party_info = self.get_party_info()
+      party_info = await self.get_party_info()
 
       status['details'] = f'Playing {self.match_info["provisioning"]}{self.match_info["game_type"]} | {self.match_info["agent"]["name"]} | {self.match_info["map"]["name"]}'
       status['state'] = f'{b_score} - {r_score} | {state} | In Party'
@@ -73,14 +85,14 @@ class IngamePresence(BasePresence):
          status['start'] = start
          status['end'] = end
 
-      self.vrpc_client.presence.update(status)
+      await self._update_presence(status)
 
-   def __get_match_info(self, initial_match_id: str) -> t.Tuple[bool, bool]:
+   async def __get_match_info(self, initial_match_id: str) -> t.Tuple[bool, bool]:
       if (self.match_info == {}) or (time.time() - self.match_details_last_fetched) > 30:
          self.match_details_last_fetched = time.time()
 
          try:
-            match_details = self.vrpc_client.riot_client.coregame_fetch_match()
+            match_details = await self.vrpc_client.async_riot_client.coregame_fetch_match()
          except PhaseError:
             return False, False
 
@@ -93,7 +105,7 @@ class IngamePresence(BasePresence):
 
             local_player = None
             for player in match_details['Players']:
-               if player['Subject'] == self.vrpc_client.riot_client.puuid:
+               if player['Subject'] == self.vrpc_client.async_riot_client.puuid:
                   local_player = player
                   break
 
@@ -114,54 +126,67 @@ class IngamePresence(BasePresence):
       else:
          return False, True
 
-   def __loop(self, match_id: str, match_mode: str) -> None:
+   async def __loop(self, match_id: str, match_mode: str) -> None:
       if match_mode == 'Standard' or match_mode == 'Swiftplay':
-         while True:
-            time.sleep(3)
-            print_screen = self.vrpc_client.screen_reader.capture_screen()
-            if self.vrpc_client.score_reader.debug:
-               self.vrpc_client.screen_reader.display_screen(print_screen)
-
-            results = self.vrpc_client.screen_reader.score_reader.record_frame(print_screen)
-            logger.debug(results)
-            scores, timer, state = results
-
-            match_refreshed, match_active = self.__get_match_info(match_id)
-
-            if not match_active:
-               break
-
-            if state is None: # Assuming everything else is none in results :p
-               continue
-
-            b_score, r_score = scores
-            round_no = b_score + r_score
-            secs = self.__mins_secs_ms_to_secs(*timer)
-
-            if secs < 13: # we need time for discord rpc to be updated
-               continue
-
-            start, end = self.__get_start_end_from_state(secs, state, round_no, self.match_info['mode'])
+         # the top bar is read on its own thread, match info is fetched while
+         # a frame is being read
+         self.round_clock.reset()
+         self.reading_filter.reset()
+         scheduler = CaptureScheduler(
+            self.round_clock,
+            self.vrpc_client.presence.next_update_at,
+            default_cpu_budget()
+         )
+         worker = CaptureWorker(
+            self.vrpc_client.screen_reader,
+            read_timer=self.round_clock.needs_timer,
+            scheduler=scheduler
+         )
+         worker.start()
+         loop = asyncio.get_running_loop()
+         last_captured_at = 0
+         try:
+            while True:
+               cycle_start = time.monotonic()
+               match_refreshed, match_active = await self.__get_match_info(match_id)
 
-            self.start = start
+               if not match_active:
+                  break
 
-            self.update_standard_presence(((b_score, r_score), (start, end), state))
+               # the worker is waited on off the loop
+               reading = await loop.run_in_executor(None, worker.wait_for_result, last_captured_at, presence_update_interval)
+               if reading is not None:
+                  # every reading goes through the clock so no phase change
+                  # is missed, only the newest one is shown
+                  readings = worker.results(last_captured_at)
+                  filtered = [self.reading_filter.update(reading) for reading in readings]
+                  for older in filtered[:-1]:
+                     self.__observe_round_clock(older)
+                  last_captured_at = readings[-1].captured_at
+                  await self.__update_from_reading(filtered[-1])
+
+               await asyncio.sleep(max(presence_update_interval - (time.monotonic() - cycle_start), 0))
+         finally:
+            await loop.run_in_executor(None, worker.stop)
+            logger.info(f'Top bar capture: {scheduler.stats()}')
+            logger.info(f'OCR cache: {self.vrpc_client.score_reader.ocr_cache.stats()}')
+            logger.info(f'Reading filter: {self.reading_filter.stats()}')
 
       elif match_mode == 'Deathmatch':
          while True:
-            match_refreshed, match_active = self.__get_match_info(match_id)
+            match_refreshed, match_active = await self.__get_match_info(match_id)
 
             if not match_active:
                break
 
             if match_refreshed:
                try:
-                  presence_data = self.vrpc_client.riot_client.fetch_presence()
+                  presence_data = await self.vrpc_client.async_riot_client.fetch_presence()
                except:
                   break
 
                if presence_data:
-                  party_info = self.get_party_info(presence_data)
+                  party_info = await self.get_party_info(presence_data)
                   my_score = presence_data['partyOwnerMatchScoreAllyTeam']
                   opponent_score = presence_data['partyOwnerMatchScoreEnemyTeam']
 
@@ -178,16 +203,16 @@ class IngamePresence(BasePresence):
                   status['party_size'] = party_info
                   status['start'], _ = self.__get_start_end_from_state(0, None, 0, match_mode)
 
-                  self.vrpc_client.presence.update(status)
+                  await self._update_presence(status)
       else:
          while True:
-            match_refreshed, match_active = self.__get_match_info(match_id)
+            match_refreshed, match_active = await self.__get_match_info(match_id)
 
             if not match_active:
                break
 
             if match_refreshed:
-               party_info = self.get_party_info()
+               party_info = await self.get_party_info()
 
                status = {}
                if self.match_info["map"]["name"] == 'The Range':
@@ -202,15 +227,46 @@ class IngamePresence(BasePresence):
                status['party_size'] = party_info
                status['start'], _ = self.__get_start_end_from_state(0, None, 0, match_mode)
 
-               self.vrpc_client.presence.update(status)
+               await self._update_presence(status)
+
+   def __observe_round_clock(self, reading: FilteredResult) -> t.Optional[float]:
+      scores, timer, state = reading.results
+      round_no = None if state is None else sum(scores)
+      secs = self.__mins_secs_ms_to_secs(*timer) if reading.timer_read and state is not None else None
+      return self.round_clock.observe(reading.captured_at, state, round_no, secs)
+
+   async def __update_from_reading(self, reading: FilteredResult) -> None:
+      scores, timer, state = reading.results
+      # seconds left as the round clock has them, re-read from the screen only
+      # on phase changes and drift checks
+      secs = self.__observe_round_clock(reading)
+
+      if state is None: # Assuming everything else is none in results :p
+         return
+      if not reading.stable: # state held back or bridged, keep what is shown
+         return
+      if secs is None: # the next frame reads the timer
+         return
+
+      b_score, r_score = scores
+      round_no = b_score + r_score
+
+      if secs < 13: # we need time for discord rpc to be updated
+         return
+
+      # the timer showed secs when the frame was taken, not now
+      start, end = self.__get_start_end_from_state(secs, state, round_no, self.match_info['mode'], reading.captured_at)
+
+      self.start = start
+
+      await self.update_standard_presence(((b_score, r_score), (start, end), state))
 
-   def __get_start_end_from_state(self, secs: int, state: str, round_no: int, match_mode: str) -> t.Tuple[int, int]:
+   def __get_start_end_from_state(self, secs: int, state: str, round_no: int, match_mode: str, time_now: float = None) -> t.Tuple[int, int]:
       def get_start_end(total_length = None):
          if total_length:
-            time_now = int(time.time())
-            elapsed = total_length - secs
+            start = int((time_now or time.time()) - (total_length - secs))
             
-            return time_now - int(elapsed), time_now - int(elapsed) + total_length
+            return start, start + total_length
          else:
             if not self.started:
                self.started = time.time()
@@ -0,0 +1,221 @@
+# Runs TopBarReader over labeled top bar captures and reports how often each
+# field is read correctly and how long every stage of the reader takes.
+#
+#    python -m presences.ingame.benchmark --captures captures --output bench.json
+#
+# Labels come from captures/labels.json, the same file train_glyphs reads.
+# The bundled glyph atlas is built from those same captures, so by default
+# every capture is read with an atlas rebuilt from the other captures only
+# (leave-one-capture-out) and the accuracy is that of frames the atlas has
+# not seen. --in-sample reads with --atlas as it is.
+# Every capture is read --repeat times; the change gate and the OCR cache are
+# cleared between reads unless --gate is passed, so the timings are those of
+# a frame never seen before.
+# Stage timings come from the same StageProfiler VALORPC_PROFILE turns on.
+
+import os
+import sys
+import json
+import platform
+import argparse
+import typing as t
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+from PIL import Image
+
+from . import glyphs
+from .frame import Frame
+from .profiling import StageProfiler
+from .reader_util import TopBarReader, score_regions, timer_regions
+from .train_glyphs import load_capture_samples
+
+FIELDS = ('scores', 'timer', 'state')
+STAGES = ('crop', 'binarize', 'morphology', 'ocr', 'classify', 'frame')
+
+def expected_timer(timer: t.Optional[str]) -> t.Tuple[t.Optional[int], t.Optional[int], t.Optional[int]]:
+   # labels hold the timer as shown, '1:30' or '9.45', readings are (m, s, ms)
+   if not timer:
+      return None, None, None
+   if ':' in timer:
+      mins, secs = timer.split(':')
+      return int(mins), int(secs), 0
+   secs, ms = timer.split('.')
+   return 0, int(secs), int(ms)
+
+def expected_readings(label: dict) -> dict:
+   scores = label.get('scores')
+   return {
+      'scores': tuple(scores) if scores else (None, None),
+      'timer': expected_timer(label.get('timer')),
+      'state': label.get('state'),
+   }
+
+def read_fields(reader: TopBarReader, frame: Frame) -> t.Tuple[dict, dict]:
+   # Each field is read on its own instead of through record_frame, which
+   # drops the state whenever the timer is hidden (spike planted), so every
+   # label is checked. Errors, e.g. a missing tesseract, count as misreads.
+   # The score and timer masks are made in one pass, as record_frame does.
+   masks = reader.hud_masks(frame, score_regions + timer_regions)
+   readers = {
+      'scores': lambda frame: reader.get_scores(frame, tuple(masks[name] for name in score_regions)),
+      'timer': lambda frame: reader.get_timer(frame, tuple(masks[name] for name in timer_regions)),
+      'state': reader.get_match_status,
+   }
+   readings = {}
+   errors = {}
+   for field, read in readers.items():
+      try:
+         readings[field] = read(frame)
+      except Exception as e:
+         readings[field] = None
+         errors[field] = f'{type(e).__name__}: {e}'
+   return readings, errors
+
+def holdout_classifiers(reader: TopBarReader, captures_path: str, labels_path: str, labels: dict) -> t.Dict[str, glyphs.GlyphClassifier]:
+   # per capture, a classifier whose atlas holds the glyphs of every other
+   # labeled capture and none of its own
+   by_capture = {}
+   for source, mask, text in load_capture_samples(reader, captures_path, labels_path):
+      pairs = glyphs.sample_glyphs(mask, text)
+      if pairs:
+         by_capture.setdefault(source.rsplit(':', 1)[0], []).extend(pairs)
+
+   min_confidence = reader.glyph_classifier.min_confidence
+   classifiers = {}
+   for name in labels:
+      others = [glyph for other, pairs in by_capture.items() if other != name for glyph in pairs]
+      if others:
+         classifiers[name] = glyphs.GlyphClassifier(glyphs.GlyphAtlas.from_glyphs(others), min_confidence)
+   return classifiers
+
+def run(
+   reader: TopBarReader,
+   captures_path: str,
+   labels: dict,
+   repeat: int,
+   gate: bool,
+   classifiers: t.Dict[str, glyphs.GlyphClassifier] = None
+) -> dict:
+   # classifiers, when given, replace the reader's for their capture
+   captures = []
+   full_classifier = reader.glyph_classifier
+   # one sample per frame and stage; stages a frame skipped (e.g. ocr behind
+   # the change gate) have fewer samples than there are frames
+   profiler = StageProfiler(window=len(labels)*repeat)
+   reader.profiler = profiler
+   correct = {field: 0 for field in FIELDS}
+   skipped = []
+
+   for name, label in labels.items():
+      try:
+         frame = Frame(Image.open(os.path.join(captures_path, name)).convert('RGB'))
+      except Exception as e:
+         logger.warning(f'Skipping capture {name}: {e}')
+         skipped.append(name)
+         continue
+
+      expected = expected_readings(label)
+      if classifiers is not None:
+         reader.glyph_classifier = classifiers.get(name)
+         # readings cached under another capture's atlas may have seen this one
+         reader.ocr_cache.clear()
+      for i in range(repeat):
+         if not gate:
+            reader.change_gate.invalidate()
+            reader.ocr_cache.clear()
+         with profiler.frame():
+            readings, errors = read_fields(reader, frame)
+
+      matches = {field: readings[field] == expected[field] for field in FIELDS}
+      for field, match in matches.items():
+         correct[field] += match
+      captures.append({
+         'capture': name,
+         'expected': expected,
+         'read': readings,
+         'correct': matches,
+         'errors': errors,
+      })
+
+   reader.profiler = None
+   reader.glyph_classifier = full_classifier
+   read_count = len(captures)
+   return {
+      'evaluation': 'in-sample' if classifiers is None else 'leave-one-capture-out',
+      'accuracy': {field: correct[field]/read_count if read_count else None for field in FIELDS},
+      'frames': read_count*repeat,
+      'bucket_edges_ms': list(profiler.bucket_edges),
+      'stages': profiler.summary(),
+      'ocr_cache': reader.ocr_cache.stats(),
+      'captures': captures,
+      'skipped': skipped,
+   }
+
+def print_report(report: dict) -> None:
+   results = report['results']
+   for capture in results['captures']:
+      wrong = [field for field in FIELDS if not capture['correct'][field]]
+      for field in wrong:
+         error = capture['errors'].get(field)
+         detail = error or f'read {capture["read"][field]}, expected {capture["expected"][field]}'
+         print(f'{capture["capture"]}: {field} {detail}')
+   for name in results['skipped']:
+      print(f'skipped {name}: unreadable')
+
+   print(f'{results["evaluation"]}: ' + ' '.join(f'{field} {accuracy:.1%}' for field, accuracy in results['accuracy'].items() if accuracy is not None))
+   print(f'{"stage":<12}{"p50 ms":>10}{"p95 ms":>10}')
+   for stage in STAGES:
+      stat = results['stages'].get(stage)
+      if stat:
+         print(f'{stage:<12}{stat["p50_ms"]:>10.3f}{stat["p95_ms"]:>10.3f}')
+
+def main(argv: t.List[str] = None) -> int:
+   parser = argparse.ArgumentParser(description='Benchmark TopBarReader accuracy and per-stage speed on labeled captures.')
+   parser.add_argument('--captures', default='captures', help='folder of top bar captures')
+   parser.add_argument('--labels', help='labels for the captures, defaults to <captures>/labels.json')
+   parser.add_argument('--atlas', default=glyphs.default_atlas_path, help='glyph atlas to read digits with')
+   parser.add_argument('--no-atlas', action='store_true', help='read digits with tesseract only')
+   parser.add_argument('--tesseract', default='tesseract', help='tesseract executable for low confidence reads')
+   parser.add_argument('--repeat', type=int, default=20, help='reads per capture')
+   parser.add_argument('--gate', action='store_true', help='keep the change gate and OCR cache between reads')
+   parser.add_argument('--in-sample', action='store_true', help='read every capture with --atlas, even though it was built from these captures')
+   parser.add_argument('--output', help='also write the results as JSON')
+   args = parser.parse_args(argv)
+
+   logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+
+   labels_path = args.labels or os.path.join(args.captures, 'labels.json')
+   with open(labels_path, mode='r') as f:
+      labels = json.load(f)
+
+   reader = TopBarReader(False, False, args.tesseract, glyph_atlas_path=None if args.no_atlas else args.atlas)
+   classifiers = None
+   if reader.glyph_classifier is not None and not args.in_sample:
+      classifiers = holdout_classifiers(reader, args.captures, labels_path, labels)
+   report = {
+      'created': datetime.now().isoformat(timespec='seconds'),
+      'machine': {'python': platform.python_version(), 'platform': platform.platform()},
+      'config': {
+         'captures': os.path.abspath(args.captures),
+         'labels': os.path.abspath(labels_path),
+         'atlas': None if reader.glyph_classifier is None else os.path.abspath(args.atlas),
+         'repeat': args.repeat,
+         'gate': args.gate,
+         'in_sample': classifiers is None and reader.glyph_classifier is not None,
+      },
+      'results': run(reader, args.captures, labels, max(args.repeat, 1), args.gate, classifiers),
+   }
+   print_report(report)
+
+   if args.output:
+      with open(args.output, mode='w') as f:
+         json.dump(report, f, indent=4)
+      logger.info(f'Wrote benchmark results to {args.output}')
+
+   return 0
+
+if __name__ == '__main__':
+   sys.exit(main())
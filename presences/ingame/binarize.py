@@ -0,0 +1,38 @@
+import typing as t
+
+import cv2
+import numpy as np
+
+# Masks are single channel uint8 arrays in the same black-on-white layout the
+# old per-pixel loops produced, so they can go straight into cv2 morphology and
+# pytesseract.
+INK = 0
+PAPER = 255
+
+def white_mask(pixels: np.ndarray, min_threshold: int = 255, out: t.Optional[np.ndarray] = None, totals: t.Optional[np.ndarray] = None) -> np.ndarray:
+   # a pixel is ink when the mean of all its channels reaches min_threshold,
+   # compared as sum >= 3*threshold to stay in integers
+   if min_threshold == 255 and pixels.shape[2] == 3:
+      # only saturated pixels reach it, a range check is several times faster
+      # than summing the channels. Not with alpha: the sum counts it too, so
+      # a pixel need not be saturated to reach 3*255.
+      white = (255, 255, 255)
+      out = cv2.inRange(pixels, white, white, dst=out)
+      return cv2.bitwise_not(out, dst=out)
+
+   totals = np.sum(pixels, axis=2, dtype=np.uint16, out=totals)
+   if out is None:
+      out = np.empty(totals.shape, np.uint8)
+   np.less(totals, min_threshold*3, out=out.view(bool))
+   return np.multiply(out, PAPER, out=out)
+
+def red_mask(pixels: np.ndarray, out: t.Optional[np.ndarray] = None) -> np.ndarray:
+   # pure red is R > 253, G < 3, B < 3; any alpha channel is left unchecked
+   channels = pixels.shape[2]
+   lower = (254, 0, 0, 0)[:channels]
+   upper = (255, 2, 2, 255)[:channels]
+   out = cv2.inRange(pixels, lower, upper, dst=out)
+   return cv2.bitwise_not(out, dst=out)
+
+def is_blank(mask: np.ndarray) -> bool:
+   return mask.min() == PAPER
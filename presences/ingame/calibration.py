@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import ctypes
+import ctypes.util
+import typing as t
+import logging
+
+logger = logging.getLogger(__name__)
+
+from PIL import ImageGrab
+
+from .frame import FrameBuffers, Region, Box
+from .signatures import PixelSignatures
+
+# Bump whenever the profile layout or the anchor maths change so profiles
+# written by older versions are rebuilt.
+CALIBRATION_VERSION = 1
+HUD_ASPECT = 16/9 # the HUD is laid out for 16:9 and scales with the height
+fallback_screen_size = (1920, 1080)
+
+def detect_screen_size() -> t.Tuple[int, int]:
+   # asks the OS instead of grabbing the whole screen, ImageGrab is the last
+   # resort
+   if sys.platform == 'win32':
+      user32 = ctypes.windll.user32
+      return user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)
+
+   x11_path = ctypes.util.find_library('X11')
+   if x11_path and os.getenv('DISPLAY'):
+      x11 = ctypes.CDLL(x11_path)
+      x11.XOpenDisplay.restype = ctypes.c_void_p
+      x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+      x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+      x11.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+      x11.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+      x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+      display = x11.XOpenDisplay(None)
+      if display:
+         screen = x11.XDefaultScreen(display)
+         size = x11.XDisplayWidth(display, screen), x11.XDisplayHeight(display, screen)
+         x11.XCloseDisplay(display)
+         return size
+
+   try:
+      return ImageGrab.grab().size
+   except Exception:
+      return fallback_screen_size
+
+def hud_capture_box(screen_size: t.Tuple[int, int]) -> Box:
+   # The top bar sits centered at the top of a 16:9 HUD area, which fills the
+   # height on wider screens and the width on narrower ones. Its capture is
+   # 0.2 x 0.15 of that width, so the reader's crop fractions hold on every
+   # resolution.
+   width, height = screen_size
+   hud_width = min(width, height*HUD_ASPECT)
+   x0 = round((width - hud_width*0.2)/2)
+   return x0, 0, x0 + round(hud_width*0.2), round(hud_width*0.15)
+
+class CalibrationProfile():
+   # Everything the reader works out per resolution: the capture box, the
+   # integer box of every crop region, the pixels it samples and the flat
+   # probe indices of its pixel signatures.
+   def __init__(
+      self,
+      screen_size: t.Tuple[int, int],
+      capture_box: Box,
+      boxes: t.Dict[Region, Box],
+      pixels: t.Dict[t.Tuple[float, float], t.Tuple[int, int]],
+      probes: t.List[dict],
+      version: int = CALIBRATION_VERSION
+   ) -> None:
+      self.screen_size = tuple(screen_size)
+      self.capture_box = tuple(capture_box)
+      self.boxes = boxes
+      self.pixels = pixels
+      # [{'region', 'shape', 'digest', 'indices'}], one per signature table
+      self.probes = probes
+      self.version = version
+
+   @property
+   def capture_size(self) -> t.Tuple[int, int]:
+      x0, y0, x1, y1 = self.capture_box
+      return x1 - x0, y1 - y0
+
+   @classmethod
+   def build(
+      cls,
+      screen_size: t.Tuple[int, int],
+      regions: t.Sequence[Region],
+      pixels: t.Sequence[t.Tuple[float, float]],
+      signatures: t.Sequence[t.Tuple[Region, PixelSignatures]]
+   ) -> 'CalibrationProfile':
+      capture_box = hud_capture_box(screen_size)
+      x0, y0, x1, y1 = capture_box
+      width, height = x1 - x0, y1 - y0
+
+      boxes = {}
+      for region in set(regions) | set(region for region, _ in signatures):
+         boxes[region] = (
+            round(width*region[0]), round(height*region[1]),
+            round(width*region[2]), round(height*region[3])
+         )
+
+      probes = []
+      for region, table in signatures:
+         bx0, by0, bx1, by1 = boxes[region]
+         shape = (by1 - by0, bx1 - bx0)
+         probes.append({'region': region, 'shape': shape, 'digest': table.digest(), 'indices': table.compile(shape)})
+
+      return cls(
+         screen_size,
+         capture_box,
+         boxes,
+         {position: (round(width*position[0]), round(height*position[1])) for position in pixels},
+         probes
+      )
+
+   @classmethod
+   def load(cls, path: str) -> 'CalibrationProfile':
+      with open(path, mode='r') as f:
+         data = json.load(f)
+
+      if data['version'] != CALIBRATION_VERSION:
+         raise ValueError(f'Calibration profile {path} is version {data["version"]}, expected {CALIBRATION_VERSION}')
+      return cls(
+         data['screen_size'],
+         data['capture_box'],
+         {tuple(entry['region']): tuple(entry['box']) for entry in data['boxes']},
+         {tuple(entry['position']): tuple(entry['pixel']) for entry in data['pixels']},
+         [dict(probe, region=tuple(probe['region']), shape=tuple(probe['shape'])) for probe in data['probes']],
+         data['version']
+      )
+
+   def save(self, path: str) -> None:
+      os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+      with open(path, mode='w') as f:
+         json.dump({
+            'version': self.version,
+            'screen_size': self.screen_size,
+            'capture_box': self.capture_box,
+            'boxes': [{'region': region, 'box': box} for region, box in self.boxes.items()],
+            'pixels': [{'position': position, 'pixel': pixel} for position, pixel in self.pixels.items()],
+            'probes': self.probes,
+         }, f, indent=4)
+
+   def matches(
+      self,
+      regions: t.Sequence[Region],
+      pixels: t.Sequence[t.Tuple[float, float]],
+      signatures: t.Sequence[t.Tuple[Region, PixelSignatures]]
+   ) -> bool:
+      # whether this profile still covers what the reader crops and samples
+      return (
+         all(region in self.boxes for region in regions)
+         and all(position in self.pixels for position in pixels)
+         and [(probe['region'], probe['digest']) for probe in self.probes] == [(region, table.digest()) for region, table in signatures]
+      )
+
+   def apply(self, signatures: t.Sequence[t.Tuple[Region, PixelSignatures]], buffers: FrameBuffers) -> None:
+      # the boxes and pixels go to the buffers of the reader using them
+      buffers.preload(self.capture_size, self.boxes, self.pixels)
+      for probe, (_, table) in zip(self.probes, signatures):
+         table.preload(probe['shape'], probe['indices'])
+
+def load_profile(
+   directory: t.Optional[str],
+   regions: t.Sequence[Region],
+   pixels: t.Sequence[t.Tuple[float, float]],
+   signatures: t.Sequence[t.Tuple[Region, PixelSignatures]],
+   screen_size: t.Tuple[int, int] = None
+) -> CalibrationProfile:
+   # The profile for the current resolution from <directory>/<w>x<h>.json,
+   # built and saved there when it is missing or stale. Without a directory
+   # the profile is only kept in memory. apply() hands it to a reader.
+   screen_size = tuple(screen_size or detect_screen_size())
+   path = os.path.join(directory, f'{screen_size[0]}x{screen_size[1]}.json') if directory else None
+
+   profile = None
+   if path and os.path.exists(path):
+      try:
+         profile = CalibrationProfile.load(path)
+         if not profile.matches(regions, pixels, signatures):
+            logger.info(f'Calibration profile {path} is out of date, rebuilding')
+            profile = None
+      except Exception as e:
+         logger.warning(f'Unable to load calibration profile {path}: {e}')
+         profile = None
+
+   if profile is None:
+      profile = CalibrationProfile.build(screen_size, regions, pixels, signatures)
+      if path:
+         try:
+            profile.save(path)
+         except OSError as e:
+            logger.warning(f'Unable to save calibration profile {path}: {e}')
+
+   logger.info(f'Calibrated for {screen_size[0]}x{screen_size[1]}, capturing {profile.capture_box}')
+   return profile
@@ -0,0 +1,308 @@
+import os
+import sys
+import abc
+import glob
+import math
+import time
+import ctypes
+import ctypes.util
+import typing as t
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+import cv2
+import numpy as np
+from PIL import Image, ImageGrab
+
+Box = t.Tuple[int, int, int, int]
+Region = t.Tuple[float, float, float, float]
+
+class CaptureError(Exception):
+   '''
+      Raised whenever a capture backend is unable to produce a frame.
+   '''
+   pass
+
+class CaptureBackend(abc.ABC):
+   # Backends return RGB uint8 arrays of the requested screen box. Every grab
+   # is timed so backends can be compared on the machine they run on.
+   # Subclasses implement _grab, one missing it fails when it is created.
+   name = 'base'
+
+   def __init__(self) -> None:
+      self.latencies = deque(maxlen=256)
+
+   def grab(self, bbox: Box) -> np.ndarray:
+      start = time.perf_counter()
+      pixels = self._grab(bbox)
+      self.latencies.append(time.perf_counter() - start)
+      return pixels
+
+   def latency_stats(self) -> t.Dict[str, float]:
+      if not self.latencies:
+         return {'count': 0}
+
+      latencies = np.array(self.latencies)*1000
+      return {
+         'count': len(latencies),
+         'mean_ms': float(latencies.mean()),
+         'p50_ms': float(np.percentile(latencies, 50)),
+         'p95_ms': float(np.percentile(latencies, 95)),
+         'max_ms': float(latencies.max()),
+      }
+
+   def close(self) -> None:
+      pass
+
+   @abc.abstractmethod
+   def _grab(self, bbox: Box) -> np.ndarray:
+      ...
+
+class ImageGrabBackend(CaptureBackend):
+   name = 'imagegrab'
+
+   def _grab(self, bbox: Box) -> np.ndarray:
+      return np.asarray(ImageGrab.grab(bbox=bbox).convert('RGB'))
+
+# Xlib structures used by the MIT-SHM backend
+class _XImage(ctypes.Structure):
+   _fields_ = [
+      ('width', ctypes.c_int),
+      ('height', ctypes.c_int),
+      ('xoffset', ctypes.c_int),
+      ('format', ctypes.c_int),
+      ('data', ctypes.c_void_p),
+      ('byte_order', ctypes.c_int),
+      ('bitmap_unit', ctypes.c_int),
+      ('bitmap_bit_order', ctypes.c_int),
+      ('bitmap_pad', ctypes.c_int),
+      ('depth', ctypes.c_int),
+      ('bytes_per_line', ctypes.c_int),
+      ('bits_per_pixel', ctypes.c_int),
+      ('red_mask', ctypes.c_ulong),
+      ('green_mask', ctypes.c_ulong),
+      ('blue_mask', ctypes.c_ulong),
+   ]
+
+class _XShmSegmentInfo(ctypes.Structure):
+   _fields_ = [
+      ('shmseg', ctypes.c_ulong),
+      ('shmid', ctypes.c_int),
+      ('shmaddr', ctypes.c_void_p),
+      ('readOnly', ctypes.c_int),
+   ]
+
+_Z_PIXMAP = 2
+_ALL_PLANES = 0xFFFFFFFF
+_IPC_PRIVATE = 0
+_IPC_CREAT = 0o1000
+_IPC_RMID = 0
+
+class XShmBackend(CaptureBackend):
+   # X11 capture through the MIT shared memory extension: the server copies
+   # the screen straight into a segment mapped in this process instead of
+   # sending it over the socket. One XImage per box size is kept attached.
+   name = 'xshm'
+
+   def __init__(self, display: str = None) -> None:
+      super().__init__()
+      x11_path = ctypes.util.find_library('X11')
+      xext_path = ctypes.util.find_library('Xext')
+      if not x11_path or not xext_path:
+         raise CaptureError('libX11/libXext not found')
+
+      self.x11 = ctypes.CDLL(x11_path)
+      self.xext = ctypes.CDLL(xext_path)
+      self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+      self.x11.XOpenDisplay.restype = ctypes.c_void_p
+      self.x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+      self.x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+      self.x11.XDefaultRootWindow.restype = ctypes.c_ulong
+      self.x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+      self.x11.XDefaultVisual.restype = ctypes.c_void_p
+      self.x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+      self.x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+      self.x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+      self.x11.XFree.argtypes = [ctypes.c_void_p]
+      self.x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+      self.xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+      self.xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+      self.xext.XShmCreateImage.argtypes = [
+         ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_char_p,
+         ctypes.POINTER(_XShmSegmentInfo), ctypes.c_uint, ctypes.c_uint
+      ]
+      self.xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+      self.xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+      self.xext.XShmGetImage.argtypes = [
+         ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XImage), ctypes.c_int, ctypes.c_int, ctypes.c_ulong
+      ]
+      self.libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+      self.libc.shmat.restype = ctypes.c_void_p
+      self.libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+      self.libc.shmdt.argtypes = [ctypes.c_void_p]
+      self.libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+      self.display = self.x11.XOpenDisplay(display.encode() if display else None)
+      if not self.display:
+         raise CaptureError('Unable to open X display')
+      if not self.xext.XShmQueryExtension(self.display):
+         self.x11.XCloseDisplay(self.display)
+         raise CaptureError('X server has no MIT-SHM extension')
+
+      screen = self.x11.XDefaultScreen(self.display)
+      self.root = self.x11.XDefaultRootWindow(self.display)
+      self.visual = self.x11.XDefaultVisual(self.display, screen)
+      self.depth = self.x11.XDefaultDepth(self.display, screen)
+      self._images = {}
+
+   def _grab(self, bbox: Box) -> np.ndarray:
+      x0, y0, x1, y1 = bbox
+      image, _ = self._image(x1 - x0, y1 - y0)
+      if not self.xext.XShmGetImage(self.display, self.root, image, x0, y0, _ALL_PLANES):
+         raise CaptureError(f'XShmGetImage failed for {bbox}')
+
+      contents = image.contents
+      if contents.bits_per_pixel != 32:
+         raise CaptureError(f'Unsupported {contents.bits_per_pixel} bpp X visual')
+
+      size = contents.bytes_per_line*contents.height
+      buffer = (ctypes.c_ubyte*size).from_address(contents.data)
+      bgrx = np.frombuffer(buffer, np.uint8).reshape(contents.height, contents.bytes_per_line//4, 4)
+      # the copy out of the segment also drops the padding byte
+      return cv2.cvtColor(bgrx[:, :contents.width], cv2.COLOR_BGRA2RGB)
+
+   def _image(self, width: int, height: int) -> t.Tuple[t.Any, _XShmSegmentInfo]:
+      entry = self._images.get((width, height))
+      if entry is not None:
+         return entry
+
+      shminfo = _XShmSegmentInfo()
+      image = self.xext.XShmCreateImage(self.display, self.visual, self.depth, _Z_PIXMAP, None, ctypes.byref(shminfo), width, height)
+      if not image:
+         raise CaptureError('XShmCreateImage failed')
+
+      shminfo.shmid = self.libc.shmget(_IPC_PRIVATE, image.contents.bytes_per_line*height, _IPC_CREAT | 0o600)
+      if shminfo.shmid < 0:
+         self.x11.XFree(image)
+         raise CaptureError(f'shmget failed: {os.strerror(ctypes.get_errno())}')
+      shminfo.shmaddr = self.libc.shmat(shminfo.shmid, None, 0)
+      if shminfo.shmaddr in (None, ctypes.c_void_p(-1).value):
+         self.libc.shmctl(shminfo.shmid, _IPC_RMID, None)
+         self.x11.XFree(image)
+         raise CaptureError(f'shmat failed: {os.strerror(ctypes.get_errno())}')
+      shminfo.readOnly = 0
+      image.contents.data = shminfo.shmaddr
+
+      self.xext.XShmAttach(self.display, ctypes.byref(shminfo))
+      self.x11.XSync(self.display, 0)
+      # the segment goes away by itself once both sides have detached
+      self.libc.shmctl(shminfo.shmid, _IPC_RMID, None)
+
+      self._images[(width, height)] = (image, shminfo)
+      return image, shminfo
+
+   def close(self) -> None:
+      for image, shminfo in self._images.values():
+         self.xext.XShmDetach(self.display, ctypes.byref(shminfo))
+         self.libc.shmdt(shminfo.shmaddr)
+         image.contents.data = None
+         self.x11.XFree(image)
+      self._images.clear()
+      if self.display:
+         self.x11.XCloseDisplay(self.display)
+         self.display = None
+
+class RegionBackend(CaptureBackend):
+   # Grabs only the given regions of the box (fractions, like the reader's
+   # crop regions) through another backend and leaves the rest of the frame
+   # black, so the readers see the same layout while far fewer pixels move.
+   name = 'regions'
+
+   def __init__(self, backend: CaptureBackend, regions: t.Sequence[Region]) -> None:
+      super().__init__()
+      self.backend = backend
+      self.regions = regions
+
+   def _grab(self, bbox: Box) -> np.ndarray:
+      x0, y0, x1, y1 = bbox
+      width, height = x1 - x0, y1 - y0
+      pixels = np.zeros((height, width, 3), np.uint8)
+
+      for left, top, right, bottom in self.regions:
+         rx0, ry0 = math.floor(width*left), math.floor(height*top)
+         rx1, ry1 = min(math.ceil(width*right), width), min(math.ceil(height*bottom), height)
+         pixels[ry0:ry1, rx0:rx1] = self.backend.grab((x0 + rx0, y0 + ry0, x0 + rx1, y0 + ry1))
+
+      return pixels
+
+   def close(self) -> None:
+      self.backend.close()
+
+class ReplayBackend(CaptureBackend):
+   # Plays back recorded top bar captures (a glob pattern or a list of PNG
+   # paths) in order, so the OCR can run without a display. The requested box
+   # is ignored, recordings are already cropped.
+   name = 'replay'
+
+   def __init__(self, paths: t.Union[str, t.Sequence[str]], loop: bool = True, preload: bool = True) -> None:
+      super().__init__()
+      self.paths = sorted(glob.glob(paths)) if isinstance(paths, str) else list(paths)
+      if not self.paths:
+         raise CaptureError(f'No frames to replay in {paths}')
+
+      self.loop = loop
+      self.position = 0
+      self._frames = None
+      if preload:
+         # unreadable recordings are dropped up front rather than failing mid replay
+         frames = []
+         for path in list(self.paths):
+            try:
+               frames.append(self._load(path))
+            except Exception as e:
+               logger.warning(f'Skipping replay frame {path}: {e}')
+               self.paths.remove(path)
+         if not frames:
+            raise CaptureError(f'No readable frames to replay in {paths}')
+         self._frames = frames
+
+   def _grab(self, bbox: Box) -> np.ndarray:
+      if self.position >= len(self.paths):
+         if not self.loop:
+            raise CaptureError('Replay finished')
+         self.position = 0
+
+      index = self.position
+      self.position += 1
+      return self._frames[index] if self._frames else self._load(self.paths[index])
+
+   def _load(self, path: str) -> np.ndarray:
+      return np.asarray(Image.open(path).convert('RGB'))
+
+def create_backend(spec: str = None, regions: t.Sequence[Region] = None) -> CaptureBackend:
+   # spec comes from VALORPC_CAPTURE when not given:
+   #    auto (default), imagegrab, xshm, replay:<glob>, regions[:<spec>]
+   spec = spec or os.getenv('VALORPC_CAPTURE', 'auto')
+
+   if spec.startswith('replay:'):
+      return ReplayBackend(spec[len('replay:'):])
+   if spec == 'regions' or spec.startswith('regions:'):
+      if not regions:
+         raise CaptureError('Region capture needs regions to grab')
+      return RegionBackend(create_backend(spec[len('regions:'):] or 'auto'), regions)
+   if spec == 'imagegrab':
+      return ImageGrabBackend()
+   if spec == 'xshm':
+      return XShmBackend()
+
+   if spec != 'auto':
+      logger.warning(f'Unknown capture backend {spec!r}, using auto')
+   if sys.platform.startswith('linux') and os.getenv('DISPLAY'):
+      try:
+         return XShmBackend()
+      except Exception as e:
+         logger.info(f'MIT-SHM capture unavailable ({e}), using ImageGrab')
+   return ImageGrabBackend()
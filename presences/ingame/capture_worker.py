@@ -0,0 +1,124 @@
+import os
+import time
+import threading
+import typing as t
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+Results = t.Tuple[t.Tuple[int, int], t.Tuple[int, int, int], str]
+
+class TimedResult(t.NamedTuple):
+   captured_at: float # time.time() right before the grab
+   read_seconds: float # capture + OCR
+   results: Results
+   timer_read: bool
+
+def capture_cpu_time(ocr_executor=None) -> float:
+   # CPU seconds spent on captures so far: this thread, the tesseract runs it
+   # started and the OCR executor's workers. Approximate:
+   #  - a tesseract run only counts once it has been waited for, and os.times()
+   #    has no children's time on Windows, so there plain tesseract reads are
+   #    missed (reads through the executor are not)
+   #  - the children's time is the whole process's, the capture thread is the
+   #    only one running tesseract
+   #  - the executor's workers report their time with each read
+   times = os.times()
+   cpu = time.thread_time() + times.children_user + times.children_system
+   if ocr_executor is not None:
+      cpu += ocr_executor.cpu_seconds()
+   return cpu
+
+class CaptureWorker():
+   # Captures and reads the top bar on its own thread and keeps the last
+   # `size` readings, so the presence loop never waits on the screen or the
+   # OCR and every reading carries the time its frame was taken. The reader's
+   # buffers are not shared, only this thread touches the ScreenReader while
+   # the worker runs.
+   def __init__(self, screen_reader, interval: float = 1.0, size: int = 32, read_timer: t.Callable[[], bool] = None, scheduler=None) -> None:
+      self.screen_reader = screen_reader
+      self.interval = interval
+      # a CaptureScheduler replaces the fixed interval when given
+      self.scheduler = scheduler
+      # asked before every frame whether the timer needs OCR, always when None
+      self.read_timer = read_timer
+      self.ring: t.Deque[TimedResult] = deque(maxlen=size)
+      self.errors = 0
+      self._condition = threading.Condition()
+      self._stopping = threading.Event()
+      self._thread = None
+
+   @property
+   def running(self) -> bool:
+      return self._thread is not None and self._thread.is_alive()
+
+   def start(self) -> None:
+      if self.running:
+         if not self._stopping.is_set():
+            return
+         # a stop() that timed out, the old thread still holds the reader
+         self._thread.join()
+      self._stopping.clear()
+      self._thread = threading.Thread(target=self.__run, name='capture-worker', daemon=True)
+      self._thread.start()
+
+   def stop(self, timeout: float = 5) -> None:
+      self._stopping.set()
+      with self._condition:
+         self._condition.notify_all()
+      if self._thread is not None:
+         self._thread.join(timeout)
+         if self._thread.is_alive():
+            # kept, start() waits for it before touching the reader again
+            logger.warning(f'Capture worker still busy {timeout}s after stop')
+         else:
+            self._thread = None
+
+   def latest(self) -> t.Optional[TimedResult]:
+      with self._condition:
+         return self.ring[-1] if self.ring else None
+
+   def results(self, after: float = 0) -> t.List[TimedResult]:
+      with self._condition:
+         return [result for result in self.ring if result.captured_at > after]
+
+   def wait_for_result(self, after: float = 0, timeout: float = None) -> t.Optional[TimedResult]:
+      # the newest reading captured after `after`, waiting up to `timeout`
+      # seconds for one; None on timeout or when the worker stops
+      def fresh():
+         return self._stopping.is_set() or (self.ring and self.ring[-1].captured_at > after)
+
+      with self._condition:
+         self._condition.wait_for(fresh, timeout)
+         if self.ring and self.ring[-1].captured_at > after:
+            return self.ring[-1]
+         return None
+
+   def __run(self) -> None:
+      score_reader = self.screen_reader.score_reader
+      while not self._stopping.is_set():
+         started = time.perf_counter()
+         started_cpu = capture_cpu_time(score_reader.ocr_executor)
+         captured_at = time.time()
+         try:
+            read_timer = self.read_timer() if self.read_timer else True
+            print_screen = self.screen_reader.capture_screen()
+            if score_reader.debug:
+               self.screen_reader.display_screen(print_screen)
+            results = score_reader.record_frame(print_screen, read_timer)
+         except Exception as e:
+            self.errors += 1
+            logger.warning(f'Top bar capture failed: {e}')
+         else:
+            logger.debug(results)
+            with self._condition:
+               self.ring.append(TimedResult(captured_at, time.perf_counter() - started, results, read_timer))
+               self._condition.notify_all()
+
+         if self.scheduler is None:
+            interval = self.interval
+         else:
+            self.scheduler.record(capture_cpu_time(score_reader.ocr_executor) - started_cpu)
+            interval = self.scheduler.next_delay(self.latest())
+         self._stopping.wait(max(interval - (time.perf_counter() - started), 0))
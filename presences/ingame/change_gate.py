@@ -0,0 +1,71 @@
+import typing as t
+
+import numpy as np
+
+class ChangeGate():
+   # Remembers the masks each region was last read from together with the
+   # reading, so a region whose masks did not change since the previous frame
+   # is not read again. The raw pixels behind the HUD move every frame, the
+   # binarized glyphs only when the text does, so the masks are what is diffed.
+   def __init__(self, max_changed_pixels: int = 0) -> None:
+      self.max_changed_pixels = max_changed_pixels
+      self._masks: t.Dict[str, t.List[np.ndarray]] = {}
+      self._results: t.Dict[str, t.Any] = {}
+      self.hits: t.Dict[str, int] = {}
+      self.misses: t.Dict[str, int] = {}
+
+   def lookup(self, region: str, *masks: np.ndarray) -> t.Tuple[bool, t.Any]:
+      previous = self._masks.get(region)
+      if previous is not None and self._unchanged(previous, masks):
+         self.hits[region] = self.hits.get(region, 0) + 1
+         return True, self._results[region]
+
+      self.misses[region] = self.misses.get(region, 0) + 1
+      return False, None
+
+   def unchanged(self, region: str, *masks: np.ndarray) -> bool:
+      # lookup without counting a hit or a miss
+      previous = self._masks.get(region)
+      return previous is not None and self._unchanged(previous, masks)
+
+   def store(self, region: str, result: t.Any, *masks: np.ndarray) -> None:
+      # masks usually live in reused frame buffers, so keep copies, recycling
+      # the previous copies when the shapes still match
+      previous = self._masks.get(region)
+      if previous is not None and len(previous) == len(masks) and all(a.shape == b.shape for a, b in zip(previous, masks)):
+         for kept, mask in zip(previous, masks):
+            np.copyto(kept, mask)
+      else:
+         self._masks[region] = [mask.copy() for mask in masks]
+      self._results[region] = result
+
+   def invalidate(self, region: str = None) -> None:
+      if region is None:
+         self._masks.clear()
+         self._results.clear()
+      else:
+         self._masks.pop(region, None)
+         self._results.pop(region, None)
+
+   def stats(self) -> t.Dict[str, t.Dict[str, float]]:
+      stats = {}
+      for region in sorted(set(self.hits) | set(self.misses)):
+         hits = self.hits.get(region, 0)
+         misses = self.misses.get(region, 0)
+         stats[region] = {'hits': hits, 'misses': misses, 'hit_rate': hits/(hits + misses)}
+      return stats
+
+   def _unchanged(self, previous: t.List[np.ndarray], masks: t.Tuple[np.ndarray, ...]) -> bool:
+      if len(previous) != len(masks):
+         return False
+
+      for kept, mask in zip(previous, masks):
+         if kept.shape != mask.shape:
+            return False
+         if self.max_changed_pixels == 0:
+            if not np.array_equal(kept, mask):
+               return False
+         elif np.count_nonzero(kept != mask) > self.max_changed_pixels:
+            return False
+
+      return True
@@ -0,0 +1,120 @@
+import os
+import time
+import threading
+import typing as t
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+import cv2
+import numpy as np
+
+class DebugImage(t.NamedTuple):
+   window: str
+   image: np.ndarray
+   position: t.Tuple[int, int]
+   color: t.Optional[int] # cv2.COLOR_* conversion to BGR, None if already BGR/gray
+   size: t.Optional[t.Tuple[int, int]] # width, height to resize to
+   annotate: t.Optional[t.Callable[[np.ndarray], None]] # draws on the converted image
+
+class DebugSink():
+   # Takes the reader's debug images and converts, annotates, resizes and
+   # writes them to dump_path on a thread of its own, so debugging a match
+   # does not slow down the capture being debugged. The queue is bounded and
+   # drops the oldest image when the renderer falls behind. Images are copied
+   # when queued since the reader's masks live in reused buffers.
+   #
+   # HighGUI windows belong to the thread that made them, so the windows are
+   # only drawn by pump(), on the caller's thread, from the newest image of
+   # each window the sink thread has ready.
+   def __init__(self, display: bool = True, dump_path: str = None, max_queued: int = 16) -> None:
+      self.display = display
+      self.dump_path = dump_path
+      self.queue: t.Deque[DebugImage] = deque(maxlen=max_queued)
+      self.queued = 0
+      self.dropped = 0
+      self.rendered = 0
+      self._condition = threading.Condition()
+      self._stopping = False
+      # window: (image, position) rendered and not shown yet
+      self._ready: t.Dict[str, t.Tuple[np.ndarray, t.Tuple[int, int]]] = {}
+      self._gui_thread = None
+      if dump_path:
+         os.makedirs(dump_path, exist_ok=True)
+      self._thread = threading.Thread(target=self.__run, name='debug-sink', daemon=True)
+      self._thread.start()
+
+   def show(
+      self,
+      window: str,
+      image: np.ndarray,
+      position: t.Tuple[int, int],
+      color: int = None,
+      size: t.Tuple[int, int] = None,
+      annotate: t.Callable[[np.ndarray], None] = None
+   ) -> None:
+      item = DebugImage(window, image.copy(), position, color, size, annotate)
+      with self._condition:
+         if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+         self.queue.append(item)
+         self.queued += 1
+         self._condition.notify()
+
+   def pump(self) -> None:
+      # shows what the sink thread has rendered since the last call; always
+      # called from the same thread, the one the windows belong to
+      if not self.display:
+         return
+      with self._condition:
+         ready, self._ready = self._ready, {}
+      if not ready:
+         return
+      self._gui_thread = threading.get_ident()
+      for window, (image, position) in ready.items():
+         cv2.imshow(window, image)
+         cv2.moveWindow(window, *position)
+      if cv2.waitKey(1) & 0xFF == ord('q'):
+         cv2.destroyAllWindows()
+
+   def close(self, timeout: float = 2) -> None:
+      with self._condition:
+         self._stopping = True
+         self._condition.notify()
+      self._thread.join(timeout)
+      # from another thread the windows are left to go with the process
+      if self._gui_thread == threading.get_ident():
+         cv2.destroyAllWindows()
+
+   def __run(self) -> None:
+      while True:
+         with self._condition:
+            self._condition.wait_for(lambda: self.queue or self._stopping)
+            if self._stopping:
+               break
+            item = self.queue.popleft()
+
+         try:
+            self.__render(item)
+         except Exception as e:
+            logger.warning(f'Unable to render debug image {item.window}: {e}')
+
+   def __render(self, item: DebugImage) -> None:
+      image = item.image
+      if item.color is not None:
+         image = cv2.cvtColor(image, item.color)
+      if item.annotate is not None:
+         item.annotate(image)
+      if item.size is not None:
+         image = cv2.resize(image, item.size, interpolation=cv2.INTER_AREA)
+
+      if self.dump_path:
+         name = f'{time.strftime("%Y%m%d_%H%M%S")}_{self.rendered:06d}_{item.window.replace(" ", "_")}.png'
+         cv2.imwrite(os.path.join(self.dump_path, name), image)
+
+      if self.display:
+         with self._condition:
+            self._ready[item.window] = (image, item.position)
+
+      self.rendered += 1
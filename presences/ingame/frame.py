@@ -0,0 +1,82 @@
+import typing as t
+
+import numpy as np
+from PIL import Image
+
+Region = t.Tuple[float, float, float, float]
+Box = t.Tuple[int, int, int, int]
+
+class Frame():
+   def __init__(self, print_screen: t.Union[Image.Image, np.ndarray]) -> None:
+      # the only conversion of the capture; every region below is a view
+      self.pixels = np.asarray(print_screen)
+      self.height, self.width = self.pixels.shape[:2]
+      self.size = (self.width, self.height)
+
+   def box(self, region: Region) -> Box:
+      # FrameBuffers.box keeps these per frame size
+      return (
+         round(self.width*region[0]), round(self.height*region[1]),
+         round(self.width*region[2]), round(self.height*region[3])
+      )
+
+   def point(self, position: t.Tuple[float, float]) -> t.Tuple[int, int]:
+      return (round(self.width*position[0]), round(self.height*position[1]))
+
+   def region(self, region: Region) -> np.ndarray:
+      x0, y0, x1, y1 = self.box(region)
+      return self.pixels[y0:y1, x0:x1]
+
+   def pixel(self, position: t.Tuple[float, float]) -> np.ndarray:
+      x, y = self.point(position)
+      return self.pixels[y, x]
+
+class FrameBuffers():
+   # Masks and kernels reused from frame to frame. Whatever is handed out here
+   # is overwritten by the next frame, so anything that outlives a frame has to
+   # copy it first.
+   def __init__(self) -> None:
+      self._arrays = {}
+      self._kernels = {}
+      # integer boxes and pixels of every frame read through these buffers,
+      # so the fraction maths only runs once per region and resolution
+      self._boxes: t.Dict[t.Tuple[t.Tuple[int, int], Region], Box] = {}
+      self._pixels: t.Dict[t.Tuple[t.Tuple[int, int], t.Tuple[float, float]], t.Tuple[int, int]] = {}
+
+   def preload(self, size: t.Tuple[int, int], boxes: t.Dict[Region, Box], pixels: t.Dict[t.Tuple[float, float], t.Tuple[int, int]] = {}) -> None:
+      # boxes and (x, y) pixels worked out ahead of time, see calibration;
+      # before the first frame, as HUD layouts plan their reads from these
+      for region, box in boxes.items():
+         self._boxes[(size, region)] = box
+      for position, pixel in pixels.items():
+         self._pixels[(size, position)] = pixel
+
+   def box(self, frame: Frame, region: Region) -> Box:
+      key = (frame.size, region)
+      box = self._boxes.get(key)
+      if box is None:
+         box = frame.box(region)
+         self._boxes[key] = box
+      return box
+
+   def pixel(self, frame: Frame, position: t.Tuple[float, float]) -> np.ndarray:
+      key = (frame.size, position)
+      pixel = self._pixels.get(key)
+      if pixel is None:
+         pixel = frame.point(position)
+         self._pixels[key] = pixel
+      return frame.pixels[pixel[1], pixel[0]]
+
+   def get(self, name: str, shape: t.Tuple[int, ...], dtype: type = np.uint8) -> np.ndarray:
+      array = self._arrays.get(name)
+      if array is None or array.shape != shape or array.dtype != dtype:
+         array = np.empty(shape, dtype)
+         self._arrays[name] = array
+      return array
+
+   def kernel(self, size: int) -> np.ndarray:
+      kernel = self._kernels.get(size)
+      if kernel is None:
+         kernel = np.ones((size, size), np.uint8)
+         self._kernels[size] = kernel
+      return kernel
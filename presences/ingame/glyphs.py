@@ -0,0 +1,187 @@
+import os
+import json
+import typing as t
+import logging
+
+logger = logging.getLogger(__name__)
+
+import cv2
+import numpy as np
+
+from .binarize import INK
+
+# Bump whenever the template layout changes so stale atlases are refused
+# instead of silently misreading.
+ATLAS_VERSION = 1
+GLYPH_SIZE = (12, 20) # width, height every glyph is resampled to
+MIN_GLYPH_INK = 4 # connected specks smaller than this are ignored
+PUNCTUATION_WIDTH = 0.3 # ':' and '.' are at most this fraction of the line height wide
+DOT_HEIGHT = 0.4 # '.' is at most this fraction of the line height tall
+
+default_atlas_path = os.path.join(os.path.dirname(__file__), 'glyph_atlas.npz')
+
+Box = t.Tuple[int, int, int, int]
+
+def segment(mask: np.ndarray) -> t.List[Box]:
+   # Column projection profile: every run of columns containing ink is one
+   # glyph. Returns (x0, y0, x1, y1) boxes from left to right.
+   ink = mask == INK
+   columns = np.flatnonzero(ink.any(axis=0))
+   if columns.size == 0:
+      return []
+
+   breaks = np.flatnonzero(np.diff(columns) > 1)
+   starts = np.concatenate(((columns[0],), columns[breaks + 1]))
+   ends = np.concatenate((columns[breaks], (columns[-1],))) + 1
+
+   boxes = []
+   for x0, x1 in zip(starts, ends):
+      glyph = ink[:, x0:x1]
+      if np.count_nonzero(glyph) < MIN_GLYPH_INK:
+         continue
+      rows = np.flatnonzero(glyph.any(axis=1))
+      boxes.append((int(x0), int(rows[0]), int(x1), int(rows[-1]) + 1))
+
+   return boxes
+
+def glyph_vector(mask: np.ndarray, box: Box) -> np.ndarray:
+   x0, y0, x1, y1 = box
+   glyph = (mask[y0:y1, x0:x1] == INK).astype(np.float32)
+   vector = cv2.resize(glyph, GLYPH_SIZE, interpolation=cv2.INTER_AREA).ravel()
+   vector -= vector.mean()
+   norm = np.linalg.norm(vector)
+   if norm > 0:
+      vector /= norm
+   return vector
+
+def punctuation(mask: np.ndarray, box: Box, line_height: int) -> t.Optional[str]:
+   # ':' and '.' are told apart by their row profile rather than templates:
+   # a colon is two blobs stacked with empty rows between them, a dot is a
+   # single blob much shorter than the digits next to it.
+   x0, y0, x1, y1 = box
+   if (x1 - x0) > line_height*PUNCTUATION_WIDTH:
+      return None
+
+   rows = (mask[y0:y1, x0:x1] == INK).any(axis=1)
+   if not rows.all():
+      return ':'
+   if (y1 - y0) <= line_height*DOT_HEIGHT:
+      return '.'
+   return None
+
+def sample_glyphs(mask: np.ndarray, text: str) -> t.Optional[t.List[t.Tuple[str, np.ndarray]]]:
+   # Pairs every digit of a labeled crop with its template vector, or None
+   # when the crop does not split into as many glyphs as the label has.
+   # Punctuation is handled by row profiles so it never becomes a template.
+   boxes = segment(mask)
+   if len(boxes) != len(text):
+      return None
+
+   return [(label, glyph_vector(mask, box)) for box, label in zip(boxes, text) if label.isdigit()]
+
+class GlyphAtlas():
+   def __init__(self, labels: np.ndarray, templates: np.ndarray, version: int = ATLAS_VERSION, info: dict = None) -> None:
+      self.labels = labels
+      self.templates = templates
+      self.version = version
+      # free-form build details (sources, sample counts, creation time)
+      self.info = info or {}
+
+   @classmethod
+   def load(cls, path: str) -> 'GlyphAtlas':
+      with np.load(path) as data:
+         version = int(data['version'])
+         glyph_size = tuple(int(v) for v in data['glyph_size'])
+         if version != ATLAS_VERSION or glyph_size != GLYPH_SIZE:
+            raise ValueError(f'Glyph atlas {path} is version {version} {glyph_size}, expected {ATLAS_VERSION} {GLYPH_SIZE}')
+         info = json.loads(str(data['info'])) if 'info' in data.files else {}
+         return cls(data['labels'], data['templates'], version, info)
+
+   def save(self, path: str) -> None:
+      np.savez_compressed(
+         path,
+         version=np.array(self.version),
+         glyph_size=np.array(GLYPH_SIZE),
+         labels=self.labels,
+         templates=self.templates,
+         info=np.array(json.dumps(self.info))
+      )
+
+   @classmethod
+   def from_glyphs(cls, glyphs: t.Iterable[t.Tuple[str, np.ndarray]], info: dict = None) -> 'GlyphAtlas':
+      labels = []
+      templates = []
+      seen = set()
+      for label, vector in glyphs:
+         key = (label, vector.tobytes())
+         if key in seen:
+            continue
+         seen.add(key)
+         labels.append(label)
+         templates.append(vector)
+
+      return cls(
+         np.array(labels, dtype='<U1'),
+         np.array(templates, dtype=np.float32).reshape(len(templates), GLYPH_SIZE[0]*GLYPH_SIZE[1]),
+         info=info
+      )
+
+   @classmethod
+   def from_samples(cls, samples: t.Iterable[t.Tuple[np.ndarray, str]], info: dict = None) -> 'GlyphAtlas':
+      # samples are binarized crops with the text they show
+      glyphs = []
+      for mask, text in samples:
+         pairs = sample_glyphs(mask, text)
+         if pairs is None:
+            logger.warning(f'Skipping glyph sample {text!r}: glyph count does not match')
+            continue
+         glyphs.extend(pairs)
+
+      return cls.from_glyphs(glyphs, info)
+
+class GlyphClassifier():
+   def __init__(self, atlas: GlyphAtlas, min_confidence: float = 0.85) -> None:
+      self.atlas = atlas
+      self.min_confidence = min_confidence
+
+   @classmethod
+   def from_path(cls, path: t.Optional[str] = default_atlas_path, **kwargs) -> t.Optional['GlyphClassifier']:
+      if path is None:
+         return None
+      if not os.path.exists(path):
+         logger.info(f'No glyph atlas at {path}, OCR will use tesseract only')
+         return None
+      try:
+         return cls(GlyphAtlas.load(path), **kwargs)
+      except Exception as e:
+         logger.warning(f'Unable to load glyph atlas {path}: {e}')
+         return None
+
+   def classify_glyphs(self, mask: np.ndarray) -> t.List[t.Tuple[str, float]]:
+      # Digits are matched to their nearest template by correlation;
+      # punctuation is certain once its row profile matches.
+      boxes = segment(mask)
+      if not boxes or len(self.atlas.labels) == 0:
+         return []
+
+      line_height = max(y1 - y0 for _, y0, _, y1 in boxes)
+      glyphs = []
+      for box in boxes:
+         symbol = punctuation(mask, box, line_height)
+         if symbol:
+            glyphs.append((symbol, 1.0))
+            continue
+
+         scores = self.atlas.templates @ glyph_vector(mask, box)
+         best = int(np.argmax(scores))
+         glyphs.append((str(self.atlas.labels[best]), float(scores[best])))
+
+      return glyphs
+
+   def classify(self, mask: np.ndarray) -> t.Tuple[str, float]:
+      # Returns the text and the confidence of its weakest glyph.
+      glyphs = self.classify_glyphs(mask)
+      if not glyphs:
+         return '', 0.0
+
+      return ''.join(symbol for symbol, _ in glyphs), min(confidence for _, confidence in glyphs)
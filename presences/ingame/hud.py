@@ -0,0 +1,213 @@
+import weakref
+import contextlib
+import typing as t
+
+import cv2
+import numpy as np
+
+from . import binarize
+from .frame import Frame, FrameBuffers, Region, Box
+from .signatures import PixelSignatures
+
+Position = t.Tuple[float, float]
+
+_no_stage = contextlib.nullcontext()
+
+# Colour predicates: what counts as ink in a region. Regions with equal
+# predicates share one binarize call, so they compare by value.
+class WhiteMask(t.NamedTuple):
+   threshold: int = 255 # mean of the channels, see binarize.white_mask
+
+   def apply(self, pixels: np.ndarray, buffers: FrameBuffers, buffer: str) -> np.ndarray:
+      shape = pixels.shape[:2]
+      return binarize.white_mask(
+         pixels, self.threshold,
+         out=buffers.get(buffer, shape),
+         totals=buffers.get(f'{buffer}_totals', shape, np.uint16)
+      )
+
+class RedMask(t.NamedTuple):
+   def apply(self, pixels: np.ndarray, buffers: FrameBuffers, buffer: str) -> np.ndarray:
+      return binarize.red_mask(pixels, out=buffers.get(buffer, pixels.shape[:2]))
+
+# Morphology on the glyphs. Masks are black ink on white, so dilating the
+# glyphs is a cv2.erode and the other way round.
+class Dilate(t.NamedTuple):
+   size: int
+
+   def apply(self, mask: np.ndarray, kernel: np.ndarray, dst: np.ndarray) -> np.ndarray:
+      return cv2.erode(mask, kernel, dst=dst, iterations=1)
+
+class Erode(t.NamedTuple):
+   size: int
+
+   def apply(self, mask: np.ndarray, kernel: np.ndarray, dst: np.ndarray) -> np.ndarray:
+      return cv2.dilate(mask, kernel, dst=dst, iterations=1)
+
+# Readers turn a region into a value. Each names the profiler stage it is
+# timed under.
+class TextRead(t.NamedTuple):
+   # the mask's text through the reader's OCR path (cache, glyphs, tesseract)
+   config: str
+   stage = 'ocr'
+
+class SignatureRead(t.NamedTuple):
+   # (state, scores) of the first matching state of a PixelSignatures table
+   signatures: PixelSignatures
+   stage = 'classify'
+
+class PixelRead(t.NamedTuple):
+   # whether the pixel at position has every channel within lower..upper
+   position: Position
+   lower: t.Tuple[int, ...]
+   upper: t.Tuple[int, ...]
+   stage = 'classify'
+
+class HudRegion(t.NamedTuple):
+   name: str
+   region: t.Optional[Region] = None # None for readers that sample the frame itself
+   mask: t.Optional[t.Union[WhiteMask, RedMask]] = None
+   morphology: t.Optional[t.Union[Dilate, Erode]] = None
+   reader: t.Optional[t.Union[TextRead, SignatureRead, PixelRead]] = None
+
+class _Plan(t.NamedTuple):
+   # per frame size and set of regions: each predicate's spanning box with
+   # the box of each of its regions inside it
+   groups: t.List[t.Tuple[t.Any, str, Box, t.List[t.Tuple[str, Box]]]]
+   morphology: t.List[t.Tuple[str, t.Union[Dilate, Erode]]]
+
+class HudLayout():
+   # A declarative list of HUD regions compiled into as few numpy/cv2 calls as
+   # it takes to read them. Regions sharing a colour predicate are binarized
+   # together over the box spanning all of them and handed out as views of
+   # it, so a new read-out next to existing ones adds no binarize call. The
+   # plan is worked out once per frame size and set of regions read.
+   def __init__(self, regions: t.Sequence[HudRegion]) -> None:
+      self.regions: t.Dict[str, HudRegion] = {}
+      for region in regions:
+         if region.name in self.regions:
+            raise ValueError(f'HUD region {region.name} declared twice')
+         if region.mask is None and region.morphology is not None:
+            raise ValueError(f'HUD region {region.name} has morphology but no mask')
+         self.regions[region.name] = region
+      # per buffers, which hold the (calibrated) boxes the plans are made of
+      self._plans: t.MutableMapping[FrameBuffers, t.Dict[t.Tuple[t.Tuple[int, int], t.Tuple[str, ...]], _Plan]] = weakref.WeakKeyDictionary()
+
+   def extend(self, *regions: HudRegion) -> 'HudLayout':
+      # a layout for another mode, e.g. one with its own counters on screen
+      return HudLayout(list(self.regions.values()) + list(regions))
+
+   def __getitem__(self, name: str) -> HudRegion:
+      return self.regions[name]
+
+   # what calibration has to work out per resolution
+   @property
+   def crop_regions(self) -> t.List[Region]:
+      return list(dict.fromkeys(region.region for region in self.regions.values() if region.region is not None))
+
+   @property
+   def pixel_positions(self) -> t.List[Position]:
+      return [region.reader.position for region in self.regions.values() if isinstance(region.reader, PixelRead)]
+
+   @property
+   def signature_tables(self) -> t.List[t.Tuple[Region, PixelSignatures]]:
+      return [(region.region, region.reader.signatures) for region in self.regions.values() if isinstance(region.reader, SignatureRead)]
+
+   def masks(
+      self,
+      frame: Frame,
+      names: t.Sequence[str],
+      buffers: FrameBuffers,
+      stage: t.Callable[[str], t.ContextManager] = None
+   ) -> t.Dict[str, np.ndarray]:
+      # Masks of the named regions that have one. They live in buffers and
+      # are overwritten by the next call.
+      stage = stage or (lambda name: _no_stage)
+      plan = self.__plan(frame, tuple(names), buffers)
+
+      masks = {}
+      for predicate, buffer, (x0, y0, x1, y1), members in plan.groups:
+         with stage('crop'):
+            pixels = frame.pixels[y0:y1, x0:x1]
+         with stage('binarize'):
+            spanning = predicate.apply(pixels, buffers, buffer)
+         for name, (bx0, by0, bx1, by1) in members:
+            masks[name] = spanning[by0:by1, bx0:bx1]
+
+      with stage('morphology'):
+         for name, morphology in plan.morphology:
+            mask = masks[name]
+            masks[name] = morphology.apply(mask, buffers.kernel(morphology.size), buffers.get(f'{name}_morph', mask.shape))
+      return masks
+
+   def read(
+      self,
+      frame: Frame,
+      names: t.Sequence[str],
+      buffers: FrameBuffers,
+      stage: t.Callable[[str], t.ContextManager] = None,
+      read_text: t.Callable[[np.ndarray, str], str] = None,
+      masks: t.Dict[str, np.ndarray] = None
+   ) -> t.Dict[str, t.Any]:
+      # The reading of every named region with a reader. masks may hold some
+      # already made by masks(), the rest are made here in one go.
+      stage = stage or (lambda name: _no_stage)
+      masks = dict(masks or {})
+      missing = [name for name in names if name not in masks and self.regions[name].mask is not None]
+      if missing:
+         masks.update(self.masks(frame, missing, buffers, stage))
+
+      readings = {}
+      for name in names:
+         region = self.regions[name]
+         reader = region.reader
+         if reader is None:
+            continue
+         with stage(reader.stage):
+            if isinstance(reader, TextRead):
+               if read_text is None:
+                  raise ValueError(f'HUD region {name} is read as text but no text reader was given')
+               readings[name] = read_text(masks[name], reader.config)
+            elif isinstance(reader, SignatureRead):
+               readings[name] = reader.signatures.classify(masks[name])
+            elif isinstance(reader, PixelRead):
+               pixel = buffers.pixel(frame, reader.position)[:len(reader.lower)]
+               readings[name] = bool(np.all(pixel >= reader.lower) and np.all(pixel <= reader.upper))
+      return readings
+
+   def __plan(self, frame: Frame, names: t.Tuple[str, ...], buffers: FrameBuffers) -> _Plan:
+      key = (frame.size, names)
+      plans = self._plans.setdefault(buffers, {})
+      plan = plans.get(key)
+      if plan is not None:
+         return plan
+
+      # the calibrated box of every member, so the views match a crop of the
+      # region on its own pixel for pixel
+      grouped: t.Dict[t.Any, t.List[t.Tuple[str, Box]]] = {}
+      morphology = []
+      for name in names:
+         region = self.regions[name]
+         if region.mask is None:
+            continue
+         # keyed by type too, RedMask() and an empty WhiteMask tuple are equal
+         grouped.setdefault((type(region.mask), region.mask), []).append((name, buffers.box(frame, region.region)))
+         if region.morphology is not None:
+            morphology.append((name, region.morphology))
+
+      groups = []
+      for (_, predicate), members in grouped.items():
+         x0 = min(box[0] for _, box in members)
+         y0 = min(box[1] for _, box in members)
+         x1 = max(box[2] for _, box in members)
+         y1 = max(box[3] for _, box in members)
+         groups.append((
+            predicate,
+            '_'.join(['hud', type(predicate).__name__.lower(), *map(str, predicate)]),
+            (x0, y0, x1, y1),
+            [(name, (bx0 - x0, by0 - y0, bx1 - x0, by1 - y0)) for name, (bx0, by0, bx1, by1) in members]
+         ))
+
+      plan = _Plan(groups, morphology)
+      plans[key] = plan
+      return plan
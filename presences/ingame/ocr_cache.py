@@ -0,0 +1,58 @@
+import hashlib
+import typing as t
+from collections import OrderedDict
+
+import numpy as np
+
+from .binarize import INK
+
+class OcrCache():
+   # Least recently used readings keyed by a fingerprint of the binarized
+   # crop, so a mask seen before (the same score all round, the timer showing
+   # 0:29 every buy phase) is never read twice. Unlike the ChangeGate this
+   # does not need the mask to be the previous frame's.
+   def __init__(self, max_entries: int = 256) -> None:
+      self.max_entries = max_entries
+      self.entries: t.OrderedDict[bytes, str] = OrderedDict()
+      self.hits = 0
+      self.misses = 0
+
+   @staticmethod
+   def key(mask: np.ndarray, config: str) -> bytes:
+      # one bit per pixel, the shape and the reader config so the same pixels
+      # read as a score and as a timer are kept apart
+      digest = hashlib.blake2b(digest_size=16)
+      digest.update(np.packbits(mask == INK).tobytes())
+      digest.update(np.array(mask.shape, np.int32).tobytes())
+      digest.update(config.encode())
+      return digest.digest()
+
+   def __contains__(self, key: bytes) -> bool:
+      return key in self.entries
+
+   def get(self, key: bytes) -> t.Optional[str]:
+      text = self.entries.get(key)
+      if text is None:
+         self.misses += 1
+         return None
+      self.entries.move_to_end(key)
+      self.hits += 1
+      return text
+
+   def put(self, key: bytes, text: str) -> None:
+      self.entries[key] = text
+      self.entries.move_to_end(key)
+      while len(self.entries) > self.max_entries:
+         self.entries.popitem(last=False)
+
+   def clear(self) -> None:
+      self.entries.clear()
+
+   def stats(self) -> t.Dict[str, float]:
+      lookups = self.hits + self.misses
+      return {
+         'entries': len(self.entries),
+         'hits': self.hits,
+         'misses': self.misses,
+         'hit_rate': self.hits/lookups if lookups else 0.0,
+      }
@@ -0,0 +1,260 @@
+import os
+import glob
+import atexit
+import queue
+import shlex
+import ctypes
+import ctypes.util
+import typing as t
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+import numpy as np
+
+def parse_config(config: str) -> t.Tuple[str, t.Optional[int], t.Dict[str, str]]:
+   # '-c name=value --psm 8 -l val4' -> ('val4', 8, {'name': 'value'})
+   language = 'eng'
+   psm = None
+   variables = {}
+   args = shlex.split(config)
+   i = 0
+   while i < len(args):
+      if args[i] == '-l':
+         language = args[i + 1]
+         i += 1
+      elif args[i] == '--psm':
+         psm = int(args[i + 1])
+         i += 1
+      elif args[i] == '-c':
+         name, value = args[i + 1].split('=', 1)
+         variables[name] = value
+         i += 1
+      i += 1
+   return language, psm, variables
+
+class _CApiEngine():
+   # libtesseract through its C API: one initialised TessBaseAPI per config,
+   # kept for the life of the worker, so traineddata is loaded once
+   def __init__(self, tessdata: t.Optional[str], lib_path: t.Optional[str]) -> None:
+      lib_path = lib_path or ctypes.util.find_library('tesseract')
+      if not lib_path:
+         raise OSError('libtesseract not found')
+      self.lib = ctypes.CDLL(lib_path)
+      self.lib.TessBaseAPICreate.restype = ctypes.c_void_p
+      self.lib.TessBaseAPIInit3.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+      self.lib.TessBaseAPISetVariable.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+      self.lib.TessBaseAPISetPageSegMode.argtypes = [ctypes.c_void_p, ctypes.c_int]
+      self.lib.TessBaseAPISetImage.argtypes = [
+         ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int
+      ]
+      self.lib.TessBaseAPIGetUTF8Text.restype = ctypes.c_void_p
+      self.lib.TessBaseAPIGetUTF8Text.argtypes = [ctypes.c_void_p]
+      self.lib.TessDeleteText.argtypes = [ctypes.c_void_p]
+      self.lib.TessBaseAPIDelete.argtypes = [ctypes.c_void_p]
+      self.tessdata = tessdata.encode() if tessdata else None
+      self.apis = {}
+
+   def read(self, mask: np.ndarray, config: str) -> str:
+      api = self.apis.get(config)
+      if api is None:
+         api = self.__create(config)
+         self.apis[config] = api
+
+      mask = np.ascontiguousarray(mask)
+      height, width = mask.shape
+      self.lib.TessBaseAPISetImage(api, mask.ctypes.data, width, height, 1, width)
+      text = self.lib.TessBaseAPIGetUTF8Text(api)
+      if not text:
+         return ''
+      try:
+         return ctypes.string_at(text).decode('utf-8').strip()
+      finally:
+         self.lib.TessDeleteText(text)
+
+   def close(self) -> None:
+      for api in self.apis.values():
+         self.lib.TessBaseAPIDelete(api)
+      self.apis.clear()
+
+   def __create(self, config: str) -> int:
+      language, psm, variables = parse_config(config)
+      api = self.lib.TessBaseAPICreate()
+      if self.lib.TessBaseAPIInit3(api, self.tessdata, language.encode()) != 0:
+         self.lib.TessBaseAPIDelete(api)
+         raise OSError(f'Unable to load tesseract language {language}')
+      for name, value in variables.items():
+         self.lib.TessBaseAPISetVariable(api, name.encode(), value.encode())
+      # the command line defaults to automatic page segmentation, the API not
+      self.lib.TessBaseAPISetPageSegMode(api, 3 if psm is None else psm)
+      return api
+
+class _CliEngine():
+   # pytesseract, for machines without the shared library; still runs in
+   # parallel, only without the warm engine
+   def __init__(self, tess_cmd: t.Optional[str]) -> None:
+      import pytesseract
+      self.pytesseract = pytesseract
+      if tess_cmd:
+         pytesseract.pytesseract.tesseract_cmd = tess_cmd
+
+   def read(self, mask: np.ndarray, config: str) -> str:
+      return self.pytesseract.image_to_string(mask, config=config).strip()
+
+   def close(self) -> None:
+      pass
+
+def _cpu_seconds() -> float:
+   # os.times() has no children's time on Windows, there it is 0
+   times = os.times()
+   return times.user + times.system + times.children_user + times.children_system
+
+def _worker_main(connection, shm_name: str, tessdata: t.Optional[str], lib_path: t.Optional[str], tess_cmd: t.Optional[str]) -> None:
+   # Runs in the worker process: crops arrive in the shared segment, the
+   # pipe only carries their shape and config. Every reply carries the CPU
+   # time the worker has used so far, a CLI engine's finished tesseract runs
+   # included where the OS reports them.
+   shm = shared_memory.SharedMemory(name=shm_name)
+   mask = None
+   try:
+      engine = _CApiEngine(tessdata, lib_path)
+      connection.send(('ready', 'capi', _cpu_seconds()))
+   except Exception as e:
+      engine = _CliEngine(tess_cmd)
+      connection.send(('ready', f'cli ({e})', _cpu_seconds()))
+
+   try:
+      while True:
+         request = connection.recv()
+         if request is None:
+            break
+         shape, config = request
+         mask = np.ndarray(shape, np.uint8, buffer=shm.buf)
+         try:
+            text = engine.read(mask, config)
+         except Exception as e:
+            connection.send(('error', f'{type(e).__name__}: {e}', _cpu_seconds()))
+         else:
+            connection.send(('ok', text, _cpu_seconds()))
+   finally:
+      engine.close()
+      # the view has to go before the segment can be closed
+      mask = None
+      shm.close()
+
+class _Worker():
+   def __init__(self, context, max_crop_bytes: int, tessdata: str, lib_path: str, tess_cmd: str) -> None:
+      self.shm = shared_memory.SharedMemory(create=True, size=max_crop_bytes)
+      self.connection, child_connection = context.Pipe()
+      self.process = context.Process(
+         target=_worker_main,
+         args=(child_connection, self.shm.name, tessdata, lib_path, tess_cmd),
+         name='ocr-worker',
+         daemon=True
+      )
+      self.process.start()
+      child_connection.close()
+      try:
+         _, self.engine, self.cpu_seconds = self.connection.recv()
+      except EOFError:
+         self.process.join(2)
+         self.connection.close()
+         self.shm.close()
+         self.shm.unlink()
+         raise RuntimeError(f'OCR worker exited on start with code {self.process.exitcode}')
+
+   def read(self, mask: np.ndarray, config: str) -> str:
+      if mask.nbytes > self.shm.size:
+         raise ValueError(f'{mask.shape} crop does not fit the {self.shm.size} byte OCR buffer')
+      np.ndarray(mask.shape, np.uint8, buffer=self.shm.buf)[:] = mask
+      self.connection.send((mask.shape, config))
+      status, text, self.cpu_seconds = self.connection.recv()
+      if status != 'ok':
+         raise RuntimeError(f'OCR worker failed: {text}')
+      return text
+
+   def close(self) -> None:
+      try:
+         self.connection.send(None)
+      except (OSError, ValueError):
+         pass
+      self.process.join(2)
+      if self.process.is_alive():
+         self.process.terminate()
+      self.connection.close()
+      self.shm.close()
+      self.shm.unlink()
+
+class OcrExecutor():
+   # A few long-lived worker processes, each with its own tesseract engine
+   # (libtesseract when it can be loaded, the tesseract executable when not)
+   # and its own shared memory segment for crops. submit() returns a Future,
+   # so the crops of one frame are read side by side.
+   def __init__(
+      self,
+      workers: int = 2,
+      tessdata: str = None,
+      lib_path: str = None,
+      tess_cmd: str = None,
+      max_crop_bytes: int = 1 << 20
+   ) -> None:
+      context = multiprocessing.get_context('spawn')
+      self._workers = [_Worker(context, max_crop_bytes, tessdata, lib_path, tess_cmd) for _ in range(workers)]
+      self._idle = queue.Queue()
+      for worker in self._workers:
+         self._idle.put(worker)
+      self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocr')
+      # the shared memory segments outlive the process unless unlinked
+      atexit.register(self.close)
+      logger.info(f'Started {workers} OCR workers: {", ".join(worker.engine for worker in self._workers)}')
+
+   def submit(self, mask: np.ndarray, config: str) -> Future:
+      return self._threads.submit(self.__read, mask.copy(), config)
+
+   def read(self, mask: np.ndarray, config: str) -> str:
+      return self.submit(mask, config).result()
+
+   def cpu_seconds(self) -> float:
+      # CPU time of the workers as of their last reply
+      return sum(worker.cpu_seconds for worker in self._workers)
+
+   def close(self) -> None:
+      atexit.unregister(self.close)
+      self._threads.shutdown(wait=True)
+      for worker in self._workers:
+         worker.close()
+      self._workers = []
+
+   def __read(self, mask: np.ndarray, config: str) -> str:
+      worker = self._idle.get()
+      try:
+         return worker.read(mask, config)
+      finally:
+         self._idle.put(worker)
+
+def executor_from_env(tess_cmd: str = None) -> t.Optional[OcrExecutor]:
+   # VALORPC_OCR_WORKERS=<n> starts n workers, TESSDATA_PREFIX points them at
+   # the traineddata when tesseract is not installed system wide
+   workers = int(os.getenv('VALORPC_OCR_WORKERS', '0') or 0)
+   if workers <= 0:
+      return None
+
+   # a bundled tesseract (Tesseract-OCR/ on Windows) keeps its library and
+   # traineddata next to the executable
+   tessdata = os.getenv('TESSDATA_PREFIX')
+   lib_path = None
+   if tess_cmd and os.path.isabs(tess_cmd):
+      bundle = os.path.dirname(tess_cmd)
+      if tessdata is None and os.path.isdir(os.path.join(bundle, 'tessdata')):
+         tessdata = os.path.join(bundle, 'tessdata')
+      libraries = glob.glob(os.path.join(bundle, 'libtesseract*.dll'))
+      lib_path = libraries[0] if libraries else None
+
+   try:
+      return OcrExecutor(workers, tessdata=tessdata, lib_path=lib_path, tess_cmd=tess_cmd)
+   except Exception as e:
+      logger.warning(f'Unable to start OCR workers, reading in process: {e}')
+      return None
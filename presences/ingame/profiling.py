@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import threading
+import typing as t
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+import numpy as np
+
+# histogram bucket upper bounds in milliseconds, the last bucket is open
+default_bucket_edges = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+class _StageTimer():
+   def __init__(self, profiler: 'StageProfiler', stage: str) -> None:
+      self.profiler = profiler
+      self.stage = stage
+
+   def __enter__(self) -> None:
+      self.start = time.perf_counter()
+
+   def __exit__(self, *exc_info) -> None:
+      self.profiler.record(self.stage, time.perf_counter() - self.start)
+
+class _FrameTimer():
+   def __init__(self, profiler: 'StageProfiler') -> None:
+      self.profiler = profiler
+
+   def __enter__(self) -> None:
+      self.profiler._frame_stages = {}
+      self.start = time.perf_counter()
+
+   def __exit__(self, *exc_info) -> None:
+      self.profiler._end_frame(time.perf_counter() - self.start)
+
+class StageProfiler():
+   # Keeps the last `window` durations of every pipeline stage. Inside a
+   # frame() block the stages are summed, so one sample is one frame's worth
+   # of e.g. binarization, and the frame itself is recorded as 'frame'.
+   # Every `log_interval` seconds a summary is logged and, with export_path,
+   # written as JSON.
+   def __init__(
+      self,
+      window: int = 512,
+      log_interval: t.Optional[float] = None,
+      export_path: str = None,
+      bucket_edges: t.Sequence[float] = default_bucket_edges
+   ) -> None:
+      self.window = window
+      self.log_interval = log_interval
+      self.export_path = export_path
+      self.bucket_edges = bucket_edges
+      self.samples: t.Dict[str, t.Deque[float]] = {}
+      self._frame_stages = None
+      self._lock = threading.Lock()
+      self._last_logged = time.monotonic()
+
+   def stage(self, name: str) -> _StageTimer:
+      return _StageTimer(self, name)
+
+   def frame(self) -> _FrameTimer:
+      return _FrameTimer(self)
+
+   def record(self, stage: str, seconds: float) -> None:
+      if self._frame_stages is not None:
+         self._frame_stages[stage] = self._frame_stages.get(stage, 0) + seconds
+         return
+
+      with self._lock:
+         samples = self.samples.get(stage)
+         if samples is None:
+            samples = self.samples[stage] = deque(maxlen=self.window)
+         samples.append(seconds)
+
+   def summary(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+      with self._lock:
+         snapshot = {stage: np.array(samples)*1000 for stage, samples in self.samples.items() if samples}
+
+      summary = {}
+      for stage, ms in snapshot.items():
+         counts = np.bincount(np.searchsorted(self.bucket_edges, ms), minlength=len(self.bucket_edges) + 1)
+         summary[stage] = {
+            'count': len(ms),
+            'p50_ms': float(np.percentile(ms, 50)),
+            'p95_ms': float(np.percentile(ms, 95)),
+            'mean_ms': float(ms.mean()),
+            'max_ms': float(ms.max()),
+            # bucket i holds samples up to bucket_edges_ms[i], the last one the rest
+            'histogram': counts.tolist(),
+         }
+      return summary
+
+   def export(self, path: str = None) -> None:
+      path = path or self.export_path
+      os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+      with open(path, mode='w') as f:
+         json.dump({
+            'created': time.time(),
+            'window': self.window,
+            'bucket_edges_ms': list(self.bucket_edges),
+            'stages': self.summary(),
+         }, f, indent=4)
+
+   def log_summary(self) -> None:
+      summary = self.summary()
+      if not summary:
+         return
+      logger.info('Stage timings p50/p95 ms: ' + ', '.join(
+         f'{stage} {stat["p50_ms"]:.2f}/{stat["p95_ms"]:.2f}' for stage, stat in summary.items()
+      ))
+
+   def maybe_report(self) -> None:
+      if self.log_interval is None or time.monotonic() - self._last_logged < self.log_interval:
+         return
+      self._last_logged = time.monotonic()
+      self.log_summary()
+      if self.export_path:
+         try:
+            self.export()
+         except OSError as e:
+            logger.warning(f'Unable to write stage timings to {self.export_path}: {e}')
+
+   def _end_frame(self, seconds: float) -> None:
+      stages = self._frame_stages
+      self._frame_stages = None
+      for stage, stage_seconds in stages.items():
+         self.record(stage, stage_seconds)
+      self.record('frame', seconds)
+      self.maybe_report()
+
+def profiler_from_env(export_path: str = None) -> t.Optional[StageProfiler]:
+   # VALORPC_PROFILE=<seconds> turns profiling on, logging (and exporting)
+   # a summary that often
+   interval = float(os.getenv('VALORPC_PROFILE', '0') or 0)
+   if interval <= 0:
+      return None
+   return StageProfiler(log_interval=interval, export_path=export_path)
@@ -1,38 +1,32 @@
 # 쓰레기 코드
 
-import ctypes
-from datetime import datetime
+import contextlib
 import typing as t
 import logging
-import sys
 
 logger = logging.getLogger(__name__)
 
 import cv2
 import numpy as np
 import pytesseract
-from PIL import Image, ImageGrab
-
+from PIL import Image
+
+from . import binarize, glyphs, calibration
+from .capture import CaptureBackend, create_backend
+from .change_gate import ChangeGate
+from .ocr_cache import OcrCache
+from .ocr_executor import OcrExecutor
+from .recorder import KeyLabeler, SampleRecorder
+from .signatures import PixelSignatures
+from .debug_sink import DebugSink
+from .frame import Frame, FrameBuffers
+from .hud import HudLayout, HudRegion, WhiteMask, RedMask, Dilate, Erode, TextRead, SignatureRead, PixelRead
+from .profiling import StageProfiler
 from .pixel_list import (buy_phase_bwpixel_list, match_point_bwpixel_list,
                          match_point_ot_pixel_list, round_lost_bwpixel_list,
                          round_won_bwpixel_list, ot_pixel_list, endgame_pixel_list,
                          clutch_pixel_list)
 
-# Handle Windows-specific screen size detection
-if sys.platform == 'win32':
-    import win32api
-    user32 = ctypes.windll.user32
-    screen_size = user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)
-else:
-    # On Linux, use a default or try to detect screen size
-    try:
-        img = ImageGrab.grab()
-        screen_size = img.size
-    except Exception:
-        # Fallback to common resolution
-        screen_size = (1920, 1080)
-    logger.warning(f'Screen size detected as {screen_size}')
-
 recording_key_presses_to_text = {
    0xDC: '', # \| key
    0x30: '0',
@@ -70,36 +64,139 @@ timer_tes_config = (
    " -l eng"
    " "
 )
+# Regions read with the same config are batched into one call: laid side by
+# side on one line and read as a line with that config's language and
+# whitelist, so a batch reads each region as its own call would. A frame
+# reads at most one timer, so only the scores batch.
+batch_tes_configs = {
+   score_tes_config: (
+      "-c tessedit"
+      "_char_whitelist=0123456789"
+      " --psm 7"
+      " -l val4"
+      " "
+   ),
+}
+batch_padding = 16 # blank pixels around the regions of a batch
 
 window_y = -500
 
+# <label>_<fingerprint>.gt.txt + .png pairs written by SampleRecorder
+training_dataset_path = 'valorant_scoreboard_training/ocrd-testset'
+
+blue_score_region = (0.1, 0.1, 0.188, 0.24)
+red_score_region = (0.812, 0.1, 0.9, 0.24)
+timer_region = (0.3, 0.1, 0.7, 0.24)
+state_region = (0.15, 0.59, 0.85, 0.82)
+spike_pixel_position = (0.52, 0.08)
+# what a region-only capture grabs: the score/timer band (which also holds the
+# spike pixel) and the state banner
+capture_regions = (
+   (0.1, 0.08, 0.9, 0.24),
+   state_region,
+)
+
+# checked in this order, the first state whose probes all match wins
+state_signatures = PixelSignatures((
+   ('buy phase', (buy_phase_bwpixel_list,)),
+   ('match point', (match_point_bwpixel_list, match_point_ot_pixel_list)),
+   ('round won', (round_won_bwpixel_list,)),
+   ('round lost', (round_lost_bwpixel_list,)),
+   ('clutch', (clutch_pixel_list,)),
+   ('overtime', (ot_pixel_list,)),
+   ('endgame', (endgame_pixel_list,)),
+))
+
+# Everything the top bar reader looks at. Regions with the same colour
+# predicate are binarized in one pass (the scores and the timer's white digits
+# share one), see hud.HudLayout. Other modes extend this with their own
+# read-outs.
+top_bar_hud = HudLayout((
+   HudRegion('blue', blue_score_region, WhiteMask(255), reader=TextRead(score_tes_config)),
+   HudRegion('red', red_score_region, WhiteMask(255), reader=TextRead(score_tes_config)),
+   HudRegion('timer_w', timer_region, WhiteMask(255), Dilate(2), TextRead(timer_tes_config)),
+   HudRegion('timer_r', timer_region, RedMask(), Dilate(3), TextRead(timer_tes_config)),
+   HudRegion('state', state_region, WhiteMask(235), Erode(6), SignatureRead(state_signatures)),
+   # the planted spike turns the top bar red above the timer
+   HudRegion('spike', reader=PixelRead(spike_pixel_position, (121, 0, 0), (255, 4, 4))),
+))
+score_regions = ('blue', 'red')
+timer_regions = ('timer_w', 'timer_r')
+
+_no_stage = contextlib.nullcontext()
+
 class TopBarReader():
-   def __init__(self, record: bool, debug: bool, tess_path: str) -> None:
+   def __init__(self, record: bool, debug: bool, tess_path: str, glyph_atlas_path: str = glyphs.default_atlas_path, debug_dump_path: str = None, batch_ocr: bool = False, ocr_executor: OcrExecutor = None, hud: HudLayout = top_bar_hud) -> None:
       self.record = record
-      self.debug = debug
+      self.recorder = SampleRecorder(training_dataset_path) if record else None
+      self.key_labeler = KeyLabeler(recording_key_presses_to_text)
+      # what tesseract has to read in a frame is read with one call per config
+      self.batch_ocr = batch_ocr
+      # warm tesseract worker processes, reads of a frame run side by side
+      self.ocr_executor = ocr_executor
+      self.debug = debug or debug_dump_path is not None
+      # debug images are rendered on the sink's own thread and shown by
+      # record_frame, debug_dump_path also (or with debug off, only) writes
+      # them to disk
+      self.debug_sink = DebugSink(display=debug, dump_path=debug_dump_path) if self.debug else None
       pytesseract.pytesseract.tesseract_cmd = tess_path
-
-   def record_frame(self, print_screen: Image.Image) -> t.Tuple[t.Tuple[int, int], t.Tuple[int, int, int], str]:
-      scores = self.get_scores(print_screen)
-      timer = self.get_timer(print_screen)
-      if scores == (None, None) or timer == (None, None, None):
-         scores = (None, None)
-         timer = (None, None, None)
-         status = None
-      else:
-         pass
-         # timer = self.get_timer(print_screen)
-         # status = self.get_match_status(print_screen)
-         status = self.get_match_status(print_screen)
-      return scores, timer, status
-
-   def get_match_status(self, print_screen: Image.Image) -> str:
-      image_size = print_screen.size
-
-      state_crop = Image.fromarray(self._erode(self._get_white_pixels(print_screen.crop((
-         round(image_size[0]*0.15), round(image_size[1]*0.59),
-         round(image_size[0]*0.85), round(image_size[1]*0.82)
-      )), 235), 6))
+      self.hud = hud
+      self.buffers = FrameBuffers()
+      # in-process digit reader, tesseract is only used when it is unsure
+      self.glyph_classifier = glyphs.GlyphClassifier.from_path(glyph_atlas_path)
+      # regions whose masks match the previous frame reuse its reading
+      self.change_gate = ChangeGate()
+      # readings of masks seen any time before, shared by scores and timer
+      self.ocr_cache = OcrCache()
+      # how close the last state crop came to each state, 0 to 1
+      self.state_scores = {}
+      # times crop/binarize/morphology/ocr/classify (and the ScreenReader's
+      # capture) when set, see profiling.profiler_from_env
+      self.profiler: t.Optional[StageProfiler] = None
+
+   def close(self) -> None:
+      # stops the OCR workers and the recorder and debug threads
+      if self.ocr_executor is not None:
+         self.ocr_executor.close()
+         self.ocr_executor = None
+      if self.recorder is not None:
+         self.recorder.close()
+      if self.debug_sink is not None:
+         self.debug_sink.close()
+
+   def record_frame(self, print_screen: t.Union[Image.Image, Frame], read_timer: bool = True) -> t.Tuple[t.Tuple[int, int], t.Tuple[int, int, int], str]:
+      # without read_timer the timer is left as (None, None, None) and only
+      # the scores decide whether the top bar is showing
+      with self._frame():
+         if not isinstance(print_screen, Frame):
+            print_screen = Frame(print_screen)
+
+         # the score and timer masks in one pass over the top bar
+         masks = self.hud_masks(print_screen, score_regions + timer_regions if read_timer else score_regions)
+         score_masks = tuple(masks[name] for name in score_regions)
+         timer_masks = tuple(masks[name] for name in timer_regions) if read_timer else None
+         if self.batch_ocr or self.ocr_executor is not None:
+            with self.stage('ocr'):
+               self._prefetch_text(self._frame_reads(score_masks, timer_masks))
+
+         scores = self.get_scores(print_screen, score_masks)
+         timer = self.get_timer(print_screen, timer_masks) if read_timer else (None, None, None)
+         if scores == (None, None) or (read_timer and timer == (None, None, None)):
+            scores = (None, None)
+            timer = (None, None, None)
+            status = None
+         else:
+            pass
+            # timer = self.get_timer(print_screen)
+            # status = self.get_match_status(print_screen)
+            status = self.get_match_status(print_screen)
+         if self.debug_sink is not None:
+            # debug windows are drawn on the thread reading the frames
+            self.debug_sink.pump()
+         return scores, timer, status
+
+   def get_match_status(self, print_screen: Frame) -> str:
+      state_crop = self.hud_masks(print_screen, ('state',))['state']
 
       # spike_crop = print_screen.crop((
       #    round(image_size[0]*0.38), round(image_size[1]*0.06),
@@ -108,96 +205,63 @@ class TopBarReader():
       # cv2.imshow('spike', cv2.cvtColor(np.array(spike_crop),
       # cv2.COLOR_BGR2RGB))
 
-      status = 'in progress'
-
-      if self._check_bwpixel_list(state_crop, buy_phase_bwpixel_list, False):
-         status = 'buy phase'
-      elif self._check_bwpixel_list(state_crop, match_point_bwpixel_list, False) or self._check_bwpixel_list(state_crop, match_point_ot_pixel_list, False):
-         status = 'match point'
-      elif self._check_bwpixel_list(state_crop, round_won_bwpixel_list, False):
-         status = 'round won'
-      elif self._check_bwpixel_list(state_crop, round_lost_bwpixel_list, False):
-         status = 'round lost'
-      elif self._check_bwpixel_list(state_crop, clutch_pixel_list, True):
-         status = 'clutch'
-      elif self._check_bwpixel_list(state_crop, ot_pixel_list, False):
-         status = 'overtime'
-      elif self._check_bwpixel_list(state_crop, endgame_pixel_list, False):
-         status = 'endgame'
-      else:
-         selected_pos = (round(image_size[0]*0.52), round(image_size[1]*0.08))
-         selected_pixel = print_screen.getpixel(selected_pos)
-         # print_screen.putpixel(selected_pos, (255, 0, 255))
-         
-         if (selected_pixel[0] > 120) and (selected_pixel[1] < 5) and (selected_pixel[2] < 5):
-            status = 'spike planted'
+      status, self.state_scores = self.read_hud(print_screen, ('state',), {'state': state_crop})['state']
+      if status is None:
+         status = 'spike planted' if self.read_hud(print_screen, ('spike',))['spike'] else 'in progress'
 
       if self.debug:
          size_scale = 4
-         # state_crop.thumbnail(
-         #    (
-         #       round(state_crop.width*size_scale),
-         #       round(state_crop.height*size_scale)
-         #    ),
-         #    Image.Resampling.LANCZOS
-         # )
-         cv2.imshow(
-            'status',
-            cv2.resize(
-               cv2.cvtColor(
-                  np.array(state_crop),
-                  cv2.COLOR_BGR2RGB
-               ),
-               (
-                  round(state_crop.width * size_scale),
-                  round(state_crop.height * size_scale)
-               ),
-               interpolation = cv2.INTER_AREA
-            )
+         state_height, state_width = state_crop.shape
+         closest_state = max(self.state_scores, key=self.state_scores.get)
+
+         def mark_probes(state_display):
+            for pos, value in state_signatures.positions((state_height, state_width), closest_state):
+               state_display[pos[1], pos[0]] = (0, value, 255-value)
+
+         self.debug_sink.show(
+            'status', state_crop,
+            (round(-1080/2)-round(state_width*size_scale*0.5), window_y + print_screen.height + 100),
+            color=cv2.COLOR_GRAY2BGR,
+            size=(round(state_width * size_scale), round(state_height * size_scale)),
+            annotate=mark_probes
          )
-         cv2.moveWindow('status', round(-1080/2)-round(state_crop.width*size_scale*0.5), window_y + print_screen.height + 100)
 
       return status
 
-   def get_timer(self, print_screen: Image.Image) -> t.Tuple[int, int, int]:
-      image_size = print_screen.size
-
-      timer_crop = print_screen.crop((
-         round(image_size[0]*0.3), round(image_size[1]*0.1),
-         round(image_size[0]*0.7), round(image_size[1]*0.24)
-      ))
-
-      timer_white = self._get_white_pixels(timer_crop.copy())
-      timer_red = self._get_red_pixels(timer_crop.copy())
+   def get_timer_masks(self, print_screen: Frame) -> t.Tuple[np.ndarray, np.ndarray]:
+      masks = self.hud_masks(print_screen, timer_regions)
+      return masks['timer_w'], masks['timer_r']
 
-      timer_white = self._dilate(timer_white, 2)
-      timer_red = self._dilate(timer_red, 3)
+   def get_timer(self, print_screen: Frame, masks: t.Tuple[np.ndarray, np.ndarray] = None) -> t.Tuple[int, int, int]:
+      timer_white, timer_red = masks or self.get_timer_masks(print_screen)
+      timer_width = timer_white.shape[1]
       
       if self.debug:
-         cv2.imshow('timer_w', timer_white)
-         cv2.moveWindow('timer_w', round(-1080/2)-round(timer_crop.width*0), window_y + print_screen.height)
-         cv2.imshow('timer_r', timer_red)
-         cv2.moveWindow('timer_r', round(-1080/2)-round(timer_crop.width*1), window_y + print_screen.height)
+         self.debug_sink.show('timer_w', timer_white, (round(-1080/2)-round(timer_width*0), window_y + print_screen.height))
+         self.debug_sink.show('timer_r', timer_red, (round(-1080/2)-round(timer_width*1), window_y + print_screen.height))
 
+      unchanged, timer = self.change_gate.lookup('timer', timer_white, timer_red)
+      if not unchanged:
+         with self.stage('ocr'):
+            timer = self._read_timer(timer_white, timer_red)
+         self.change_gate.store('timer', timer, timer_white, timer_red)
+
+      return timer
+
+   def _read_timer(self, timer_white: np.ndarray, timer_red: np.ndarray) -> t.Tuple[int, int, int]:
       mins = 0
       secs = 0
       ms = 0
 
-      if not self._check_empty_image(Image.fromarray(timer_white)):
-         reading = pytesseract.image_to_string(
-            timer_white,
-            config = timer_tes_config
-         ).strip()
+      if not self._check_empty_image(timer_white):
+         reading = self._read_text(timer_white, timer_tes_config)
          
          try:
             mins, secs = reading.split(':')
          except:
             return None, None, None
-      elif not self._check_empty_image(Image.fromarray(timer_red)):
-         reading = pytesseract.image_to_string(
-            timer_red,
-            config = timer_tes_config
-         ).strip()
+      elif not self._check_empty_image(timer_red):
+         reading = self._read_text(timer_red, timer_tes_config)
          
          try:
             secs, ms = reading.split('.')
@@ -217,147 +281,211 @@ class TopBarReader():
 
       return mins, secs, ms
 
-   def get_scores(self, print_screen: Image.Image) -> t.Tuple[int, int]:
-      image_size = print_screen.size
+   def get_score_masks(self, print_screen: Frame) -> t.Tuple[np.ndarray, np.ndarray]:
+      masks = self.hud_masks(print_screen, score_regions)
+      return masks['blue'], masks['red']
 
-      b_crop = self._get_white_pixels(print_screen.crop((
-         round(image_size[0]*0.1), round(image_size[1]*0.1),
-         round(image_size[0]*0.188), round(image_size[1]*0.24)
-      )))
-      r_crop = self._get_white_pixels(print_screen.crop((
-         round(image_size[0]*0.812), round(image_size[1]*0.1),
-         round(image_size[0]*0.9), round(image_size[1]*0.24)
-      )))
+   def get_scores(self, print_screen: Frame, masks: t.Tuple[np.ndarray, np.ndarray] = None) -> t.Tuple[int, int]:
+      b_crop, r_crop = masks or self.get_score_masks(print_screen)
 
       if self.debug:
-         cv2.imshow('blue', cv2.cvtColor(np.array(b_crop), cv2.COLOR_BGR2RGB))
-         cv2.moveWindow('blue', -1080, window_y)
-         cv2.imshow('red', cv2.cvtColor(np.array(r_crop), cv2.COLOR_BGR2RGB))
-         cv2.moveWindow('red', -130, window_y)
+         self.debug_sink.show('blue', b_crop, (-1080, window_y))
+         self.debug_sink.show('red', r_crop, (-130, window_y))
 
       if self._check_empty_image(b_crop) or self._check_empty_image(r_crop):
          return None, None
 
-      b_score = pytesseract.image_to_string(
-         b_crop,
-         config=score_tes_config
-      ).strip()
-      r_score = pytesseract.image_to_string(
-         r_crop,
-         config=score_tes_config
-      ).strip()
+      unchanged, scores = self.change_gate.lookup('scores', b_crop, r_crop)
+      if not unchanged:
+         with self.stage('ocr'):
+            b_score = self._read_text(b_crop, score_tes_config)
+            r_score = self._read_text(r_crop, score_tes_config)
 
-      b_score = int(b_score)
-      r_score = int(r_score)
+         try:
+            scores = int(b_score), int(r_score)
+         except ValueError:
+            # a misread, the ReadingFilter fills the frame in from history
+            logger.debug(f'Unreadable scores {b_score!r} - {r_score!r}')
+            return None, None
+         self.change_gate.store('scores', scores, b_crop, r_crop)
 
       if self.record:
-         self._prompt_record(r_crop)
-
-      return b_score, r_score
-
-   def _check_bwpixel_list(self, image: Image.Image, bwpixel_list: list, debug: bool = False) -> bool:
-      for pixel_check in bwpixel_list:
-         pos = (
-            round(pixel_check[0][0] * image.width),
-            round(pixel_check[0][1] * image.height)
-         )
-         pixel = image.getpixel(pos)
-
-         if debug:
-            image.putpixel(pos, (255-pixel_check[1], pixel_check[1], 0))
-         
-         if (sum(pixel)/3 != pixel_check[1]):
-            return False
-
-      return True
-
-   def _dilate(self, image: Image.Image, dilation: int) -> np.ndarray:
-      image = cv2.cvtColor(np.array(image), cv2.COLOR_BGR2RGB)
-      kernel = np.ones((dilation, dilation), np.uint8)
-      return cv2.erode(image, kernel, iterations=1)
-      
-   def _erode(self, image: Image.Image, dilation: int) -> np.ndarray:
-      image = cv2.cvtColor(np.array(image), cv2.COLOR_BGR2RGB)
-      kernel = np.ones((dilation, dilation), np.uint8)
-      return cv2.dilate(image, kernel, iterations=1)
-
-   def _check_empty_image(self, image: Image.Image) -> bool:
-      extrema = image.convert("L").getextrema()
-      if extrema == (255, 255):
-         return True
-      else:
-         return False
-
-   def _prompt_record(self, image: Image.Image) -> None:
-      def record(text):
-         name = datetime.now().strftime(f"{text}_%m_%d_%Y_%H_%M_%S")
-
-         path = 'valorant_scoreboard_training/ocrd-testset'
-
-         with open(f'{path}/{name}.gt.txt', mode='w') as f:
-            f.write(text)
-         image.save(f'{path}/{name}.png')
-
-         logger.info('recorded', name)
-
-      for key, text in recording_key_presses_to_text.items():
-         if win32api.GetKeyState(key) < 0:
-            while win32api.GetKeyState(key) < 0:
-               pass
-            record(text)
-
-      # text = input('Text: ')
-      # if text == '':
-      #    return
-      # else:
-      #    record(text)
-
-   def _get_white_pixels(self, image: Image.Image, min_threshold: int = 255) -> Image.Image:
-      for x in range(image.width):
-         for y in range(image.height):
-            pixel = image.getpixel((x, y))
-
-            if sum(pixel)/3 >= min_threshold:
-               image.putpixel((x, y), (0, 0, 0))
-            else:
-               image.putpixel((x, y), (255, 255, 255))
-
-      return image
-
-   def _get_red_pixels(self, image: Image.Image) -> Image.Image:
-      for x in range(image.width):
-         for y in range(image.height):
-            pixel = image.getpixel((x, y))
-
-            if pixel[0] > 253 and pixel[1] < 3 and pixel[2] < 3:
-               image.putpixel((x, y), (0, 0, 0))
-            else:
-               image.putpixel((x, y), (255, 255, 255))
-
-      return image
-
+         self._record_sample(r_crop)
+
+      return scores
+
+   def hud_masks(self, print_screen: Frame, names: t.Sequence[str]) -> t.Dict[str, np.ndarray]:
+      # in reused buffers, overwritten by the next call
+      return self.hud.masks(print_screen, names, self.buffers, self.stage)
+
+   def read_hud(self, print_screen: Frame, names: t.Sequence[str], masks: t.Dict[str, np.ndarray] = None) -> t.Dict[str, t.Any]:
+      # readings of any regions of the layout, text through _read_text
+      return self.hud.read(print_screen, names, self.buffers, self.stage, self._read_text, masks)
+
+   def stage(self, name: str) -> t.ContextManager:
+      if self.profiler is None:
+         return _no_stage
+      return self.profiler.stage(name)
+
+   def _frame(self) -> t.ContextManager:
+      if self.profiler is None:
+         return _no_stage
+      return self.profiler.frame()
+
+   def _read_text(self, mask: np.ndarray, config: str) -> str:
+      key = self.ocr_cache.key(mask, config)
+      text = self.ocr_cache.get(key)
+      if text is not None:
+         return text
+
+      text = self._classify_glyphs(mask)
+      if text is None:
+         text = self._tesseract(mask, config)
+      self.ocr_cache.put(key, text)
+      return text
+
+   def _tesseract(self, mask: np.ndarray, config: str) -> str:
+      if self.ocr_executor is not None:
+         return self.ocr_executor.read(mask, config)
+      return pytesseract.image_to_string(mask, config=config).strip()
+
+   def _classify_glyphs(self, mask: np.ndarray) -> t.Optional[str]:
+      # None when there is no atlas or it is not sure enough
+      if self.glyph_classifier is None:
+         return None
+
+      text, confidence = self.glyph_classifier.classify(mask)
+      if confidence >= self.glyph_classifier.min_confidence:
+         return text
+      logger.debug(f'Glyph read {text!r} at {confidence:.2f}, falling back to tesseract')
+      return None
+
+   def _frame_reads(self, score_masks: t.Tuple[np.ndarray, np.ndarray], timer_masks: t.Optional[t.Tuple[np.ndarray, np.ndarray]]) -> t.List[t.Tuple[np.ndarray, str]]:
+      # the masks get_scores and get_timer will read, leaving out blank ones
+      # and those the change gate already has a reading for
+      reads = []
+      if not any(self._check_empty_image(mask) for mask in score_masks) and not self.change_gate.unchanged('scores', *score_masks):
+         reads.extend((mask, score_tes_config) for mask in score_masks)
+      if timer_masks is not None and not self.change_gate.unchanged('timer', *timer_masks):
+         timer_white, timer_red = timer_masks
+         if not self._check_empty_image(timer_white):
+            reads.append((timer_white, timer_tes_config))
+         elif not self._check_empty_image(timer_red):
+            reads.append((timer_red, timer_tes_config))
+      return reads
+
+   def _prefetch_text(self, reads: t.List[t.Tuple[np.ndarray, str]]) -> None:
+      # Reads what neither the OCR cache nor the glyph classifier can answer,
+      # side by side on the OCR workers or else with one tesseract call per config,
+      # and leaves the texts in the cache, where _read_text picks them up.
+      pending = []
+      for mask, config in reads:
+         key = self.ocr_cache.key(mask, config)
+         if key in self.ocr_cache:
+            continue
+         text = self._classify_glyphs(mask)
+         if text is not None:
+            self.ocr_cache.put(key, text)
+         else:
+            pending.append((key, mask, config))
+
+      if self.ocr_executor is not None and pending:
+         futures = [self.ocr_executor.submit(mask, config) for _, mask, config in pending]
+         for (key, _, _), future in zip(pending, futures):
+            self.ocr_cache.put(key, future.result())
+         return
+
+      by_config: t.Dict[str, t.List[t.Tuple[t.Any, np.ndarray]]] = {}
+      for key, mask, config in pending:
+         by_config.setdefault(config, []).append((key, mask))
+      for config, group in by_config.items():
+         if len(group) > 1 and config in batch_tes_configs:
+            texts = self._read_batch([mask for _, mask in group], config)
+         else:
+            texts = [self._tesseract(mask, config) for _, mask in group]
+         for (key, _), text in zip(group, texts):
+            self.ocr_cache.put(key, text)
+
+   def _read_batch(self, masks: t.List[np.ndarray], config: str) -> t.List[str]:
+      # The masks are laid left to right on one white line, a mask's height
+      # apart so their words stay apart, and read with batch_tes_configs[config];
+      # every word found is given back to the mask its box is centred over.
+      gap = max(max(mask.shape[0] for mask in masks), batch_padding)
+      width = sum(mask.shape[1] for mask in masks) + gap*(len(masks) - 1) + batch_padding*2
+      height = max(mask.shape[0] for mask in masks) + batch_padding*2
+      page = np.full((height, width), binarize.PAPER, np.uint8)
+
+      bands = []
+      x = batch_padding
+      for mask in masks:
+         mask_height, mask_width = mask.shape
+         page[batch_padding:batch_padding + mask_height, x:x + mask_width] = mask
+         bands.append((x - gap/2, x + mask_width + gap/2))
+         x += mask_width + gap
+
+      data = pytesseract.image_to_data(page, config=batch_tes_configs[config], output_type=pytesseract.Output.DICT)
+      words = [[] for _ in masks]
+      for text, left, word_width in zip(data['text'], data['left'], data['width']):
+         text = text.strip()
+         if not text:
+            continue
+         centre = left + word_width/2
+         for i, (band_left, band_right) in enumerate(bands):
+            if band_left <= centre < band_right:
+               words[i].append((left, text))
+               break
+
+      return [''.join(text for _, text in sorted(band_words)) for band_words in words]
+
+   def _check_empty_image(self, mask: np.ndarray) -> bool:
+      return binarize.is_blank(mask)
+
+   def _record_sample(self, mask: np.ndarray) -> None:
+      # every distinct crop is kept, labeled with the key pressed on this
+      # frame if any (see recording_key_presses_to_text)
+      self.recorder.submit(mask, self.key_labeler.poll())
 
 class ScreenReader():
-   def __init__(self, score_reader: TopBarReader) -> None:
+   def __init__(self, score_reader: TopBarReader, backend: CaptureBackend = None, calibration_path: str = None, screen_size: t.Tuple[int, int] = None) -> None:
       self.score_reader = score_reader
+      # VALORPC_CAPTURE picks the backend when none is given, see create_backend
+      self.backend = backend or create_backend(regions=capture_regions)
+      # capture box, crop boxes and probe indices for this resolution, kept
+      # per resolution in calibration_path
+      self.calibration = calibration.load_profile(
+         calibration_path,
+         score_reader.hud.crop_regions,
+         score_reader.hud.pixel_positions,
+         score_reader.hud.signature_tables,
+         screen_size
+      )
+      self.calibration.apply(score_reader.hud.signature_tables, score_reader.buffers)
+      self.capture_box = self.calibration.capture_box
+      logger.info(f'Capturing the top bar with the {self.backend.name} backend')
+
+   def display_screen(self, print_screen: Frame) -> None:
+      if self.score_reader.debug_sink is None:
+         return
+      self.score_reader.debug_sink.show(
+         'top bar', print_screen.pixels,
+         (round(-1080/2)-round(print_screen.width/2), window_y),
+         color=cv2.COLOR_RGB2BGR
+      )
+
+   def capture_screen(self) -> Frame:
+      # recorded captures can be played back with VALORPC_CAPTURE=replay:captures/*.png
+      with self.score_reader.stage('capture'):
+         print_screen = Frame(self.backend.grab(self.capture_box))
+      # Image.fromarray(print_screen.pixels).save('captures/capture10.png')
 
-   def display_screen(self, print_screen: Image.Image) -> None:
-      cv2.imshow('top bar', cv2.cvtColor(np.array(print_screen), cv2.COLOR_BGR2RGB))
-      cv2.moveWindow('top bar', round(-1080/2)-round(print_screen.width/2), window_y)
-
-      if cv2.waitKey(25) & 0xFF == ord('q'):
-         cv2.destroyAllWindows()
-
-   def capture_screen(self) -> Image.Image:
-      # image = Image.open('captures/full_cap1.png')
-      # screen_size = (image.width, image.height)
-      # print_screen = image.crop(box=(screen_size[0]*0.4, 0, screen_size[0]*0.6, screen_size[0]*0.15))
+      return print_screen
 
-      # print_screen = Image.open('captures/capture10.png')
-      print_screen = ImageGrab.grab(bbox=(screen_size[0]*0.4, 0, screen_size[0]*0.6, screen_size[0]*0.15))
-      # print_screen.save('captures/capture10.png')
+   def capture_latency(self) -> t.Dict[str, float]:
+      return self.backend.latency_stats()
 
-      return print_screen
+   def close(self) -> None:
+      self.backend.close()
+      self.score_reader.close()
 
 
 if __name__ == '__main__':
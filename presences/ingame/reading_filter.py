@@ -0,0 +1,257 @@
+import typing as t
+import logging
+
+logger = logging.getLogger(__name__)
+
+from .capture_worker import Results, TimedResult
+
+# States the top bar can plausibly move to from each state between two
+# readings. Banners fade back to 'in progress', so it follows almost anything;
+# a buy phase banner never shows straight after a plant, a round result never
+# straight after a buy phase banner.
+buy_banners = {'buy phase', 'match point', 'overtime', 'endgame'}
+round_results = {'round won', 'round lost', 'clutch'}
+state_transitions = {
+   'buy phase': {'in progress'} | buy_banners,
+   'match point': {'in progress'} | buy_banners,
+   'overtime': {'in progress'} | buy_banners,
+   'endgame': {'in progress'} | buy_banners,
+   'in progress': {'spike planted'} | round_results | buy_banners,
+   'spike planted': {'in progress'} | round_results,
+   'round won': {'in progress'} | round_results | buy_banners,
+   'round lost': {'in progress'} | round_results | buy_banners,
+   'clutch': {'in progress', 'spike planted'} | round_results | buy_banners,
+}
+max_timer_secs = 100 # the longest phase, see __get_start_end_from_state
+# the round end, the shortest phase between two buy phases; readings further
+# apart than this may have missed a whole phase in between
+min_phase_secs = 7
+
+# confidence of a field that matches history, took a plausible step, was
+# confirmed after being held, or was replaced from history
+CONFIDENT = 1.0
+PLAUSIBLE = 0.8
+CONFIRMED = 0.6
+CORRECTED = 0.5
+
+class FilteredResult(t.NamedTuple):
+   captured_at: float
+   results: Results
+   timer_read: bool
+   confidence: t.Dict[str, float] # per field: 'scores', 'timer', 'state'
+   stable: bool # the state is the one read, not held back or carried over
+   corrected: t.Tuple[str, ...] # fields replaced from history
+
+class _Candidate():
+   # a reading that broke the rules, adopted once it repeats
+   def __init__(self) -> None:
+      self.value = None
+      self.count = 0
+
+   def see(self, value: t.Any, close: t.Callable[[t.Any, t.Any], bool] = None) -> int:
+      if self.count and (close(self.value, value) if close else self.value == value):
+         self.count += 1
+      else:
+         self.value = value
+         self.count = 1
+      return self.count
+
+   def clear(self) -> None:
+      self.value = None
+      self.count = 0
+
+class ReadingFilter():
+   # Per field temporal filter over the capture worker's readings:
+   #  - scores only ever go up, one round at a time
+   #  - the timer counts down with the clock within a phase
+   #  - states follow state_transitions
+   # A reading breaking a rule is replaced from history (the scores and state
+   # kept, the timer extrapolated) and adopted only once `confirm_frames`
+   # readings in a row agree on it. A frame or two without a readable top bar
+   # within `max_gap` seconds of a good one is bridged with the last values,
+   # so one bad OCR read does not reset the round clock. Readings whose state
+   # was held back or bridged are not stable and should not be published.
+   # After more than `skip_after` seconds without a reading (the scheduler
+   # slows down mid round and waits out Discord's rate limit) any state is
+   # accepted, the phases in between went by unseen.
+   def __init__(self, confirm_frames: int = 2, timer_tolerance: float = 2, max_gap: float = 6, skip_after: float = min_phase_secs) -> None:
+      self.confirm_frames = confirm_frames
+      self.timer_tolerance = timer_tolerance
+      self.max_gap = max_gap
+      self.skip_after = skip_after
+
+      self.accepted = 0
+      self.corrected = 0
+      self.confirmed = 0
+      self.bridged = 0
+      self.reset()
+
+   def reset(self) -> None:
+      self.scores = None
+      self.state = None
+      self.last_seen_at = None
+      # wall time the timer reaches 0 in timer_phase, (state, round)
+      self.deadline = None
+      self.timer_phase = None
+      self.missing = 0
+      self._scores_candidate = _Candidate()
+      self._state_candidate = _Candidate()
+      self._deadline_candidate = _Candidate()
+
+   def update(self, reading: TimedResult) -> FilteredResult:
+      scores, timer, state = reading.results
+      if state is None:
+         return self.__bridge(reading)
+
+      self.missing = 0
+      elapsed = reading.captured_at - self.last_seen_at if self.last_seen_at is not None else 0
+      self.last_seen_at = reading.captured_at
+      confidence = {}
+      corrected = []
+
+      scores, confidence['scores'] = self.__filter_scores(scores)
+      if scores != reading.results[0]:
+         corrected.append('scores')
+      state, confidence['state'] = self.__filter_state(state, elapsed)
+      if state != reading.results[2]:
+         corrected.append('state')
+
+      timer_read = reading.timer_read
+      if timer_read and 'state' in corrected:
+         # the timer belongs to the state that was held back
+         timer_read, timer = False, (None, None, None)
+         confidence['timer'] = CORRECTED
+         corrected.append('timer')
+      elif timer_read:
+         filtered = self.__filter_timer(reading.captured_at, timer, (state, sum(scores)))
+         if filtered is None:
+            timer_read, timer = False, (None, None, None)
+            confidence['timer'] = CORRECTED
+            corrected.append('timer')
+         else:
+            filtered_timer, confidence['timer'] = filtered
+            if filtered_timer != timer:
+               corrected.append('timer')
+            timer = filtered_timer
+      else:
+         confidence['timer'] = CONFIDENT
+
+      if corrected:
+         self.corrected += 1
+         logger.debug(f'Held back {", ".join(corrected)} of {reading.results}')
+      else:
+         self.accepted += 1
+      return FilteredResult(reading.captured_at, (scores, timer, state), timer_read, confidence, 'state' not in corrected, tuple(corrected))
+
+   def stats(self) -> t.Dict[str, int]:
+      return {
+         'accepted': self.accepted,
+         'corrected': self.corrected,
+         'confirmed': self.confirmed,
+         'bridged': self.bridged,
+      }
+
+   def __bridge(self, reading: TimedResult) -> FilteredResult:
+      self.missing += 1
+      if (
+         self.state is None
+         or self.missing >= self.confirm_frames
+         or reading.captured_at - self.last_seen_at > self.max_gap
+      ):
+         # the top bar really is gone
+         self.reset()
+         return FilteredResult(reading.captured_at, reading.results, reading.timer_read, {}, True, ())
+
+      self.bridged += 1
+      confidence = CORRECTED**self.missing
+      return FilteredResult(
+         reading.captured_at,
+         (self.scores, (None, None, None), self.state),
+         False,
+         {'scores': confidence, 'timer': confidence, 'state': confidence},
+         False,
+         ('scores', 'timer', 'state')
+      )
+
+   def __filter_scores(self, scores: t.Tuple[int, int]) -> t.Tuple[t.Tuple[int, int], float]:
+      if self.scores is None or scores == self.scores:
+         self._scores_candidate.clear()
+         self.scores = scores
+         return scores, CONFIDENT
+
+      b_step = scores[0] - self.scores[0]
+      r_step = scores[1] - self.scores[1]
+      if min(b_step, r_step) == 0 and b_step + r_step == 1:
+         self._scores_candidate.clear()
+         self.scores = scores
+         return scores, PLAUSIBLE
+
+      if self._scores_candidate.see(scores) >= self.confirm_frames:
+         # e.g. rounds missed while the game was tabbed out
+         self._scores_candidate.clear()
+         self.confirmed += 1
+         self.scores = scores
+         return scores, CONFIRMED
+      return self.scores, CORRECTED
+
+   def __filter_state(self, state: str, elapsed: float) -> t.Tuple[str, float]:
+      if self.state is None or state == self.state:
+         self._state_candidate.clear()
+         self.state = state
+         return state, CONFIDENT
+
+      if state in state_transitions.get(self.state, ()) or elapsed > self.skip_after:
+         self._state_candidate.clear()
+         self.state = state
+         return state, PLAUSIBLE
+
+      if self._state_candidate.see(state) >= self.confirm_frames:
+         self._state_candidate.clear()
+         self.confirmed += 1
+         self.state = state
+         return state, CONFIRMED
+      return self.state, CORRECTED
+
+   def __filter_timer(
+      self,
+      captured_at: float,
+      timer: t.Tuple[int, int, int],
+      phase: t.Tuple[str, int]
+   ) -> t.Optional[t.Tuple[t.Tuple[int, int, int], float]]:
+      # None when the timer has to be dropped from the reading
+      mins, secs, ms = timer
+      if None in timer:
+         return None
+      # ms is hundredths, see __mins_secs_ms_to_secs
+      remaining = mins*60 + secs + ms*0.01
+      if remaining > max_timer_secs:
+         return self.__expected_timer(captured_at, phase)
+
+      deadline = captured_at + remaining
+      if phase != self.timer_phase:
+         # a new phase restarts the countdown
+         self._deadline_candidate.clear()
+         self.timer_phase = phase
+         self.deadline = deadline
+         return timer, PLAUSIBLE
+
+      if abs(deadline - self.deadline) <= self.timer_tolerance:
+         self._deadline_candidate.clear()
+         self.deadline = deadline
+         return timer, CONFIDENT
+
+      close = lambda a, b: abs(a - b) <= self.timer_tolerance
+      if self._deadline_candidate.see(deadline, close) >= self.confirm_frames:
+         # the clock really drifted
+         self._deadline_candidate.clear()
+         self.confirmed += 1
+         self.deadline = deadline
+         return timer, CONFIRMED
+      return self.__expected_timer(captured_at, phase)
+
+   def __expected_timer(self, captured_at: float, phase: t.Tuple[str, int]) -> t.Optional[t.Tuple[t.Tuple[int, int, int], float]]:
+      if phase != self.timer_phase or self.deadline is None:
+         return None
+      remaining = max(self.deadline - captured_at, 0)
+      mins, secs = divmod(int(remaining), 60)
+      return (mins, secs, int(remaining % 1 * 100)), CORRECTED
@@ -0,0 +1,175 @@
+import os
+import sys
+import hashlib
+import threading
+import typing as t
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+import numpy as np
+from PIL import Image
+
+from .binarize import INK
+
+if sys.platform == 'win32':
+   import win32api
+
+def mask_fingerprint(mask: np.ndarray) -> str:
+   digest = hashlib.blake2b(digest_size=8)
+   digest.update(np.packbits(mask == INK).tobytes())
+   digest.update(np.array(mask.shape, np.int32).tobytes())
+   return digest.hexdigest()
+
+class KeyLabeler():
+   # Turns key presses into labels without waiting on the key: a label is
+   # given once, on the frame its key goes down. Only Windows exposes the
+   # global key state, elsewhere nothing is ever pressed.
+   def __init__(self, keys_to_text: t.Dict[int, str]) -> None:
+      self.keys_to_text = keys_to_text
+      self._down = set()
+
+   def poll(self) -> t.Optional[str]:
+      if sys.platform != 'win32':
+         return None
+
+      label = None
+      for key, text in self.keys_to_text.items():
+         if win32api.GetAsyncKeyState(key) & 0x8000:
+            if key not in self._down:
+               self._down.add(key)
+               label = text
+         else:
+            self._down.discard(key)
+      return label
+
+class SampleRecorder():
+   # Collects training crops for the glyph atlas and tesseract without
+   # holding up the frame: submit() copies the mask into a bounded queue
+   # (dropping it when the queue is full) and a background thread writes the
+   # queue out in batches. Each distinct mask is kept once per label, as a
+   # 1-bit PNG with a .gt.txt when it is labeled and under unlabeled/ when it
+   # is not. Nothing more is written once the folder holds max_bytes.
+   def __init__(
+      self,
+      path: str,
+      max_bytes: int = 256*1024*1024,
+      batch_size: int = 32,
+      flush_interval: float = 5,
+      max_queued: int = 256
+   ) -> None:
+      self.path = path
+      self.unlabeled_path = os.path.join(path, 'unlabeled')
+      self.max_bytes = max_bytes
+      self.batch_size = batch_size
+      self.flush_interval = flush_interval
+      self.max_queued = max_queued
+
+      self.written = 0
+      self.duplicates = 0
+      self.dropped = 0
+      self.over_cap = 0
+
+      os.makedirs(self.unlabeled_path, exist_ok=True)
+      self._seen = set()
+      self._bytes = 0
+      self.__scan()
+
+      self._queue = deque()
+      self._condition = threading.Condition()
+      self._stopping = False
+      self._thread = threading.Thread(target=self.__run, name='sample-recorder', daemon=True)
+      self._thread.start()
+
+   def submit(self, mask: np.ndarray, text: str = None) -> bool:
+      # False when the sample was dropped straight away
+      key = (mask_fingerprint(mask), text)
+      with self._condition:
+         if key in self._seen:
+            self.duplicates += 1
+            return False
+         if len(self._queue) >= self.max_queued:
+            self.dropped += 1
+            return False
+         self._seen.add(key)
+         self._queue.append((key, mask.copy(), text))
+         if len(self._queue) >= self.batch_size:
+            self._condition.notify()
+      return True
+
+   def close(self, timeout: float = 5) -> None:
+      with self._condition:
+         self._stopping = True
+         self._condition.notify()
+      self._thread.join(timeout)
+
+   def stats(self) -> t.Dict[str, int]:
+      return {
+         'written': self.written,
+         'duplicates': self.duplicates,
+         'dropped': self.dropped,
+         'over_cap': self.over_cap,
+         'bytes': self._bytes,
+         'queued': len(self._queue),
+      }
+
+   def __scan(self) -> None:
+      # samples from earlier sessions count towards the cap and are not
+      # written again
+      for folder, label in ((self.path, True), (self.unlabeled_path, False)):
+         for name in os.listdir(folder):
+            file_path = os.path.join(folder, name)
+            if not os.path.isfile(file_path):
+               continue
+            self._bytes += os.path.getsize(file_path)
+            if name.endswith('.png'):
+               # <text>_<fingerprint>.png, unlabeled/<fingerprint>.png
+               stem = name[:-len('.png')]
+               text, _, fingerprint = stem.rpartition('_') if label else (None, '', stem)
+               self._seen.add((fingerprint, text))
+
+   def __run(self) -> None:
+      while True:
+         with self._condition:
+            self._condition.wait_for(lambda: self._stopping or len(self._queue) >= self.batch_size, self.flush_interval)
+            batch = list(self._queue)
+            self._queue.clear()
+            stopping = self._stopping
+
+         if batch:
+            self.__write(batch)
+         if stopping:
+            break
+
+   def __write(self, batch: t.List[t.Tuple[t.Tuple[str, t.Optional[str]], np.ndarray, t.Optional[str]]]) -> None:
+      for (fingerprint, _), mask, text in batch:
+         if self._bytes >= self.max_bytes:
+            self.over_cap += 1
+            if self.over_cap == 1:
+               logger.warning(f'Training samples in {self.path} reached {self.max_bytes} bytes, no longer recording')
+            continue
+
+         if text is None:
+            stem = os.path.join(self.unlabeled_path, fingerprint)
+         else:
+            stem = os.path.join(self.path, f'{text}_{fingerprint}')
+
+         # the label only once its image is saved, train_glyphs expects pairs
+         try:
+            Image.fromarray(mask).convert('1').save(f'{stem}.png', optimize=True)
+            if text is not None:
+               with open(f'{stem}.gt.txt', mode='w') as f:
+                  f.write(text)
+         except OSError as e:
+            logger.warning(f'Unable to record sample {stem}: {e}')
+            for path in (f'{stem}.png', f'{stem}.gt.txt'):
+               if os.path.exists(path):
+                  os.remove(path)
+            continue
+         self._bytes += os.path.getsize(f'{stem}.png')
+         if text is not None:
+            self._bytes += os.path.getsize(f'{stem}.gt.txt')
+         self.written += 1
+
+      logger.debug(f'Recorded {len(batch)} training samples, {self._bytes} bytes in {self.path}')
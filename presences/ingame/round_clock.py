@@ -0,0 +1,73 @@
+import time
+import threading
+import typing as t
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RoundClock():
+   # The round timer is a countdown, so once one reading pins down when the
+   # current phase ends, the remaining time follows from the clock. The timer
+   # is read again only when the phase or round changes, when the deadline
+   # has not been checked for `verify_interval` seconds, or after a check
+   # found it off by more than `max_drift` seconds. The capture worker asks
+   # needs_timer() while the presence loop observes, so the state is locked.
+   def __init__(self, max_drift: float = 1.5, verify_interval: float = 15) -> None:
+      self.max_drift = max_drift
+      self.verify_interval = verify_interval
+      self.state = None
+      self.round_no = None
+      self.deadline = None # wall time the countdown reaches 0
+      self.synced_at = None
+      self.resyncs = 0
+      self._lock = threading.Lock()
+
+   def needs_timer(self) -> bool:
+      with self._lock:
+         if self.deadline is None or self.synced_at is None:
+            return True
+         return time.time() - self.synced_at > self.verify_interval
+
+   def deadline_at(self) -> t.Optional[float]:
+      # wall time the countdown reaches 0, None while it is not known
+      with self._lock:
+         return self.deadline
+
+   def reset(self) -> None:
+      with self._lock:
+         self.__reset()
+
+   def observe(self, captured_at: float, state: t.Optional[str], round_no: int, secs: t.Optional[float]) -> t.Optional[float]:
+      # Feeds one reading (secs is None when the timer was not read) and
+      # returns the seconds left on the timer at captured_at, or None while
+      # the clock does not know them.
+      with self._lock:
+         return self.__observe(captured_at, state, round_no, secs)
+
+   def __reset(self) -> None:
+      self.state = None
+      self.round_no = None
+      self.deadline = None
+      self.synced_at = None
+
+   def __observe(self, captured_at: float, state: t.Optional[str], round_no: int, secs: t.Optional[float]) -> t.Optional[float]:
+      if state is None:
+         self.__reset()
+         return None
+
+      if state != self.state or round_no != self.round_no:
+         self.state = state
+         self.round_no = round_no
+         self.deadline = None
+
+      if secs is not None:
+         if self.deadline is None or abs(self.deadline - captured_at - secs) > self.max_drift:
+            if self.deadline is not None:
+               logger.debug(f'Round clock off by {self.deadline - captured_at - secs:.2f}s, resyncing')
+            self.deadline = captured_at + secs
+            self.resyncs += 1
+         self.synced_at = captured_at
+
+      if self.deadline is None:
+         return None
+      return max(self.deadline - captured_at, 0)
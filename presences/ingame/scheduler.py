@@ -0,0 +1,112 @@
+import os
+import time
+import typing as t
+import logging
+
+logger = logging.getLogger(__name__)
+
+from .capture_worker import TimedResult
+from .round_clock import RoundClock
+
+# seconds between captures in each state the top bar reader reports, None
+# being a frame without a readable top bar
+phase_intervals = {
+   'in progress': 5,
+   'spike planted': 3,
+   'buy phase': 2,
+   'match point': 2,
+   'overtime': 2,
+   'endgame': 2,
+   'round won': 1,
+   'round lost': 1,
+   'clutch': 1,
+   None: 2,
+}
+
+def default_cpu_budget() -> t.Optional[float]:
+   # VALORPC_CAPTURE_CPU_BUDGET, a fraction of one core; 0 turns it off
+   budget = float(os.getenv('VALORPC_CAPTURE_CPU_BUDGET', '0.05'))
+   return budget if budget > 0 else None
+
+class CaptureScheduler():
+   # Decides how long the capture worker waits before the next frame:
+   #  - every state has its own pace (phase_intervals), slow mid round
+   #  - frames come in a burst while the round clock says the phase is about
+   #    to end, so the next state is seen quickly
+   #  - nothing is captured while Discord would not take a presence update
+   #    anyway, the next frame lands just before the window opens again
+   #  - the wait is stretched so the CPU time of the captures stays within
+   #    cpu_budget of one core, as measured by capture_cpu_time
+   def __init__(
+      self,
+      round_clock: RoundClock = None,
+      window_opens_at: t.Callable[[], float] = None,
+      cpu_budget: t.Optional[float] = None,
+      burst_window: float = 3,
+      burst_interval: float = 0.5,
+      window_lead: float = 1,
+      max_interval: float = 15
+   ) -> None:
+      self.round_clock = round_clock
+      self.window_opens_at = window_opens_at
+      self.cpu_budget = cpu_budget
+      self.burst_window = burst_window
+      self.burst_interval = burst_interval
+      self.window_lead = window_lead
+      self.max_interval = max_interval
+
+      self.started = time.monotonic()
+      self.frames = 0
+      self.cpu_seconds = 0.0
+      self.cpu_per_frame = 0.0 # moving average
+      self.last_interval = None
+      self.last_reason = None
+
+   def record(self, cpu_seconds: float) -> None:
+      self.frames += 1
+      self.cpu_seconds += cpu_seconds
+      if self.frames == 1:
+         self.cpu_per_frame = cpu_seconds
+      else:
+         self.cpu_per_frame += (cpu_seconds - self.cpu_per_frame)*0.2
+
+   def next_delay(self, last: t.Optional[TimedResult]) -> float:
+      now = time.time()
+      state = last.results[2] if last else None
+      interval = phase_intervals.get(state, phase_intervals[None])
+      reason = 'phase'
+
+      deadline = self.round_clock.deadline_at() if self.round_clock else None
+      if deadline is not None:
+         remaining = deadline - now
+         if -self.burst_window <= remaining <= self.burst_window:
+            interval, reason = min(interval, self.burst_interval), 'burst'
+         elif remaining > self.burst_window:
+            # wake up in time for the burst
+            interval = min(interval, remaining - self.burst_window)
+
+      if self.window_opens_at:
+         opens_in = self.window_opens_at() - self.window_lead - now
+         if opens_in > interval:
+            interval, reason = opens_in, 'discord window'
+
+      if self.cpu_budget:
+         budget_interval = self.cpu_per_frame/self.cpu_budget
+         if budget_interval > interval:
+            interval, reason = budget_interval, 'cpu budget'
+
+      self.last_interval = min(interval, self.max_interval)
+      self.last_reason = reason
+      return self.last_interval
+
+   def stats(self) -> t.Dict[str, t.Any]:
+      elapsed = time.monotonic() - self.started
+      return {
+         'frames': self.frames,
+         'cpu_budget': self.cpu_budget,
+         'cpu_usage': self.cpu_seconds/elapsed if elapsed > 0 else 0.0,
+         'cpu_per_frame_ms': self.cpu_per_frame*1000,
+         'frames_per_minute': self.frames*60/elapsed if elapsed > 0 else 0.0,
+         'last_interval': self.last_interval,
+         'last_reason': self.last_reason,
+      }
@@ -0,0 +1,86 @@
+import json
+import hashlib
+import typing as t
+
+import numpy as np
+
+PixelList = t.Sequence[t.Tuple[t.Tuple[float, float], int]]
+
+class PixelSignatures():
+   # Every black/white probe of every state packed into flat arrays, so a whole
+   # state crop is classified with one gather and one comparison. Probe
+   # positions are compiled into flat indices once per crop size.
+   def __init__(self, states: t.Sequence[t.Tuple[str, t.Sequence[PixelList]]]) -> None:
+      self.states = [state for state, _ in states]
+      self._positions = []
+      expected = []
+      list_states = []
+      list_starts = []
+
+      for state_index, (_, pixel_lists) in enumerate(states):
+         for pixel_list in pixel_lists:
+            list_states.append(state_index)
+            list_starts.append(len(expected))
+            for position, value in pixel_list:
+               self._positions.append(position)
+               expected.append(value)
+
+      self._expected = np.array(expected, np.uint8)
+      self._list_states = np.array(list_states, np.intp)
+      self._list_starts = np.array(list_starts, np.intp)
+      self._list_lengths = np.diff(np.append(self._list_starts, len(expected)))
+      self._indices: t.Dict[t.Tuple[int, int], np.ndarray] = {}
+
+   def positions(self, shape: t.Tuple[int, int], state: str) -> t.List[t.Tuple[t.Tuple[int, int], int]]:
+      # (x, y) and expected value of every probe of a state, for debug overlays
+      height, width = shape
+      probes = []
+      for list_index in np.flatnonzero(self._list_states == self.states.index(state)):
+         start = self._list_starts[list_index]
+         for i in range(start, start + self._list_lengths[list_index]):
+            flat = self._flat_indices(shape)[i]
+            probes.append(((int(flat % width), int(flat // width)), int(self._expected[i])))
+      return probes
+
+   def scores(self, mask: np.ndarray) -> t.Dict[str, float]:
+      # fraction of matching probes per state; states with several lists
+      # report their closest one
+      hits = mask.take(self._flat_indices(mask.shape)) == self._expected
+      list_scores = np.add.reduceat(hits, self._list_starts, dtype=np.intp)/self._list_lengths
+
+      state_scores = np.zeros(len(self.states))
+      np.maximum.at(state_scores, self._list_states, list_scores)
+      return dict(zip(self.states, state_scores.tolist()))
+
+   def classify(self, mask: np.ndarray) -> t.Tuple[t.Optional[str], t.Dict[str, float]]:
+      # the first state, in declaration order, whose probes all match
+      scores = self.scores(mask)
+      for state in self.states:
+         if scores[state] == 1.0:
+            return state, scores
+      return None, scores
+
+   def digest(self) -> str:
+      # changes whenever a probe moves or flips, so compiled indices saved to
+      # disk can be told apart from stale ones
+      return hashlib.sha1(json.dumps([self._positions, self._expected.tolist()]).encode()).hexdigest()
+
+   def compile(self, shape: t.Tuple[int, int]) -> t.List[int]:
+      return self._flat_indices(tuple(shape)).tolist()
+
+   def preload(self, shape: t.Tuple[int, int], indices: t.Sequence[int]) -> None:
+      # flat probe indices compiled ahead of time, see calibration
+      if len(indices) != len(self._positions):
+         raise ValueError(f'{len(indices)} probe indices for {len(self._positions)} probes')
+      self._indices[tuple(shape)] = np.array(indices, np.intp)
+
+   def _flat_indices(self, shape: t.Tuple[int, int]) -> np.ndarray:
+      indices = self._indices.get(shape)
+      if indices is None:
+         height, width = shape
+         indices = np.array(
+            [round(y*height)*width + round(x*width) for x, y in self._positions],
+            np.intp
+         )
+         self._indices[shape] = indices
+      return indices
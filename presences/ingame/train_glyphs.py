@@ -0,0 +1,192 @@
+# Builds the glyph atlas used by TopBarReader without any tesseract tooling.
+#
+#    python -m presences.ingame.train_glyphs --captures captures --output atlas.npz
+#
+# Samples come from labeled top bar captures (captures/labels.json) and from
+# the .gt.txt + .png pairs SampleRecorder writes. Accuracy is reported per
+# glyph with every sample held out of the atlas it is read with.
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import typing as t
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+import numpy as np
+from PIL import Image
+
+from . import glyphs
+from .binarize import INK, PAPER
+from .frame import Frame
+from .reader_util import TopBarReader, training_dataset_path
+
+Sample = t.Tuple[str, np.ndarray, str] # source, mask, text
+
+def load_capture_samples(reader: TopBarReader, captures_path: str, labels_path: str) -> t.List[Sample]:
+   with open(labels_path, mode='r') as f:
+      labels = json.load(f)
+
+   samples = []
+   for name, label in labels.items():
+      try:
+         frame = Frame(Image.open(os.path.join(captures_path, name)).convert('RGB'))
+      except Exception as e:
+         logger.warning(f'Skipping capture {name}: {e}')
+         continue
+
+      # the reader reuses its mask buffers, so every sample keeps a copy
+      scores = label.get('scores')
+      if scores:
+         b_crop, r_crop = reader.get_score_masks(frame)
+         samples.append((f'{name}:blue', b_crop.copy(), str(scores[0])))
+         samples.append((f'{name}:red', r_crop.copy(), str(scores[1])))
+
+      timer = label.get('timer')
+      if timer:
+         timer_white, timer_red = reader.get_timer_masks(frame)
+         timer_crop = timer_red if '.' in timer else timer_white
+         samples.append((f'{name}:timer', timer_crop.copy(), timer))
+
+   return samples
+
+def load_testset_samples(testset_path: str) -> t.List[Sample]:
+   samples = []
+   for text_path in sorted(glob.glob(os.path.join(testset_path, '*.gt.txt'))):
+      image_path = text_path[:-len('.gt.txt')] + '.png'
+      with open(text_path, mode='r') as f:
+         text = f.read().strip()
+      if not text or not os.path.exists(image_path):
+         continue
+
+      gray = np.asarray(Image.open(image_path).convert('L'))
+      mask = np.where(gray < 128, INK, PAPER).astype(np.uint8)
+      samples.append((os.path.basename(image_path), mask, text))
+
+   return samples
+
+def evaluate(samples: t.List[Sample], min_confidence: float) -> dict:
+   # leave-one-sample-out: each crop is read with an atlas built from all the
+   # other crops, so the numbers say how the atlas does on unseen frames
+   sample_glyphs = [glyphs.sample_glyphs(mask, text) for _, mask, text in samples]
+   stats = {}
+   skipped = []
+
+   for i, (source, mask, text) in enumerate(samples):
+      if sample_glyphs[i] is None:
+         skipped.append(source)
+         continue
+
+      others = [glyph for j, pairs in enumerate(sample_glyphs) if j != i and pairs for glyph in pairs]
+      classifier = glyphs.GlyphClassifier(glyphs.GlyphAtlas.from_glyphs(others), min_confidence)
+      results = classifier.classify_glyphs(mask)
+
+      for label, (symbol, confidence) in zip(text, results):
+         stat = stats.setdefault(label, {'samples': 0, 'correct': 0, 'accepted': 0, 'accepted_correct': 0})
+         stat['samples'] += 1
+         stat['correct'] += symbol == label
+         if confidence >= min_confidence:
+            stat['accepted'] += 1
+            stat['accepted_correct'] += symbol == label
+
+   for stat in stats.values():
+      stat['accuracy'] = stat['correct']/stat['samples']
+      stat['accept_rate'] = stat['accepted']/stat['samples']
+      stat['precision'] = stat['accepted_correct']/stat['accepted'] if stat['accepted'] else None
+
+   return {'glyphs': dict(sorted(stats.items())), 'skipped': skipped}
+
+def measure_throughput(classifier: glyphs.GlyphClassifier, samples: t.List[Sample], min_seconds: float = 0.5) -> dict:
+   masks = [mask for _, mask, _ in samples]
+   glyph_count = sum(len(glyphs.segment(mask)) for mask in masks)
+   rounds = 0
+   start = time.perf_counter()
+   while True:
+      for mask in masks:
+         classifier.classify(mask)
+      rounds += 1
+      elapsed = time.perf_counter() - start
+      if elapsed >= min_seconds:
+         break
+
+   return {
+      'crops_per_second': rounds*len(masks)/elapsed,
+      'glyphs_per_second': rounds*glyph_count/elapsed,
+      'ms_per_crop': elapsed*1000/(rounds*len(masks))
+   }
+
+def print_report(report: dict) -> None:
+   print(f'{"glyph":<6}{"samples":>8}{"accuracy":>10}{"accepted":>10}{"precision":>11}')
+   for label, stat in report['evaluation']['glyphs'].items():
+      precision = '-' if stat['precision'] is None else f'{stat["precision"]:.1%}'
+      print(f'{label:<6}{stat["samples"]:>8}{stat["accuracy"]:>10.1%}{stat["accept_rate"]:>10.1%}{precision:>11}')
+   for source in report['evaluation']['skipped']:
+      print(f'skipped {source}: glyph count does not match its label')
+
+   throughput = report['throughput']
+   print(f'{report["atlas"]["templates"]} templates, {throughput["glyphs_per_second"]:.0f} glyphs/s, {throughput["ms_per_crop"]:.3f} ms per crop')
+
+def main(argv: t.List[str] = None) -> int:
+   parser = argparse.ArgumentParser(description='Build the TopBarReader glyph atlas from labeled crops.')
+   parser.add_argument('--captures', help='folder of top bar captures')
+   parser.add_argument('--labels', help='labels for the captures, defaults to <captures>/labels.json')
+   parser.add_argument('--testset', action='append', default=[], help=f'folder of .gt.txt/.png pairs, may be repeated (e.g. {training_dataset_path})')
+   parser.add_argument('--output', default=glyphs.default_atlas_path, help='where to write the atlas')
+   parser.add_argument('--min-confidence', type=float, default=0.85, help='confidence below which the reader falls back to tesseract')
+   parser.add_argument('--report', help='also write the report as JSON')
+   parser.add_argument('--dry-run', action='store_true', help='report without writing the atlas')
+   args = parser.parse_args(argv)
+
+   logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+
+   samples = []
+   if args.captures:
+      reader = TopBarReader(False, False, '', glyph_atlas_path=None)
+      labels_path = args.labels or os.path.join(args.captures, 'labels.json')
+      samples.extend(load_capture_samples(reader, args.captures, labels_path))
+   for testset_path in args.testset:
+      samples.extend(load_testset_samples(testset_path))
+
+   if not samples:
+      parser.error('no labeled samples found, pass --captures and/or --testset')
+
+   sources = ([args.captures] if args.captures else []) + args.testset
+   atlas = glyphs.GlyphAtlas.from_samples(
+      ((mask, text) for _, mask, text in samples),
+      info={
+         'created': datetime.now().isoformat(timespec='seconds'),
+         'samples': len(samples),
+         'sources': sources
+      }
+   )
+   classifier = glyphs.GlyphClassifier(atlas, args.min_confidence)
+
+   report = {
+      'atlas': {
+         'version': atlas.version,
+         'templates': len(atlas.labels),
+         'labels': sorted(set(str(label) for label in atlas.labels)),
+         'output': None if args.dry_run else os.path.abspath(args.output),
+      },
+      'min_confidence': args.min_confidence,
+      'evaluation': evaluate(samples, args.min_confidence),
+      'throughput': measure_throughput(classifier, samples),
+   }
+   print_report(report)
+
+   if not args.dry_run:
+      atlas.save(args.output)
+      logger.info(f'Wrote {len(atlas.labels)} templates to {args.output}')
+   if args.report:
+      with open(args.report, mode='w') as f:
+         json.dump(report, f, indent=4)
+
+   return 0
+
+if __name__ == '__main__':
+   sys.exit(main())
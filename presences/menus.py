@@ -4,11 +4,11 @@ class MenusPresence(BasePresence):
    def __init__(self, vrpc_client) -> None:
       self.vrpc_client = vrpc_client
 
-   def update(self, presence_data: dict) -> None:
+   async def update(self, presence_data: dict) -> None:
       if presence_data['sessionLoopState'] != 'MENUS':
          return
 
-      party_info = self.get_party_info(presence_data)
+      party_info = await self.get_party_info(presence_data)
 
       state =  (presence_data['partyState'] == 'MATCHMAKING' and 'In Queue') or\
                (presence_data['partyState'] == 'CUSTOM_GAME_SETUP' and 'Setting up Custom Game') or\
@@ -34,7 +34,7 @@ class MenusPresence(BasePresence):
          status['small_image'] = 'idle'
          status['small_text'] = 'Idle'
       elif queue_type == 'competitive':
-         competitive_data = self.vrpc_client.riot_client.fetch_competitive_updates()
+         competitive_data = await self.vrpc_client.async_riot_client.fetch_competitive_updates()
          latest_update = competitive_data['Matches'][0]
          status['small_image'] = f'rank_{latest_update["TierAfterUpdate"]}'
          if latest_update['TierAfterUpdate'] < 24:
@@ -44,4 +44,4 @@ class MenusPresence(BasePresence):
       
       status['party_size'] = party_info
 
-      self.vrpc_client.presence.update(status)
+      await self._update_presence(status)
@@ -1,4 +1,5 @@
 import time
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,14 +12,14 @@ class PregamePresence(BasePresence):
    def __init__(self, vrpc_client) -> None:
       self.vrpc_client = vrpc_client
 
-   def start_with_event_data(self, event_data: dict) -> None:
+   async def start_with_event_data(self, event_data: dict) -> None:
       match_id = super()._get_match_id_from_chat_event(event_data, 'pregame')
       if match_id:
-         self.start_with_match_id(match_id)
+         await self.start_with_match_id(match_id)
 
-   def start_with_match_id(self, match_id: str = None) -> None:
+   async def start_with_match_id(self, match_id: str = None) -> None:
       try:
-         match_details = self.vrpc_client.riot_client.pregame_fetch_match(match_id)
+         match_details = await self.vrpc_client.async_riot_client.pregame_fetch_match(match_id)
       except PhaseError:
          return
 
@@ -28,14 +29,14 @@ class PregamePresence(BasePresence):
       self._register_match_id(match_details['ID'], 'pregame')
       logger.info('CONTINUING PRE MATCH %s', match_id)
       
-      self.__loop(match_id)
+      await self.__loop(match_id)
 
-   def __loop(self, match_id: str) -> None:
+   async def __loop(self, match_id: str) -> None:
       self.start = int(time.time())
 
       while True:
          try:
-            match_details = self.vrpc_client.riot_client.pregame_fetch_match(match_id)
+            match_details = await self.vrpc_client.async_riot_client.pregame_fetch_match(match_id)
          except PhaseError:
             break
 
@@ -49,11 +50,11 @@ class PregamePresence(BasePresence):
             if player['CharacterSelectionState'] == 'locked':
                locked_count += 1
             
-            if player['Subject'] == self.vrpc_client.riot_client.puuid:
+            if player['Subject'] == self.vrpc_client.async_riot_client.puuid:
                local_player = player
          
          if not local_player:
-            time.sleep(1)
+            await asyncio.sleep(1)
             continue
 
          _, mode = self.vrpc_client.assets_manager.get_mode_from_url(match_details['Mode'])
@@ -68,7 +69,7 @@ class PregamePresence(BasePresence):
          state = local_player['CharacterSelectionState'] == 'locked' and 'Locked in' or 'Selecting'
          agent = self.vrpc_client.assets_manager.get_asset('agents', local_player['CharacterID'])
          map_uuid, map = self.vrpc_client.assets_manager.get_map_from_url(match_details['MapID'])
-         party_info = self.get_party_info()
+         party_info = await self.get_party_info()
 
          status['start'] = self.start
          status['end'] = self.start + 90
@@ -83,6 +84,6 @@ class PregamePresence(BasePresence):
          status['large_image'] = map_uuid
          status['large_text'] = map['name']
 
-         self.vrpc_client.presence.update(status)
+         await self._update_presence(status)
 
-         time.sleep(5)
+         await asyncio.sleep(5)
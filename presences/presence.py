@@ -1,4 +1,5 @@
 import re
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,8 +33,8 @@ class BasePresence():
       if not match_key in cached_match_ids:
          cached_match_ids.append(match_key)
 
-   def get_party_info(self, presence_data: dict = None) -> dict:
-      presence_data = presence_data or self.vrpc_client.riot_client.fetch_presence()
+   async def get_party_info(self, presence_data: dict = None) -> dict:
+      presence_data = presence_data or await self.vrpc_client.async_riot_client.fetch_presence()
 
       if not presence_data:
          return
@@ -43,3 +44,8 @@ class BasePresence():
       info['max_size'] = presence_data['maxPartySize']
 
       return [info['size'], info['max_size']]
+
+   async def _update_presence(self, status: dict) -> None:
+      # pypresence runs its own event loop until the update is sent, which
+      # cannot be done on the thread the listener's loop is running on
+      await asyncio.get_running_loop().run_in_executor(None, self.vrpc_client.presence.update, status)
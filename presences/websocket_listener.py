@@ -34,22 +34,29 @@ class WebsocketListener():
       }
 
       self.presence_last_fetched = time.time()
+      self.session_loop_state = None
    
-   def check_presence(self) -> None:
+   async def check_presence(self) -> None:
       self.presence_last_fetched = time.time()
-      presence = self.vrpc_client.riot_client.fetch_presence()
+      # awaited, so the listener keeps receiving events while it is fetched
+      presence = await self.vrpc_client.async_riot_client.fetch_presence()
 
       if not presence:
          return
 
       logger.debug(f'Presence session loop state: {presence["sessionLoopState"]}')
+      if presence['sessionLoopState'] != self.session_loop_state:
+         # party, match and rank responses cached in the last phase are stale
+         dropped = self.vrpc_client.async_riot_client.invalidate_cache(per_phase=True)
+         logger.debug(f'Session loop state changed from {self.session_loop_state}, dropped {dropped} cached responses')
+         self.session_loop_state = presence['sessionLoopState']
 
       if presence['sessionLoopState'] == 'MENUS':
-         self.party_presence.update(presence)
+         await self.party_presence.update(presence)
       elif presence['sessionLoopState'] == 'PREGAME':
-         self.pregame_presence.start_with_match_id()
+         await self.pregame_presence.start_with_match_id()
       elif presence['sessionLoopState'] == 'INGAME':
-         self.ingame_presence.start_with_match_id()
+         await self.ingame_presence.start_with_match_id()
 
    async def start_loop(self) -> None:
       ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
@@ -62,7 +69,7 @@ class WebsocketListener():
          async with websockets.connect(url, ssl=ssl_context, extra_headers=self.vrpc_client.riot_client.local_headers, ping_interval=None) as websocket:
             await websocket.send('[5, \"OnJsonApiEvent\"]')
 
-            self.check_presence()
+            await self.check_presence()
 
             while True:
                response = await websocket.recv()
@@ -75,10 +82,13 @@ class WebsocketListener():
                uri_to_presence = self.events_to_presence[response['eventType']]
                logger.debug(f'{response["eventType"]} - {response["uri"]}')
                if response['uri'] in uri_to_presence.keys():
-                  uri_to_presence[response['uri']].start_with_event_data(data)
+                  await uri_to_presence[response['uri']].start_with_event_data(data)
 
                if (time.time() - self.presence_last_fetched) >= 5:
-                  self.check_presence()
+                  await self.check_presence()
       except Exception:
          logger.warning('Exception during listening to webhook connection')
          logger.error(traceback.format_exc())
+      finally:
+         logger.debug(f'Response cache: {self.vrpc_client.async_riot_client.cache_stats()}')
+         await self.vrpc_client.async_riot_client.aclose()
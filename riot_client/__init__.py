@@ -2,8 +2,6 @@
 # https://github.com/techchrism/valorant-api-docs
 
 # module imports
-import requests
-import os
 import base64
 import urllib3
 import json
@@ -13,15 +11,12 @@ import logging
 logger = logging.getLogger(__name__)
 
 # imports for modules used in the package
-from .resources import regions
-from .resources import region_shard_override, shard_region_override
-from .resources import base_endpoint
-from .resources import base_endpoint_glz
-from .resources import base_endpoint_local
-from .resources import base_endpoint_shared
 from .resources import queues 
+from .resources import cache_ttls
 
-from .auth import Auth
+from .base import BaseClient, ClientState
+from .sessions import SessionPool
+from .single_flight import SingleFlight
 
 # exceptions
 from .exceptions import ResponseError, HandshakeError, LockfileError, PhaseError
@@ -30,9 +25,9 @@ from .exceptions import ResponseError, HandshakeError, LockfileError, PhaseError
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
-class Client:
+class Client(BaseClient):
 
-    def __init__(self, region='na', auth=None):
+    def __init__(self, region='na', auth=None, pool_size=4, keep_alive=True, timeout=(5, 15), cache=True, cache_ttls=cache_ttls, version_provider=None):
         '''
         NOTE: when using manual auth, local endpoints will not be available
         auth format:
@@ -40,42 +35,22 @@ class Client:
             "username":"usernamehere",
             "password":"passwordhere"
         }
+        pool_size, keep_alive and timeout configure the pooled session kept
+        for each endpoint type, see SessionPool
+        cache: reuse fetch responses for the TTLs of cache_ttls, see ResponseCache
+        version_provider: where the client version in the headers comes from,
+        see VersionProvider; by default read from the local client's log
         '''
-        if auth is None:
-            self.lockfile_path = os.path.join(
-                os.getenv('LOCALAPPDATA'), R'Riot Games\Riot Client\Config\lockfile')
-
-        self.puuid = ""
-        self.player_name = ""
-        self.player_tag = ""
-        self.lockfile = {}
-        self.headers = {}
-        self.local_headers = {}
-        self.region = region
-        self.shard = region
-        self.auth = None
-        self.client_platform = "ew0KCSJwbGF0Zm9ybVR5cGUiOiAiUEMiLA0KCSJwbGF0Zm9ybU9TIjogIldpbmRvd3MiLA0KCSJwbGF0Zm9ybU9TVmVyc2lvbiI6ICIxMC4wLjE5MDQyLjEuMjU2LjY0Yml0IiwNCgkicGxhdGZvcm1DaGlwc2V0IjogIlVua25vd24iDQp9"
-
-        if auth is not None:
-            self.auth = Auth(auth)
-
-        if region in regions:
-            self.region = region
-        else:
-            raise ValueError(f"Invalid region, valid regions are: {regions}")
-
-        if self.region in region_shard_override.keys():
-            self.shard = region_shard_override[self.region]
-        if self.shard in shard_region_override.keys():
-            self.region = shard_region_override[self.shard]
-
-        self.base_url, self.base_url_glz, self.base_url_shared = self._build_urls()
+        super().__init__(ClientState(region, auth, version_provider, timeout), cache, cache_ttls)
+        self.sessions = SessionPool(pool_size=pool_size, keep_alive=keep_alive, timeout=timeout)
+        # concurrent fetches of one URL share a single request
+        self.in_flight = SingleFlight()
 
     def activate(self) -> None:
         '''Activate the client and get authorization'''
         try:
             if self.auth is None:
-                self.lockfile = self.__get_lockfile()
+                self.lockfile = self._get_lockfile()
                 self.puuid, self.headers, self.local_headers = self.__get_headers()
                 
                 session = self.rnet_fetch_chat_session()
@@ -86,45 +61,32 @@ class Client:
         except:
             raise HandshakeError("Unable to activate; is VALORANT running?")
 
-    @staticmethod
-    def fetch_regions() -> list: 
-        '''Fetch valid regions'''
-        return regions
+    def connection_stats(self) -> dict:
+        '''Requests, connections opened and connection reuse per endpoint type'''
+        return self.sessions.stats()
 
-    def __verify_status_code(self, status_code, exceptions={}):
-        '''Verify that the request was successful according to exceptions'''
-        if status_code in exceptions.keys():
-            response_exception = exceptions[status_code]
-            raise response_exception[0](response_exception[1])
+    def close(self) -> None:
+        '''Close the pooled connections'''
+        self.sessions.close()
 
-    def fetch(self, endpoint="/", endpoint_type="pd", exceptions={}, region=None) -> dict: # exception: code: {Exception, Message}
-        '''Get data from a pd/glz/local endpoint'''
+    def fetch(self, endpoint="/", endpoint_type="pd", exceptions={}, region=None, retry=True) -> dict: # exception: code: {Exception, Message}
+        '''Get data from a pd/glz/local endpoint, retried once with fresh headers on a 400'''
         region = region or self.region
-        data = None
-        if endpoint_type in ["pd", "glz", "shared"]:
-            response = requests.get(f'{self.base_url_glz.replace(self.region, region) if endpoint_type == "glz" else self.base_url.replace(self.region, region) if endpoint_type == "pd" else self.base_url_shared.replace(self.region, region) if endpoint_type == "shared" else self.base_url.replace(self.region, region)}{endpoint}', headers=self.headers)
-
-            # custom exceptions for http status codes
-            self.__verify_status_code(response.status_code, exceptions)
-            
-            try:
-                data = json.loads(response.text)
-            except: # as no data is set, an exception will be raised later in the method
-                pass
+        url = self._url(endpoint, endpoint_type, region)
+        data = self.cache.get(endpoint_type, url, endpoint)
+        if data is not None:
+            return data
 
-        elif endpoint_type == "local":
-            response = requests.get("https://127.0.0.1:{port}{endpoint}".format(
-                port=self.lockfile['port'],
-                endpoint=endpoint),
-                headers=self.local_headers,
-                verify=False
-            )
+        if endpoint_type in ["pd", "glz", "shared", "local"]:
+            headers = self.local_headers if endpoint_type == "local" else self.headers
+            # coalesced fetches share the status and body, each parses its own data
+            status_code, text = self.in_flight.do(("GET", url), lambda: self.__get(endpoint_type, url, headers))
 
             # custom exceptions for http status codes
-            self.__verify_status_code(response.status_code, exceptions)
-
+            self._verify_status_code(status_code, exceptions)
+            
             try:
-                data = response.json()
+                data = json.loads(text)
             except: # as no data is set, an exception will be raised later in the method
                 pass
 
@@ -132,39 +94,40 @@ class Client:
             raise ResponseError("Request returned NoneType")
         
         if "httpStatus" not in data:
+            self.cache.put(endpoint_type, url, endpoint, data)
             return data
         if data["httpStatus"] == 400:
+            if not retry:
+                raise ResponseError(f"Request returned httpStatus 400 with refreshed headers: {data}")
             # if headers expire (i dont think they ever do but jic), refresh em!
-            if self.auth is None:
-                self.puuid, self.headers, self.local_headers = self.__get_headers()
-            else:
-                self.puuid, self.headers, self.local_headers = self.auth.authenticate()
-            return self.fetch(endpoint=endpoint, endpoint_type=endpoint_type)
+            # the version is fetched again too, it may be what was rejected
+            self.puuid, self.headers, self.local_headers = self.__get_headers(refresh_version=True)
+            return self.fetch(endpoint=endpoint, endpoint_type=endpoint_type, exceptions=exceptions, region=region, retry=False)
+
+    def __get(self, endpoint_type, url, headers) -> t.Tuple[int, str]:
+        response = self.sessions.request(endpoint_type, "GET", url, headers=headers)
+        return response.status_code, response.text
 
     def post(self, endpoint="/", endpoint_type="pd", json_data={}, exceptions={}) -> dict:
         '''Post data to a pd/glz/local endpoint'''
         data = None
+        # the write may change what cached fetches of this phase return
+        self.cache.invalidate(endpoint_type, per_phase=True)
         if endpoint_type in ["pd", "glz", "shared"]:
-            response = requests.post(f'{self.base_url_glz if endpoint_type == "glz" else self.base_url}{endpoint}', headers=self.headers, json=json_data)
+            response = self.sessions.request(endpoint_type, "POST", f'{self.base_url_glz if endpoint_type == "glz" else self.base_url}{endpoint}', headers=self.headers, json=json_data)
 
             # custom exceptions for http status codes
-            self.__verify_status_code(response.status_code, exceptions)
+            self._verify_status_code(response.status_code, exceptions)
 
             try:
                 data = json.loads(response.text)
             except:
                 data = None
         elif endpoint_type == "local":
-            response = requests.post("https://127.0.0.1:{port}{endpoint}".format(
-                port=self.lockfile['port'],
-                endpoint=endpoint),
-                headers=self.local_headers,
-                verify=False,
-                json=json_data
-            )
+            response = self.sessions.request("local", "POST", self._url(endpoint, endpoint_type), headers=self.local_headers, json=json_data)
 
             # custom exceptions for http status codes
-            self.__verify_status_code(response.status_code, exceptions)
+            self._verify_status_code(response.status_code, exceptions)
 
             try:
                 data = response.json()
@@ -174,11 +137,12 @@ class Client:
         return data
 
     def put(self, endpoint="/", endpoint_type="pd", json_data={}, exceptions={}) -> dict:
-        response = requests.put(f'{self.base_url_glz if endpoint_type == "glz" else self.base_url}{endpoint}', headers=self.headers, data=json.dumps(json_data))
+        self.cache.invalidate(endpoint_type, per_phase=True)
+        response = self.sessions.request(endpoint_type, "PUT", f'{self.base_url_glz if endpoint_type == "glz" else self.base_url}{endpoint}', headers=self.headers, data=json.dumps(json_data))
         data = json.loads(response.text)
 
         # custom exceptions for http status codes
-        self.__verify_status_code(response.status_code, exceptions)
+        self._verify_status_code(response.status_code, exceptions)
 
         if data is not None:
             return data
@@ -187,22 +151,17 @@ class Client:
 
     def delete(self, endpoint="/", endpoint_type="pd", json_data={}, exceptions={}) -> dict:
         data = None
+        self.cache.invalidate(endpoint_type, per_phase=True)
         if endpoint_type in ["pd", "glz", "shared"]:
-            response = requests.delete(f'{self.base_url_glz if endpoint_type == "glz" else self.base_url}{endpoint}', headers=self.headers, json=json_data)
+            response = self.sessions.request(endpoint_type, "DELETE", f'{self.base_url_glz if endpoint_type == "glz" else self.base_url}{endpoint}', headers=self.headers, json=json_data)
 
             # custom exceptions for http status codes
-            self.__verify_status_code(response.status_code, exceptions)
+            self._verify_status_code(response.status_code, exceptions)
         elif endpoint_type == "local":
-            response = requests.delete("https://127.0.0.1:{port}{endpoint}".format(
-                port=self.lockfile['port'],
-                endpoint=endpoint),
-                headers=self.local_headers,
-                verify=False,
-                json=json_data
-            )
+            response = self.sessions.request("local", "DELETE", self._url(endpoint, endpoint_type), headers=self.local_headers, json=json_data)
 
             # custom exceptions for http status codes
-            self.__verify_status_code(response.status_code, exceptions)
+            self._verify_status_code(response.status_code, exceptions)
 
             try:
                 data = response.json()
@@ -438,23 +397,23 @@ class Client:
         data = self.delete(endpoint=f"/parties/v1/players/{puuid}", endpoint_type="glz")
         return data
 
-    def fetch_party(self) -> t.Mapping[str, t.Any]:
+    def fetch_party(self, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_FetchParty
         Get details about a given party id
         """
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.fetch(
             endpoint=f"/parties/v1/parties/{party_id}", endpoint_type="glz"
         )
         return data
 
-    def party_set_member_ready(self, ready: bool) -> t.Mapping[str, t.Any]:
+    def party_set_member_ready(self, ready: bool, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_SetMemberReady
         Sets whether a party member is ready for queueing or not
         """
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.post(
             endpoint=f"/parties/v1/parties/{party_id}/members/{self.puuid}/setReady",
             endpoint_type="glz",
@@ -462,49 +421,49 @@ class Client:
         )
         return data
 
-    def party_refresh_competitive_tier(self) -> t.Mapping[str, t.Any]:
+    def party_refresh_competitive_tier(self, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_RefreshCompetitiveTier
         Refreshes the competitive tier for a player
         """
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.post(
             endpoint=f"/parties/v1/parties/{party_id}/members/{self.puuid}/refreshCompetitiveTier",
             endpoint_type="glz",
         )
         return data
 
-    def party_refresh_player_identity(self) -> t.Mapping[str, t.Any]:
+    def party_refresh_player_identity(self, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_RefreshPlayerIdentity
         Refreshes the identity for a player
         """
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.post(
             endpoint=f"/parties/v1/parties/{party_id}/members/{self.puuid}/refreshPlayerIdentity",
             endpoint_type="glz",
         )
         return data
 
-    def party_refresh_pings(self) -> t.Mapping[str, t.Any]:
+    def party_refresh_pings(self, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_RefreshPings
         Refreshes the pings for a player
         """
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.post(
             endpoint=f"/parties/v1/parties/{party_id}/members/{self.puuid}/refreshPings",
             endpoint_type="glz",
         )
         return data
 
-    def party_change_queue(self, queue_id: t.Text) -> t.Mapping[str, t.Any]:
+    def party_change_queue(self, queue_id: t.Text, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_ChangeQueue
         Sets the matchmaking queue for the party
         """
         self.__check_queue_type(queue_id)
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.post(
             endpoint=f"/parties/v1/parties/{party_id}/queue",
             endpoint_type="glz",
@@ -512,49 +471,49 @@ class Client:
         )
         return data
 
-    def party_start_custom_game(self) -> t.Mapping[str, t.Any]:
+    def party_start_custom_game(self, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_StartCustomGame
         Starts a custom game
         """
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.post(
             endpoint=f"/parties/v1/parties/{party_id}/startcustomgame",
             endpoint_type="glz",
         )
         return data
 
-    def party_enter_matchmaking_queue(self) -> t.Mapping[str, t.Any]:
+    def party_enter_matchmaking_queue(self, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_EnterMatchmakingQueue
         Enters the matchmaking queue
         """
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.post(
             endpoint=f"/parties/v1/parties/{party_id}/matchmaking/join",
             endpoint_type="glz",
         )
         return data
 
-    def party_leave_matchmaking_queue(self) -> t.Mapping[str, t.Any]:
+    def party_leave_matchmaking_queue(self, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_LeaveMatchmakingQueue
         Leaves the matchmaking queue
         """
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.post(
             endpoint=f"/parties/v1/parties/{party_id}/matchmaking/leave",
             endpoint_type="glz",
         )
         return data
 
-    def set_party_accessibility(self, open: bool) -> t.Mapping[str, t.Any]:
+    def set_party_accessibility(self, open: bool, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_SetAccessibility
         Changes the party accessibility to be open or closed
         """
         state = "OPEN" if open else "CLOSED"
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.post(
             endpoint=f"/parties/v1/parties/{party_id}/accessibility",
             endpoint_type="glz",
@@ -562,7 +521,7 @@ class Client:
         )
         return data
 
-    def party_set_custom_game_settings(self, settings: t.Mapping) -> t.Mapping[str, t.Any]:
+    def party_set_custom_game_settings(self, settings: t.Mapping, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_SetCustomGameSettings
         Changes the settings for a custom game
@@ -575,7 +534,7 @@ class Client:
             "GameRules": null # idk what this is for
         }
         """
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.post(
             endpoint=f"/parties/v1/parties/{party_id}/customgamesettings",
             endpoint_type="glz",
@@ -583,13 +542,13 @@ class Client:
         )
         return data
 
-    def party_invite_by_display_name(self, name: t.Text, tag: t.Text) -> t.Mapping[str, t.Any]:
+    def party_invite_by_display_name(self, name: t.Text, tag: t.Text, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_InviteToPartyByDisplayName
         Invites a player to the party with their display name
         omit the "#" in tag
         """
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.post(
             endpoint=f"/parties/v1/parties/{party_id}/invites/name/{name}/tag/{tag}",
             endpoint_type="glz",
@@ -608,13 +567,13 @@ class Client:
         )
         return data
 
-    def party_decline_request(self, request_id: t.Text) -> t.Mapping[str, t.Any]:
+    def party_decline_request(self, request_id: t.Text, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_DeclineRequest
         Declines a party request
         {request id}: The ID of the party request. Can be found from the Requests array on the Party_FetchParty endpoint.
         """
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.post(
             endpoint=f"/parties/v1/parties/{party_id}/request/{request_id}/decline",
             endpoint_type="glz",
@@ -653,23 +612,23 @@ class Client:
         )
         return data
 
-    def party_fetch_muc_token(self) -> t.Mapping[str, t.Any]:
+    def party_fetch_muc_token(self, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_FetchMUCToken
         Get a token for party chat
         """
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.fetch(
             endpoint=f"/parties/v1/parties/{party_id}/muctoken", endpoint_type="glz"
         )
         return data
 
-    def party_fetch_voice_token(self) -> t.Mapping[str, t.Any]:
+    def party_fetch_voice_token(self, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
         """
         Party_FetchVoiceToken
         Get a token for party voice
         """
-        party_id = self.__get_current_party_id()
+        party_id = self.__check_party_id(party_id)
         data = self.fetch(
             endpoint=f"/parties/v1/parties/{party_id}/voicetoken", endpoint_type="glz"
         )
@@ -1067,59 +1026,20 @@ class Client:
         if queue_id not in queues:
             raise ValueError("Invalid queue type")
 
-    def _build_urls(self) -> str:
-        '''Generate URLs based on region/shard'''
-        base_url = base_endpoint.format(shard=self.shard)
-        base_url_glz = base_endpoint_glz.format(shard=self.shard, region=self.region)
-        base_url_shared = base_endpoint_shared.format(shard=self.shard)
-        return base_url, base_url_glz, base_url_shared
-
-    def __get_headers(self) -> dict:
+    def __get_headers(self, refresh_version=False) -> dict:
         '''Get authorization headers to make requests'''
         try:
             if self.auth is None:
-                return self.__get_auth_headers()
+                return self.__get_auth_headers(refresh_version)
             puuid, headers, _ = self.auth.authenticate()
-            headers['X-Riot-ClientPlatform'] = self.client_platform,
-            headers['X-Riot-ClientVersion'] = self.__get_current_version()
-
-            return puuid, headers, None
+            return puuid, self._client_headers(headers, self.version_provider.get(force=refresh_version)), None
 
         except Exception as e:
             logger.error(e)
             raise HandshakeError('Unable to get headers; is VALORANT running?')
 
-    def __get_auth_headers(self): # headers for pd/glz endpoints
-        local_headers = {
-            'Authorization': (
-                'Basic ' + base64.b64encode(('riot:' + self.lockfile['password']).encode()).decode()
-            )
-        }
-        response = requests.get("https://127.0.0.1:{port}/entitlements/v1/token".format(
-            port=self.lockfile['port']),
-            headers=local_headers,
-            verify=False
-        )
-        entitlements = response.json()
-        puuid = entitlements['subject']
-        headers = {
-            'Authorization': f"Bearer {entitlements['accessToken']}",
-            'X-Riot-Entitlements-JWT': entitlements['token'],
-            'X-Riot-ClientPlatform': self.client_platform,
-            'X-Riot-ClientVersion': self.__get_current_version()
-        }
+    def __get_auth_headers(self, refresh_version=False): # headers for pd/glz endpoints
+        local_headers = self._local_auth_headers()
+        response = self.sessions.request("local", "GET", self._url("/entitlements/v1/token", "local"), headers=local_headers)
+        puuid, headers = self._entitlement_headers(response.json(), self.version_provider.get(force=refresh_version))
         return puuid, headers, local_headers
-
-    def __get_current_version(self) -> str:
-        data = requests.get('https://valorant-api.com/v1/version')
-        data = data.json()['data']
-        return f"{data['branch']}-shipping-{data['buildVersion']}-{data['version'].split('.')[3]}" # return formatted version string
-
-    def __get_lockfile(self) -> dict:
-        try:
-            with open(self.lockfile_path) as lockfile:
-                data = lockfile.read().split(':')
-                keys = ['name', 'PID', 'port', 'password', 'protocol']
-                return dict(zip(keys, data))
-        except:
-            raise LockfileError("Lockfile not found")
\ No newline at end of file
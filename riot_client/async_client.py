@@ -0,0 +1,367 @@
+import json
+import base64
+import asyncio
+import typing as t
+import logging
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+from . import Client
+from .base import BaseClient, ClientState
+from .resources import cache_ttls
+from .sessions import endpoint_types
+from .single_flight import AsyncSingleFlight
+from .exceptions import ResponseError, HandshakeError, PhaseError
+
+
+class AsyncClient(BaseClient):
+    '''
+    Client on aiohttp, for code running on the event loop. fetch/post/put/
+    delete and the endpoint methods below are coroutines; only the endpoints
+    the presences use are here, the rest are on Client. Region, auth and
+    headers are a ClientState, shared with the Client it was made from by
+    from_client().
+
+    One aiohttp session is kept per endpoint type, sized and timed like the
+    sync client's SessionPool, and recreated if the event loop changes.
+    '''
+
+    def __init__(self, region='na', auth=None, pool_size=4, keep_alive=True, timeout=(5, 15), cache=True, cache_ttls=cache_ttls, version_provider=None, state=None):
+        '''
+        Arguments as for Client; state replaces region, auth and
+        version_provider with the ClientState of another client, and cache
+        may be that client's ResponseCache
+        '''
+        super().__init__(state or ClientState(region, auth, version_provider, timeout), cache, cache_ttls)
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        # concurrent fetches of one URL share a single request
+        self.in_flight = AsyncSingleFlight()
+        self._sessions = {}
+        self._requests = {endpoint_type: 0 for endpoint_type in endpoint_types}
+        self._connections = {endpoint_type: 0 for endpoint_type in endpoint_types}
+
+    @classmethod
+    def from_client(cls, client: Client) -> 'AsyncClient':
+        '''
+        An AsyncClient on the ClientState and response cache of an activated
+        Client, with its pool size, keep-alive and timeouts
+        '''
+        return cls(pool_size=client.sessions.pool_size, keep_alive=client.sessions.keep_alive, timeout=client.sessions.timeout, cache=client.cache, state=client.state)
+
+    async def activate(self) -> None:
+        '''Activate the client and get authorization'''
+        try:
+            if self.auth is None:
+                self.lockfile = self._get_lockfile()
+                self.puuid, self.headers, self.local_headers = await self.__get_headers()
+
+                session = await self.rnet_fetch_chat_session()
+                self.player_name = session["game_name"]
+                self.player_tag = session["game_tag"]
+            else:
+                self.puuid, self.headers, self.local_headers = await self.auth.ASYNCauthenticate()
+        except:
+            raise HandshakeError("Unable to activate; is VALORANT running?")
+
+    def connection_stats(self) -> dict:
+        '''Requests, connections opened and connection reuse per endpoint type'''
+        stats = {}
+        for endpoint_type in endpoint_types:
+            requests_sent = self._requests[endpoint_type]
+            connections = self._connections[endpoint_type]
+            reused = max(requests_sent - connections, 0)
+            stats[endpoint_type] = {
+                "requests": requests_sent,
+                "connections": connections,
+                "reused": reused,
+                "reuse_rate": reused/requests_sent if requests_sent else 0.0,
+            }
+        return stats
+
+    async def aclose(self) -> None:
+        '''Close the pooled connections'''
+        for _, session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
+
+    async def __aenter__(self) -> 'AsyncClient':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def fetch(self, endpoint="/", endpoint_type="pd", exceptions={}, region=None, retry=True) -> dict:
+        '''Get data from a pd/glz/local endpoint, retried once with fresh headers on a 400'''
+        url = self._url(endpoint, endpoint_type, region)
+        data = self.cache.get(endpoint_type, url, endpoint)
+        if data is not None:
+            return data
+
+        if endpoint_type in ["pd", "glz", "shared", "local"]:
+            headers = self.local_headers if endpoint_type == "local" else self.headers
+            status, text = await self.in_flight.do(("GET", url), lambda: self._request(endpoint_type, "GET", url, headers=headers))
+
+            # custom exceptions for http status codes
+            self._verify_status_code(status, exceptions)
+
+            try:
+                data = json.loads(text)
+            except: # as no data is set, an exception will be raised later in the method
+                pass
+
+        if data is None:
+            raise ResponseError("Request returned NoneType")
+
+        if "httpStatus" not in data:
+            self.cache.put(endpoint_type, url, endpoint, data)
+            return data
+        if data["httpStatus"] == 400:
+            if not retry:
+                raise ResponseError(f"Request returned httpStatus 400 with refreshed headers: {data}")
+            # if headers expire, refresh em! the version too, it may be what was rejected
+            self.puuid, self.headers, self.local_headers = await self.__get_headers(refresh_version=True)
+            return await self.fetch(endpoint=endpoint, endpoint_type=endpoint_type, exceptions=exceptions, region=region, retry=False)
+
+    async def post(self, endpoint="/", endpoint_type="pd", json_data={}, exceptions={}) -> dict:
+        '''Post data to a pd/glz/local endpoint'''
+        data = None
+        self.cache.invalidate(endpoint_type, per_phase=True)
+        if endpoint_type in ["pd", "glz", "shared", "local"]:
+            if endpoint_type == "local":
+                url, headers = self._url(endpoint, endpoint_type), self.local_headers
+            else:
+                url, headers = f'{self.base_url_glz if endpoint_type == "glz" else self.base_url}{endpoint}', self.headers
+            status, text = await self._request(endpoint_type, "POST", url, headers=headers, json=json_data)
+
+            # custom exceptions for http status codes
+            self._verify_status_code(status, exceptions)
+
+            try:
+                data = json.loads(text)
+            except:
+                data = None
+
+        return data
+
+    async def put(self, endpoint="/", endpoint_type="pd", json_data={}, exceptions={}) -> dict:
+        self.cache.invalidate(endpoint_type, per_phase=True)
+        status, text = await self._request(endpoint_type, "PUT", f'{self.base_url_glz if endpoint_type == "glz" else self.base_url}{endpoint}', headers=self.headers, data=json.dumps(json_data))
+        data = json.loads(text)
+
+        # custom exceptions for http status codes
+        self._verify_status_code(status, exceptions)
+
+        if data is not None:
+            return data
+        else:
+            raise ResponseError("Request returned NoneType")
+
+    async def delete(self, endpoint="/", endpoint_type="pd", json_data={}, exceptions={}) -> dict:
+        data = None
+        self.cache.invalidate(endpoint_type, per_phase=True)
+        if endpoint_type in ["pd", "glz", "shared"]:
+            status, _ = await self._request(endpoint_type, "DELETE", f'{self.base_url_glz if endpoint_type == "glz" else self.base_url}{endpoint}', headers=self.headers, json=json_data)
+
+            # custom exceptions for http status codes
+            self._verify_status_code(status, exceptions)
+        elif endpoint_type == "local":
+            status, text = await self._request("local", "DELETE", self._url(endpoint, endpoint_type), headers=self.local_headers, json=json_data)
+
+            # custom exceptions for http status codes
+            self._verify_status_code(status, exceptions)
+
+            try:
+                data = json.loads(text)
+            except:
+                data = {}
+
+        if data is not None:
+            return data
+        else:
+            raise ResponseError("Request returned NoneType")
+
+    async def _request(self, endpoint_type, method, url, **kwargs) -> t.Tuple[int, str]:
+        '''Status and body of a request sent through the session of endpoint_type'''
+        session = self.__session(endpoint_type)
+        self._requests[endpoint_type] += 1
+        async with session.request(method, url, **kwargs) as response:
+            return response.status, await response.text()
+
+    # --------------------------------------------------------------------------------------------------
+
+    # PVP endpoints
+    async def fetch_mmr(self, puuid: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
+        """
+        MMR_FetchPlayer
+        Get the match making rating for a player
+        """
+        puuid = self._check_puuid(puuid)
+        return await self.fetch(endpoint=f"/mmr/v1/players/{puuid}", endpoint_type="pd")
+
+    async def fetch_competitive_updates(
+        self,
+        puuid: t.Optional[t.Text] = None,
+        start_index: int = 0,
+        end_index: int = 15,
+        queue_id: t.Text = "competitive",
+    ) -> dict:
+        """
+        MMR_FetchCompetitiveUpdates
+        Get recent games and how they changed ranking
+        """
+        self._check_queue_type(queue_id)
+        puuid = self._check_puuid(puuid)
+        return await self.fetch(
+            endpoint=f"/mmr/v1/players/{puuid}/competitiveupdates?startIndex={start_index}&endIndex={end_index}"
+            + (f"&queue={queue_id}" if queue_id != "" else ""),
+            endpoint_type="pd",
+        )
+
+    # party endpoints
+    async def party_fetch_player(self) -> t.Mapping[str, t.Any]:
+        """
+        Party_FetchPlayer
+        Get the Party ID that a given player belongs to
+        """
+        return await self.fetch(endpoint=f"/parties/v1/players/{self.puuid}", endpoint_type="glz")
+
+    async def fetch_party(self, party_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
+        """
+        Party_FetchParty
+        Get details about a given party id
+        """
+        party_id = (await self.party_fetch_player())["CurrentPartyID"] if party_id is None else party_id
+        return await self.fetch(endpoint=f"/parties/v1/parties/{party_id}", endpoint_type="glz")
+
+    # live game endpoints
+    async def coregame_fetch_player(self) -> t.Mapping[str, t.Any]:
+        """
+        CoreGame_FetchPlayer
+        Get the game ID for an ongoing game the player is in
+        """
+        return await self.fetch(
+            endpoint=f"/core-game/v1/players/{self.puuid}",
+            endpoint_type="glz",
+            exceptions={404: [PhaseError, "You are not in a core-game"]},
+        )
+
+    async def coregame_fetch_match(self, match_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
+        """
+        CoreGame_FetchMatch
+        Get information about an ongoing game
+        """
+        match_id = (await self.coregame_fetch_player())["MatchID"] if match_id is None else match_id
+        return await self.fetch(
+            endpoint=f"/core-game/v1/matches/{match_id}",
+            endpoint_type="glz",
+            exceptions={404: [PhaseError, "You are not in a core-game"]},
+        )
+
+    # pregame endpoints
+    async def pregame_fetch_player(self) -> t.Mapping[str, t.Any]:
+        """
+        Pregame_GetPlayer
+        Get the ID of a game in the pre-game stage
+        """
+        return await self.fetch(
+            endpoint=f"/pregame/v1/players/{self.puuid}",
+            endpoint_type="glz",
+            exceptions={404: [PhaseError, "You are not in a pre-game"]},
+        )
+
+    async def pregame_fetch_match(self, match_id: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
+        """
+        Pregame_GetMatch
+        Get info for a game in the pre-game stage
+        """
+        match_id = (await self.pregame_fetch_player())["MatchID"] if match_id is None else match_id
+        return await self.fetch(
+            endpoint=f"/pregame/v1/matches/{match_id}",
+            endpoint_type="glz",
+            exceptions={404: [PhaseError, "You are not in a pre-game"]},
+        )
+
+    # local riotclient endpoints
+    async def fetch_presence(self, puuid: t.Optional[t.Text] = None) -> t.Mapping[str, t.Any]:
+        """
+        PRESENCE_RNet_GET
+        NOTE: Only works on self or active user's friends
+        """
+        puuid = self._check_puuid(puuid)
+        data = await self.fetch(endpoint="/chat/v4/presences", endpoint_type="local")
+        try:
+            for presence in data["presences"]:
+                if presence["puuid"] == puuid:
+                    return json.loads(base64.b64decode(presence["private"]))
+        except:
+            return None
+
+    async def riotclient_session_fetch_sessions(self) -> t.Mapping[str, t.Any]:
+        """
+        RiotClientSession_FetchSessions
+        Gets info about the running Valorant process including start arguments
+        """
+        return await self.fetch(endpoint="/product-session/v1/external-sessions", endpoint_type="local")
+
+    async def rnet_fetch_chat_session(self) -> t.Mapping[str, t.Any]:
+        """
+        TEXT_CHAT_RNet_FetchSession
+        Get the current session including player name and PUUID
+        """
+        return await self.fetch(endpoint="/chat/v1/session", endpoint_type="local")
+
+    # local utility functions
+    async def __get_headers(self, refresh_version=False) -> t.Tuple[str, dict, dict]:
+        '''Get authorization headers to make requests'''
+        try:
+            if self.auth is None:
+                local_headers = self._local_auth_headers()
+                status, text = await self._request("local", "GET", self._url("/entitlements/v1/token", "local"), headers=local_headers)
+                puuid, headers = self._entitlement_headers(json.loads(text), await self.__get_current_version(refresh_version))
+                return puuid, headers, local_headers
+            puuid, headers, _ = await self.auth.ASYNCauthenticate()
+            return puuid, self._client_headers(headers, await self.__get_current_version(refresh_version)), None
+
+        except Exception as e:
+            logger.error(e)
+            raise HandshakeError('Unable to get headers; is VALORANT running?')
+
+    async def __get_current_version(self, force=False) -> str:
+        # usually a file read; off the loop for when it has to go to valorant-api.com
+        return await asyncio.get_running_loop().run_in_executor(None, self.version_provider.get, force)
+
+    def __session(self, endpoint_type: str) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session_loop, session = self._sessions.get(endpoint_type, (None, None))
+        if session is not None and session_loop is loop and not session.closed:
+            return session
+
+        if endpoint_type not in endpoint_types:
+            raise ValueError(f"Invalid endpoint type, valid endpoint types are: {endpoint_types}")
+
+        trace = aiohttp.TraceConfig()
+
+        async def on_connection_create_end(session, context, params):
+            self._connections[endpoint_type] += 1
+        trace.on_connection_create_end.append(on_connection_create_end)
+
+        connector_options = {}
+        if endpoint_type == "local":
+            # the local client serves a self-signed certificate
+            connector_options["ssl"] = False
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self.pool_size,
+            force_close=not self.keep_alive,
+            **connector_options
+        )
+        timeout = aiohttp.ClientTimeout()
+        if self.timeout is not None:
+            connect, read = self.timeout
+            timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        session = aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=[trace])
+        self._sessions[endpoint_type] = (loop, session)
+        return session
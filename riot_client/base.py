@@ -0,0 +1,181 @@
+import os
+import base64
+import typing as t
+
+from .resources import regions, queues
+from .resources import region_shard_override, shard_region_override
+from .resources import base_endpoint
+from .resources import base_endpoint_glz
+from .resources import base_endpoint_shared
+
+from .auth import Auth
+from .response_cache import ResponseCache
+from .version import VersionProvider
+
+from .exceptions import LockfileError
+
+
+class ClientState:
+    '''
+    Region, URLs, player and headers of a client. An AsyncClient made from a
+    Client keeps the same ClientState rather than a copy, so headers refreshed
+    by either one (on a 400 or a re-auth) are used by both.
+    '''
+
+    def __init__(self, region='na', auth=None, version_provider=None, timeout=(5, 15)):
+        self.lockfile_path = None
+        if auth is None:
+            self.lockfile_path = os.path.join(
+                os.getenv('LOCALAPPDATA'), R'Riot Games\Riot Client\Config\lockfile')
+
+        self.puuid = ""
+        self.player_name = ""
+        self.player_tag = ""
+        self.lockfile = {}
+        self.headers = {}
+        self.local_headers = {}
+        self.region = region
+        self.shard = region
+        self.auth = None
+        self.version_provider = version_provider or VersionProvider(timeout=timeout)
+        self.client_platform = "ew0KCSJwbGF0Zm9ybVR5cGUiOiAiUEMiLA0KCSJwbGF0Zm9ybU9TIjogIldpbmRvd3MiLA0KCSJwbGF0Zm9ybU9TVmVyc2lvbiI6ICIxMC4wLjE5MDQyLjEuMjU2LjY0Yml0IiwNCgkicGxhdGZvcm1DaGlwc2V0IjogIlVua25vd24iDQp9"
+
+        if auth is not None:
+            self.auth = Auth(auth)
+
+        if region in regions:
+            self.region = region
+        else:
+            raise ValueError(f"Invalid region, valid regions are: {regions}")
+
+        if self.region in region_shard_override.keys():
+            self.shard = region_shard_override[self.region]
+        if self.shard in shard_region_override.keys():
+            self.region = shard_region_override[self.shard]
+
+        self.base_url, self.base_url_glz, self.base_url_shared = self.build_urls()
+
+    def build_urls(self) -> t.Tuple[str, str, str]:
+        '''Generate URLs based on region/shard'''
+        base_url = base_endpoint.format(shard=self.shard)
+        base_url_glz = base_endpoint_glz.format(shard=self.shard, region=self.region)
+        base_url_shared = base_endpoint_shared.format(shard=self.shard)
+        return base_url, base_url_glz, base_url_shared
+
+
+def _state(name: str) -> property:
+    '''An attribute kept on the client's ClientState'''
+    def get(self):
+        return getattr(self.state, name)
+
+    def set(self, value):
+        setattr(self.state, name, value)
+
+    return property(get, set, doc=f"state.{name}")
+
+
+class BaseClient:
+    '''
+    What Client and AsyncClient have in common: the ClientState, the response
+    cache and the URL, lockfile and header helpers. Only how requests are sent
+    differs between the two.
+    '''
+
+    puuid = _state("puuid")
+    player_name = _state("player_name")
+    player_tag = _state("player_tag")
+    lockfile = _state("lockfile")
+    lockfile_path = _state("lockfile_path")
+    headers = _state("headers")
+    local_headers = _state("local_headers")
+    region = _state("region")
+    shard = _state("shard")
+    auth = _state("auth")
+    version_provider = _state("version_provider")
+    client_platform = _state("client_platform")
+    base_url = _state("base_url")
+    base_url_glz = _state("base_url_glz")
+    base_url_shared = _state("base_url_shared")
+
+    def __init__(self, state: ClientState, cache: t.Union[bool, ResponseCache], cache_ttls) -> None:
+        self.state = state
+        # a ResponseCache is used as is, to share one between clients
+        self.cache = cache if isinstance(cache, ResponseCache) else ResponseCache(cache_ttls if cache else [])
+
+    def cache_stats(self) -> dict:
+        '''Cache hits, misses and invalidations per cached endpoint'''
+        return self.cache.stats()
+
+    def in_flight_stats(self) -> dict:
+        '''Fetches sent and fetches that joined an identical one in flight'''
+        return self.in_flight.stats()
+
+    def invalidate_cache(self, endpoint_type=None, prefix=None, per_phase=False) -> int:
+        '''
+        Drop cached fetch responses, e.g. with per_phase when the session loop
+        state changes. Returns how many were dropped.
+        '''
+        return self.cache.invalidate(endpoint_type, prefix, per_phase)
+
+    @staticmethod
+    def fetch_regions() -> list:
+        '''Fetch valid regions'''
+        return regions
+
+    def _verify_status_code(self, status_code, exceptions={}):
+        '''Verify that the request was successful according to exceptions'''
+        if status_code in exceptions.keys():
+            response_exception = exceptions[status_code]
+            raise response_exception[0](response_exception[1])
+
+    def _check_puuid(self, puuid) -> str:
+        '''If puuid passed into method is None make it current user's puuid'''
+        return self.puuid if puuid is None else puuid
+
+    def _check_queue_type(self, queue_id) -> None:
+        '''Check if queue id is valid'''
+        if queue_id not in queues:
+            raise ValueError("Invalid queue type")
+
+    def _build_urls(self) -> t.Tuple[str, str, str]:
+        '''Generate URLs based on region/shard'''
+        return self.state.build_urls()
+
+    def _url(self, endpoint, endpoint_type, region=None) -> str:
+        '''Full URL of a pd/glz/shared/local endpoint, pd/glz/shared in region if given'''
+        if endpoint_type == "local":
+            return "https://127.0.0.1:{port}{endpoint}".format(port=self.lockfile['port'], endpoint=endpoint)
+        region = region or self.region
+        base_url = self.base_url_glz if endpoint_type == "glz" else self.base_url_shared if endpoint_type == "shared" else self.base_url
+        return f'{base_url.replace(self.region, region)}{endpoint}'
+
+    def _local_auth_headers(self) -> dict:
+        '''Headers for the local client, from the lockfile'''
+        return {
+            'Authorization': (
+                'Basic ' + base64.b64encode(('riot:' + self.lockfile['password']).encode()).decode()
+            )
+        }
+
+    def _client_headers(self, headers, version) -> dict:
+        '''pd/glz headers: the auth headers plus the client platform and version'''
+        headers['X-Riot-ClientPlatform'] = self.client_platform
+        headers['X-Riot-ClientVersion'] = version
+        return headers
+
+    def _entitlement_headers(self, entitlements, version) -> t.Tuple[str, dict]:
+        '''puuid and pd/glz headers from the local client's entitlements token'''
+        headers = {
+            'Authorization': f"Bearer {entitlements['accessToken']}",
+            'X-Riot-Entitlements-JWT': entitlements['token'],
+        }
+        return entitlements['subject'], self._client_headers(headers, version)
+
+    def _get_lockfile(self) -> dict:
+        try:
+            with open(self.lockfile_path) as lockfile:
+                data = lockfile.read().split(':')
+                keys = ['name', 'PID', 'port', 'password', 'protocol']
+                return dict(zip(keys, data))
+        except:
+            raise LockfileError("Lockfile not found")
@@ -12,4 +12,22 @@ shard_region_override = {
     "pbe": "na"
 }
 
-queues = ["competitive", "custom", "deathmatch", "ggteam", "snowball", "spikerush", "unrated", "onefa", "null"]
\ No newline at end of file
+queues = ["competitive", "custom", "deathmatch", "ggteam", "snowball", "spikerush", "unrated", "onefa", "null"]
+
+# seconds a fetch response is reused, per (endpoint type, endpoint prefix);
+# the first match wins and endpoints without one are never cached, a * in a
+# prefix stands for one path segment. Entries marked per_phase are dropped
+# whenever the session loop state changes.
+cache_ttls = [
+    # endpoint_type, prefix, ttl, per_phase
+    ("shared", "/content-service/", 6*60*60, False),
+    ("shared", "/v1/config/", 6*60*60, False),
+    ("pd", "/contract-definitions/", 6*60*60, False),
+    # the rank after a match shows up a while after the menus do
+    ("pd", "/mmr/v1/players/*/competitiveupdates", 30, True),
+    ("pd", "/mmr/v1/players/", 5*60, True),
+    ("glz", "/core-game/", 5, True),
+    ("glz", "/pregame/", 2, True),
+    ("glz", "/parties/v1/players/", 5, True),
+    ("local", "/chat/v4/presences", 2, True),
+]
@@ -0,0 +1,103 @@
+import json
+import time
+import fnmatch
+import threading
+import typing as t
+from collections import OrderedDict
+
+
+class ResponseCache:
+    '''
+    Responses of Client.fetch kept for the TTL of the first policy whose
+    endpoint type and prefix match, see resources.cache_ttls. They are kept
+    serialized and every hit parses its own copy, so a caller modifying what
+    it got cannot change what the next one gets.
+
+    Expired responses are dropped when they are looked up and on every put,
+    and past max_entries the least recently used ones go first.
+    '''
+
+    def __init__(self, policies: t.List[t.Tuple[str, str, float, bool]], max_entries: int = 256) -> None:
+        self.policies = policies
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # least recently used first
+        self._lock = threading.Lock()
+        self._stats = {(endpoint_type, prefix): {"hits": 0, "misses": 0, "invalidated": 0, "evicted": 0} for endpoint_type, prefix, _, _ in policies}
+
+    def policy(self, endpoint_type: str, endpoint: str) -> t.Optional[t.Tuple[str, str, float, bool]]:
+        for policy in self.policies:
+            if policy[0] != endpoint_type:
+                continue
+            # a * in the prefix stands for one path segment, e.g. the puuid
+            if endpoint.startswith(policy[1]) if "*" not in policy[1] else fnmatch.fnmatchcase(endpoint, policy[1] + "*"):
+                return policy
+        return None
+
+    def get(self, endpoint_type: str, url: str, endpoint: str) -> t.Optional[t.Any]:
+        '''The cached data for url, None when it is missing, expired or not cached at all'''
+        policy = self.policy(endpoint_type, endpoint)
+        if policy is None:
+            return None
+
+        key = (endpoint_type, url)
+        with self._lock:
+            entry = self._entries.get(key)
+            stats = self._stats[policy[:2]]
+            if entry is not None and entry[0] < time.monotonic():
+                self.__evict(key)
+                entry = None
+            if entry is None:
+                stats["misses"] += 1
+                return None
+            stats["hits"] += 1
+            self._entries.move_to_end(key)
+            serialized = entry[1]
+        return json.loads(serialized)
+
+    def put(self, endpoint_type: str, url: str, endpoint: str, data: t.Any) -> None:
+        policy = self.policy(endpoint_type, endpoint)
+        if policy is None:
+            return
+        serialized = json.dumps(data)
+        key = (endpoint_type, url)
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now + policy[2], serialized, policy)
+            self._entries.move_to_end(key)
+            for expired in [cached for cached, entry in self._entries.items() if entry[0] < now]:
+                self.__evict(expired)
+            while len(self._entries) > self.max_entries:
+                self.__evict(next(iter(self._entries)))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self, endpoint_type: str = None, prefix: str = None, per_phase: bool = False) -> int:
+        '''
+        Drop cached responses; all of them, those of an endpoint type and/or
+        policy prefix, or with per_phase only those tied to the current phase.
+        Returns how many were dropped.
+        '''
+        with self._lock:
+            dropped = [
+                key for key, (_, _, policy) in self._entries.items()
+                if (endpoint_type is None or policy[0] == endpoint_type)
+                and (prefix is None or policy[1] == prefix)
+                and (not per_phase or policy[3])
+            ]
+            for key in dropped:
+                self._stats[self._entries.pop(key)[2][:2]]["invalidated"] += 1
+        return len(dropped)
+
+    def stats(self) -> t.Dict[str, t.Dict[str, t.Union[int, float]]]:
+        '''Hits, misses, hit rate, invalidations and evictions per policy, keyed "<type> <prefix>"'''
+        with self._lock:
+            stats = {}
+            for (endpoint_type, prefix), counts in self._stats.items():
+                lookups = counts["hits"] + counts["misses"]
+                stats[f"{endpoint_type} {prefix}"] = dict(counts, hit_rate=counts["hits"]/lookups if lookups else 0.0)
+            return stats
+
+    def __evict(self, key: t.Tuple[str, str]) -> None:
+        # expired or least recently used, the lock is held
+        self._stats[self._entries.pop(key)[2][:2]]["evicted"] += 1
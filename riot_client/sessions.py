@@ -0,0 +1,144 @@
+import functools
+import threading
+import typing as t
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import connection, connectionpool
+
+endpoint_types = ["pd", "glz", "shared", "local"]
+
+
+class _CountingConnection:
+    '''
+    Calls on_connect whenever the connection opens. urllib3 reopens a dropped
+    connection on the same object, so the count is kept in connect() rather
+    than per connection object.
+    '''
+
+    def __init__(self, *args, on_connect: t.Optional[t.Callable[[], None]] = None, **kwargs) -> None:
+        self.on_connect = on_connect
+        super().__init__(*args, **kwargs)
+
+    def connect(self) -> None:
+        if self.on_connect is not None:
+            self.on_connect()
+        super().connect()
+
+
+class _CountingHTTPConnection(_CountingConnection, connection.HTTPConnection):
+    pass
+
+
+class _CountingHTTPSConnection(_CountingConnection, connection.HTTPSConnection):
+    pass
+
+
+# the pools hand on_connect, like any keyword they do not know, to their connections
+class _CountingHTTPConnectionPool(connectionpool.HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _CountingAdapter(HTTPAdapter):
+    '''HTTPAdapter that counts the connections (TCP and TLS handshakes) it opens'''
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.connections = 0
+        self._lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": functools.partial(_CountingHTTPConnectionPool, on_connect=self._opened),
+            "https": functools.partial(_CountingHTTPSConnectionPool, on_connect=self._opened),
+        }
+
+    def _opened(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+
+class SessionPool:
+    '''
+    One keep-alive requests.Session per endpoint type, so repeated calls to
+    the pd/glz/shared hosts and the local client reuse their TCP and TLS
+    connections instead of handshaking on every request.
+
+    pool_size: connections kept open per host
+    keep_alive: False sends "Connection: close" and opens a connection per request
+    timeout: (connect, read) seconds applied to every request without its own
+    '''
+
+    def __init__(self, pool_size: int = 4, keep_alive: bool = True, timeout: t.Optional[t.Tuple[float, float]] = (5, 15)) -> None:
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self._sessions = {}
+        self._requests = {endpoint_type: 0 for endpoint_type in endpoint_types}
+        self._lock = threading.Lock()
+
+    def request(self, endpoint_type: str, method: str, url: str, **kwargs) -> requests.Response:
+        '''Send a request through the session of endpoint_type'''
+        kwargs.setdefault("timeout", self.timeout)
+        session = self.session(endpoint_type)
+        with self._lock:
+            self._requests[endpoint_type] += 1
+        return session.request(method, url, **kwargs)
+
+    def session(self, endpoint_type: str) -> requests.Session:
+        '''The session of endpoint_type, created on first use'''
+        session = self._sessions.get(endpoint_type)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(endpoint_type)
+                if session is None:
+                    session = self.__create_session(endpoint_type)
+                    self._sessions[endpoint_type] = session
+        return session
+
+    def stats(self) -> t.Dict[str, t.Dict[str, t.Union[int, float]]]:
+        '''
+        Requests sent and connections opened per endpoint type; every request
+        beyond the connections opened went over a reused connection
+        '''
+        stats = {}
+        for endpoint_type, requests_sent in self._requests.items():
+            session = self._sessions.get(endpoint_type)
+            connections = session.get_adapter("https://").connections if session is not None else 0
+            reused = max(requests_sent - connections, 0)
+            stats[endpoint_type] = {
+                "requests": requests_sent,
+                "connections": connections,
+                "reused": reused,
+                "reuse_rate": reused/requests_sent if requests_sent else 0.0,
+            }
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def __create_session(self, endpoint_type: str) -> requests.Session:
+        if endpoint_type not in endpoint_types:
+            raise ValueError(f"Invalid endpoint type, valid endpoint types are: {endpoint_types}")
+
+        session = requests.Session()
+        adapter = _CountingAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if endpoint_type == "local":
+            # the local client serves a self-signed certificate; without
+            # trust_env a REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE would override
+            # verify, and proxies have no business with 127.0.0.1 anyway
+            session.verify = False
+            session.trust_env = False
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
@@ -0,0 +1,93 @@
+import copy
+import asyncio
+import threading
+import typing as t
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    '''
+    In-flight request table for threads: while a call for a key is running,
+    other callers with the same key wait for it and get a deep copy of its
+    result (or its exception) instead of sending their own request.
+    '''
+
+    def __init__(self) -> None:
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: t.Hashable, fn: t.Callable[[], t.Any]) -> t.Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> t.Dict[str, int]:
+        '''Calls sent, calls that joined one in flight instead, and calls in flight now'''
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    '''
+    SingleFlight for coroutines on the event loop. The call runs as a task of
+    its own, so a caller being cancelled does not cancel it for the others.
+    Every caller gets its own deep copy of the result.
+    '''
+
+    def __init__(self) -> None:
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: t.Hashable, fn: t.Callable[[], t.Awaitable[t.Any]]) -> t.Any:
+        loop = asyncio.get_running_loop()
+        key = (loop, key)
+        task = self._calls.get(key)
+        if task is None:
+            task = loop.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda task: self.__done(key, task))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def stats(self) -> t.Dict[str, int]:
+        '''Calls sent, calls that joined one in flight instead, and calls in flight now'''
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+    def __done(self, key: t.Tuple[asyncio.AbstractEventLoop, t.Hashable], task: asyncio.Task) -> None:
+        self._calls.pop(key, None)
+        if not task.cancelled():
+            # retrieved here too, in case every caller was cancelled
+            task.exception()
@@ -0,0 +1,151 @@
+import os
+import re
+import json
+import time
+import threading
+import typing as t
+import logging
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# the running client writes e.g. "CI server version: release-08.09-shipping-10-2521387"
+# near the top of its log
+_log_version = re.compile(r"CI server version: (?P<version>(?P<branch>\S+)-shipping-(?P<build>\d+)-(?P<changelist>\d+))")
+_log_head_bytes = 256*1024
+
+
+def format_version(data: dict) -> str:
+    '''Client version string from valorant-api.com/v1/version data'''
+    return f"{data['branch']}-shipping-{data['buildVersion']}-{data['version'].split('.')[3]}"
+
+
+class VersionProvider:
+    '''
+    The client version sent as X-Riot-ClientVersion, without a request to
+    valorant-api.com on every header refresh.
+
+    The version is read from the log of the running client when there is one,
+    and kept in cache_path with its build so the next run starts with it.
+    Without a log the cached version is used and, once older than max_age,
+    checked against valorant-api.com on a background thread. Only when there
+    is neither does get() wait on valorant-api.com.
+
+    log_path: ShooterGame.log of the local client
+    cache_path: JSON file the version is kept in between runs, None to keep it in memory only
+    max_age: seconds before a version not read from the log is refreshed in the background
+    '''
+
+    def __init__(self, cache_path: t.Optional[str] = None, log_path: t.Optional[str] = None, max_age: float = 6*60*60, timeout: t.Tuple[float, float] = (5, 15)) -> None:
+        if log_path is None and os.getenv('LOCALAPPDATA') is not None:
+            log_path = os.path.join(os.getenv('LOCALAPPDATA'), R'VALORANT\Saved\Logs\ShooterGame.log')
+        self.log_path = log_path
+        self.cache_path = cache_path
+        self.max_age = max_age
+        self.timeout = timeout
+
+        self._entry = None # {"version", "build", "source", "checked_at"}
+        self._log_mtime = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def get(self, force: bool = False) -> str:
+        '''
+        The client version, refreshing it in the background when it is stale.
+        force re-reads the log, or when there is none waits on valorant-api.com,
+        for when the version in use was rejected.
+        '''
+        with self._lock:
+            if force:
+                self._log_mtime = None
+                entry = self.__from_log()
+                if entry is not None:
+                    self._entry = entry
+                    return entry["version"]
+                if self._entry is not None and self._entry["source"] == "log":
+                    # the log is gone, what it said can no longer be trusted
+                    self._entry = dict(self._entry, source="cache")
+            entry = None if force else self.__from_log() or self._entry or self.__from_cache()
+            if entry is not None:
+                self._entry = entry
+                if entry["source"] != "log" and time.time() - entry["checked_at"] > self.max_age and not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self.__refresh_in_background, name='version-refresh', daemon=True).start()
+                return entry["version"]
+
+        # first run without the client's log, nothing to go on but the network
+        return self.refresh()
+
+    def refresh(self) -> str:
+        '''Fetch the version from valorant-api.com and cache it'''
+        response = requests.get('https://valorant-api.com/v1/version', timeout=self.timeout)
+        entry = self.__entry(format_version(response.json()['data']), "valorant-api")
+        with self._lock:
+            # a version read from the log is the one actually running
+            if self._entry is None or self._entry["source"] != "log":
+                if self._entry is None or self._entry["build"] != entry["build"]:
+                    logger.debug(f'Client version {entry["version"]} from valorant-api.com')
+                self._entry = entry
+                self.__save(entry)
+            return self._entry["version"]
+
+    def __refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f'Unable to refresh the client version: {e}')
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def __from_log(self) -> t.Optional[dict]:
+        # the log is only read again once the client has rewritten it
+        if self.log_path is None:
+            return None
+        try:
+            mtime = os.path.getmtime(self.log_path)
+        except OSError:
+            return None
+        if mtime == self._log_mtime:
+            return self._entry if self._entry is not None and self._entry["source"] == "log" else None
+        self._log_mtime = mtime
+
+        try:
+            with open(self.log_path, encoding='utf-8', errors='replace') as log:
+                match = _log_version.search(log.read(_log_head_bytes))
+        except OSError:
+            return None
+        if match is None:
+            return None
+
+        entry = self.__entry(match['version'], "log")
+        if self._entry is None or self._entry["version"] != entry["version"]:
+            logger.debug(f'Client version {entry["version"]} from {self.log_path}')
+            self.__save(entry)
+        return entry
+
+    def __from_cache(self) -> t.Optional[dict]:
+        if self.cache_path is None:
+            return None
+        try:
+            with open(self.cache_path) as cache:
+                entry = json.load(cache)
+            # read from a log last run, but it is gone now
+            return dict(entry, source="cache" if entry["source"] == "log" else entry["source"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def __save(self, entry: dict) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            with open(self.cache_path, mode='w') as cache:
+                json.dump(entry, cache)
+        except OSError as e:
+            logger.warning(f'Unable to cache the client version in {self.cache_path}: {e}')
+
+    @staticmethod
+    def __entry(version: str, source: str) -> dict:
+        build = version.rsplit('-shipping-', 1)[-1]
+        return {"version": version, "build": build, "source": source, "checked_at": time.time()}
@@ -0,0 +1,26 @@
+import pytest
+
+from riot_client import Client
+from riot_client.async_client import AsyncClient
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    return Client()
+
+
+def test_from_client_shares_state_and_cache(client):
+    async_client = AsyncClient.from_client(client)
+    assert async_client.state is client.state
+    assert async_client.cache is client.cache
+    assert not hasattr(async_client, 'sessions')
+
+
+def test_headers_refreshed_by_either_client_are_used_by_both(client):
+    async_client = AsyncClient.from_client(client)
+    client.puuid, client.headers = 'player', {'Authorization': 'Bearer a'}
+    assert async_client.puuid == 'player'
+    assert async_client.headers == {'Authorization': 'Bearer a'}
+    async_client.headers = {'Authorization': 'Bearer b'}
+    assert client.headers == {'Authorization': 'Bearer b'}
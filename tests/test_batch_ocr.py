@@ -0,0 +1,47 @@
+import os
+import json
+
+import pytest
+import pytesseract
+from PIL import Image
+
+from presences.ingame.frame import Frame
+from presences.ingame.reader_util import TopBarReader, score_tes_config, timer_tes_config
+
+captures_path = os.path.join(os.path.dirname(__file__), '..', 'captures')
+with open(os.path.join(captures_path, 'labels.json')) as f:
+   labels = json.load(f)
+
+def tesseract_languages():
+   try:
+      return pytesseract.get_languages()
+   except Exception:
+      return []
+
+def reader(**kwargs) -> TopBarReader:
+   # tesseract only, so every region goes through the path being compared
+   return TopBarReader(False, False, 'tesseract', glyph_atlas_path=None, **kwargs)
+
+def score_masks(reader: TopBarReader, name: str):
+   frame = Frame(Image.open(os.path.join(captures_path, name)).convert('RGB'))
+   return [mask.copy() for mask in reader.get_score_masks(frame)]
+
+def test_batches_only_reads_of_one_config(monkeypatch):
+   top_bar = reader(batch_ocr=True)
+   calls = []
+   monkeypatch.setattr(top_bar, '_read_batch', lambda masks, config: calls.append(('batch', len(masks), config)) or ['1']*len(masks))
+   monkeypatch.setattr(top_bar, '_tesseract', lambda mask, config: calls.append(('single', 1, config)) or '1:00')
+
+   blue, red = score_masks(top_bar, 'capture2.png')
+   top_bar._prefetch_text([(blue, score_tes_config), (red, score_tes_config), (blue, timer_tes_config)])
+   assert sorted(calls) == [('batch', 2, score_tes_config), ('single', 1, timer_tes_config)]
+
+scored = [name for name, label in labels.items() if label.get('scores')]
+
+@pytest.mark.skipif('val4' not in tesseract_languages(), reason='needs tesseract with the val4 traineddata')
+@pytest.mark.parametrize('name', scored)
+def test_batched_scores_read_like_unbatched(name):
+   top_bar = reader()
+   masks = score_masks(top_bar, name)
+   unbatched = [top_bar._tesseract(mask, score_tes_config) for mask in masks]
+   assert top_bar._read_batch(masks, score_tes_config) == unbatched
@@ -0,0 +1,72 @@
+import os
+import glob
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from presences.ingame.binarize import INK, PAPER, white_mask, red_mask
+
+captures_path = os.path.join(os.path.dirname(__file__), '..', 'captures')
+# truncated on disk, PIL cannot decode it
+unreadable = {'capture6.png'}
+captures = sorted(
+   path for path in glob.glob(os.path.join(captures_path, '*.png'))
+   if os.path.basename(path) not in unreadable
+)
+
+# the per-pixel loops TopBarReader used before binarize, as the oracle
+def loop_mask(image: Image.Image, is_ink) -> np.ndarray:
+   pixels = image.load()
+   mask = np.full((image.height, image.width), PAPER, np.uint8)
+   for x in range(image.width):
+      for y in range(image.height):
+         if is_ink(pixels[x, y]):
+            mask[y, x] = INK
+   return mask
+
+def loop_white_mask(image: Image.Image, min_threshold: int = 255) -> np.ndarray:
+   return loop_mask(image, lambda pixel: sum(pixel)/3 >= min_threshold)
+
+def loop_red_mask(image: Image.Image) -> np.ndarray:
+   return loop_mask(image, lambda pixel: pixel[0] > 253 and pixel[1] < 3 and pixel[2] < 3)
+
+def load(path: str, mode: str = 'RGB') -> Image.Image:
+   return Image.open(path).convert(mode)
+
+def test_captures_are_found():
+   assert len(captures) >= 10
+
+@pytest.mark.parametrize('path', captures, ids=os.path.basename)
+@pytest.mark.parametrize('threshold', [255, 235, 200, 150])
+def test_white_mask_matches_the_loop(path, threshold):
+   image = load(path)
+   assert np.array_equal(white_mask(np.asarray(image), threshold), loop_white_mask(image, threshold))
+
+@pytest.mark.parametrize('path', captures, ids=os.path.basename)
+def test_red_mask_matches_the_loop(path):
+   image = load(path)
+   assert np.array_equal(red_mask(np.asarray(image)), loop_red_mask(image))
+
+@pytest.mark.parametrize('threshold', [255, 200])
+def test_white_mask_of_rgba_counts_alpha_like_the_loop(threshold):
+   # the loop summed every channel, alpha too, and divided by 3
+   image = load(os.path.join(captures_path, 'capture2.png'), 'RGBA')
+   pixels = np.array(image)
+   pixels[::2, :, 3] = 128
+   image = Image.fromarray(pixels, 'RGBA')
+   assert np.array_equal(white_mask(pixels, threshold), loop_white_mask(image, threshold))
+
+def test_red_mask_of_rgba_ignores_alpha():
+   image = load(os.path.join(captures_path, 'capture2.png'), 'RGBA')
+   pixels = np.array(image)
+   pixels[:, ::3, 3] = 0
+   image = Image.fromarray(pixels, 'RGBA')
+   assert np.array_equal(red_mask(pixels), loop_red_mask(image))
+
+def test_reuses_out_buffers():
+   pixels = np.asarray(load(captures[0]))
+   out = np.empty(pixels.shape[:2], np.uint8)
+   totals = np.empty(pixels.shape[:2], np.uint16)
+   assert white_mask(pixels, 200, out=out, totals=totals) is out
+   assert np.array_equal(out, white_mask(pixels, 200))
@@ -0,0 +1,57 @@
+import time
+import threading
+
+from presences.ingame.capture_worker import CaptureWorker
+
+class SlowScoreReader():
+   debug = False
+   ocr_executor = None
+
+   def __init__(self, read_seconds):
+      self.read_seconds = read_seconds
+      self.lock = threading.Lock()
+      self.reading = 0
+      self.most_reading = 0
+      self.frames = 0
+
+   def record_frame(self, print_screen, read_timer):
+      with self.lock:
+         self.reading += 1
+         self.most_reading = max(self.most_reading, self.reading)
+      time.sleep(self.read_seconds)
+      with self.lock:
+         self.reading -= 1
+         self.frames += 1
+      return (0, 0), (None, None, None), 'buy phase'
+
+class SlowScreenReader():
+   def __init__(self, read_seconds):
+      self.score_reader = SlowScoreReader(read_seconds)
+
+   def capture_screen(self):
+      return None
+
+def test_start_after_a_timed_out_stop_waits_for_the_old_thread():
+   screen_reader = SlowScreenReader(0.3)
+   worker = CaptureWorker(screen_reader, interval=0)
+   worker.start()
+   time.sleep(0.05)
+   # the frame being read outlasts the timeout
+   worker.stop(timeout=0.01)
+   assert worker.running
+   worker.start()
+   time.sleep(0.5)
+   worker.stop()
+   assert not worker.running
+   assert screen_reader.score_reader.most_reading == 1
+   assert screen_reader.score_reader.frames >= 2
+
+def test_start_while_running_keeps_one_thread():
+   screen_reader = SlowScreenReader(0.05)
+   worker = CaptureWorker(screen_reader, interval=0)
+   worker.start()
+   worker.start()
+   time.sleep(0.2)
+   worker.stop()
+   assert screen_reader.score_reader.most_reading == 1
+   assert worker.latest().results[2] == 'buy phase'
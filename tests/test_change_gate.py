@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+from presences.ingame.binarize import INK, PAPER
+from presences.ingame.change_gate import ChangeGate
+from presences.ingame.frame import Frame
+from presences.ingame.reader_util import TopBarReader
+
+captures_path = os.path.join(os.path.dirname(__file__), '..', 'captures')
+
+def capture(name: str) -> Frame:
+   return Frame(Image.open(os.path.join(captures_path, name)).convert('RGB'))
+
+def counting_reader(monkeypatch):
+   reader = TopBarReader(False, False, 'tesseract', glyph_atlas_path=None)
+   reads = []
+   monkeypatch.setattr(reader, '_read_text', lambda mask, config: reads.append(mask.copy()) or str(len(reads)))
+   return reader, reads
+
+def test_unchanged_frame_reuses_the_scores(monkeypatch):
+   reader, reads = counting_reader(monkeypatch)
+   frame = capture('capture2.png')
+   scores = reader.get_scores(frame)
+   assert len(reads) == 2
+
+   # the same pixels in a frame of their own, read through the same buffers
+   copied = Frame(frame.pixels.copy())
+   assert reader.get_scores(copied) == scores
+   assert len(reads) == 2
+   assert reader.change_gate.stats()['scores']['hits'] == 1
+
+def test_changed_region_is_read_again(monkeypatch):
+   reader, reads = counting_reader(monkeypatch)
+   reader.get_scores(capture('capture2.png'))
+   reader.get_scores(capture('capture3.png'))
+   assert len(reads) == 4
+   assert reader.change_gate.stats()['scores'] == {'hits': 0, 'misses': 2, 'hit_rate': 0.0}
+
+def test_keeps_its_own_copy_of_the_masks():
+   gate = ChangeGate()
+   mask = np.full((4, 4), PAPER, np.uint8)
+   gate.store('scores', (1, 2), mask)
+   # the reader overwrites its buffers with the next frame
+   mask[0, 0] = INK
+   assert gate.lookup('scores', mask) == (False, None)
+   mask[0, 0] = PAPER
+   assert gate.lookup('scores', mask) == (True, (1, 2))
+
+def test_tolerates_max_changed_pixels():
+   gate = ChangeGate(max_changed_pixels=1)
+   mask = np.full((4, 4), PAPER, np.uint8)
+   gate.store('timer', (0, 29, 0), mask)
+   mask[0, 0] = INK
+   assert gate.lookup('timer', mask) == (True, (0, 29, 0))
+   mask[1, 1] = INK
+   assert gate.lookup('timer', mask) == (False, None)
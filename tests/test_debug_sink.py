@@ -0,0 +1,26 @@
+import time
+import threading
+
+import cv2
+import numpy as np
+
+from presences.ingame import debug_sink
+from presences.ingame.debug_sink import DebugSink
+
+def test_windows_are_only_drawn_on_the_pumping_thread(monkeypatch, tmp_path):
+   gui_threads = set()
+   for name in ('imshow', 'moveWindow', 'destroyAllWindows'):
+      monkeypatch.setattr(debug_sink.cv2, name, lambda *args: gui_threads.add(threading.get_ident()))
+   monkeypatch.setattr(debug_sink.cv2, 'waitKey', lambda delay: gui_threads.add(threading.get_ident()) or -1)
+
+   sink = DebugSink(display=True, dump_path=str(tmp_path))
+   sink.show('top bar', np.zeros((8, 8, 3), np.uint8), (0, 0), color=cv2.COLOR_RGB2BGR)
+   deadline = time.monotonic() + 2
+   while sink.rendered == 0 and time.monotonic() < deadline:
+      time.sleep(0.01)
+   assert not gui_threads
+   assert len(list(tmp_path.iterdir())) == 1
+
+   sink.pump()
+   sink.close()
+   assert gui_threads == {threading.get_ident()}
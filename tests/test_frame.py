@@ -0,0 +1,31 @@
+import numpy as np
+
+from presences.ingame.frame import Frame, FrameBuffers
+from presences.ingame.hud import HudLayout, HudRegion, WhiteMask
+
+region = (0.1, 0.1, 0.5, 0.5)
+position = (0.5, 0.5)
+
+def frame():
+   pixels = np.zeros((100, 200, 3), np.uint8)
+   pixels[2, 1] = 255
+   return Frame(pixels)
+
+def test_preloaded_geometry_stays_with_its_buffers():
+   calibrated, plain = FrameBuffers(), FrameBuffers()
+   calibrated.preload((200, 100), {region: (0, 0, 10, 10)}, {position: (1, 2)})
+
+   assert calibrated.box(frame(), region) == (0, 0, 10, 10)
+   assert calibrated.pixel(frame(), position).tolist() == [255, 255, 255]
+   # frames of the same size read through other buffers are not calibrated
+   assert plain.box(frame(), region) == frame().box(region) == (20, 10, 100, 50)
+   assert plain.pixel(frame(), position).tolist() == [0, 0, 0]
+
+def test_layouts_plan_per_buffers():
+   layout = HudLayout((HudRegion('text', region, WhiteMask()),))
+   calibrated, plain = FrameBuffers(), FrameBuffers()
+   calibrated.preload((200, 100), {region: (0, 0, 10, 10)})
+
+   assert layout.masks(frame(), ('text',), calibrated)['text'].shape == (10, 10)
+   assert layout.masks(frame(), ('text',), plain)['text'].shape == (40, 80)
+   assert layout.masks(frame(), ('text',), calibrated)['text'].shape == (10, 10)
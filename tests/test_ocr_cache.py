@@ -0,0 +1,41 @@
+import numpy as np
+
+from presences.ingame.binarize import INK, PAPER
+from presences.ingame.ocr_cache import OcrCache
+
+def mask(*ink):
+   mask = np.full((8, 8), PAPER, np.uint8)
+   for x, y in ink:
+      mask[y, x] = INK
+   return mask
+
+def test_hits_a_mask_seen_before():
+   cache = OcrCache()
+   cache.put(OcrCache.key(mask((1, 1)), 'score'), '7')
+   # another array with the same pixels
+   assert cache.get(OcrCache.key(mask((1, 1)), 'score')) == '7'
+   assert cache.get(OcrCache.key(mask((2, 2)), 'score')) is None
+
+def test_keys_apart_configs_and_shapes():
+   assert OcrCache.key(mask((1, 1)), 'score') != OcrCache.key(mask((1, 1)), 'timer')
+   assert OcrCache.key(np.full((4, 16), PAPER, np.uint8), 'score') != OcrCache.key(np.full((8, 8), PAPER, np.uint8), 'score')
+
+def test_evicts_the_least_recently_used_at_capacity():
+   cache = OcrCache(max_entries=2)
+   first, second, third = (OcrCache.key(mask((i, 0)), 'score') for i in range(3))
+   cache.put(first, '1')
+   cache.put(second, '2')
+   cache.get(first)
+   cache.put(third, '3')
+   assert second not in cache
+   assert first in cache and third in cache
+   assert len(cache.entries) == 2
+
+def test_stats():
+   cache = OcrCache()
+   key = OcrCache.key(mask((1, 1)), 'score')
+   cache.get(key)
+   cache.put(key, '7')
+   cache.get(key)
+   cache.get(key)
+   assert cache.stats() == {'entries': 1, 'hits': 2, 'misses': 1, 'hit_rate': 2/3}
@@ -0,0 +1,24 @@
+from presences.ingame.capture_worker import TimedResult
+from presences.ingame.reading_filter import ReadingFilter
+
+no_timer = (None, None, None)
+
+def reading(captured_at, scores, state, timer=no_timer):
+   return TimedResult(captured_at, 0.1, (scores, timer, state), timer != no_timer)
+
+def test_holds_an_implausible_state_between_close_readings():
+   reading_filter = ReadingFilter()
+   reading_filter.update(reading(0, (3, 2), 'spike planted'))
+   filtered = reading_filter.update(reading(5, (3, 2), 'buy phase'))
+   assert filtered.results[2] == 'spike planted'
+   assert not filtered.stable
+
+def test_accepts_a_skipped_phase_over_a_scheduler_gap():
+   # the reader waited out Discord's rate limit window: the spike went off,
+   # the round ended and the next buy phase started between two readings
+   reading_filter = ReadingFilter()
+   reading_filter.update(reading(0, (3, 2), 'spike planted'))
+   filtered = reading_filter.update(reading(14, (3, 3), 'buy phase', (0, 28, 0)))
+   assert filtered.results == ((3, 3), (0, 28, 0), 'buy phase')
+   assert filtered.stable
+   assert filtered.corrected == ()
@@ -0,0 +1,95 @@
+import types
+
+import pytest
+
+from riot_client import response_cache
+from riot_client.resources import cache_ttls
+from riot_client.response_cache import ResponseCache
+
+policies = [
+    ("pd", "/mmr/v1/players/*/competitiveupdates", 30, True),
+    ("pd", "/mmr/v1/players/", 300, True),
+    ("shared", "/content-service/", 3600, False),
+]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(response_cache, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def put(cache, endpoint_type, endpoint, data):
+    cache.put(endpoint_type, f"https://host{endpoint}", endpoint, data)
+
+
+def get(cache, endpoint_type, endpoint):
+    return cache.get(endpoint_type, f"https://host{endpoint}", endpoint)
+
+
+def test_responses_expire_after_their_ttl(clock):
+    cache = ResponseCache(policies)
+    put(cache, "pd", "/mmr/v1/players/me", {"rank": 1})
+    clock.now += 299
+    assert get(cache, "pd", "/mmr/v1/players/me") == {"rank": 1}
+    clock.now += 2
+    assert get(cache, "pd", "/mmr/v1/players/me") is None
+    assert len(cache) == 0
+    assert cache.stats()["pd /mmr/v1/players/"]["evicted"] == 1
+
+
+def test_competitive_updates_have_their_own_ttl(clock):
+    cache = ResponseCache(cache_ttls)
+    endpoint = "/mmr/v1/players/me/competitiveupdates?startIndex=0&endIndex=15&queue=competitive"
+    assert cache.policy("pd", endpoint)[2] < cache.policy("pd", "/mmr/v1/players/me")[2]
+    put(cache, "pd", endpoint, {"Matches": []})
+    clock.now += 60
+    assert get(cache, "pd", endpoint) is None
+
+
+def test_put_drops_expired_responses(clock):
+    cache = ResponseCache(policies)
+    put(cache, "pd", "/mmr/v1/players/a", {})
+    clock.now += 301
+    put(cache, "shared", "/content-service/v3/content", {})
+    assert len(cache) == 1
+
+
+def test_least_recently_used_goes_past_max_entries(clock):
+    cache = ResponseCache(policies, max_entries=2)
+    put(cache, "pd", "/mmr/v1/players/a", {"a": 1})
+    put(cache, "pd", "/mmr/v1/players/b", {"b": 1})
+    assert get(cache, "pd", "/mmr/v1/players/a") == {"a": 1}
+    put(cache, "pd", "/mmr/v1/players/c", {"c": 1})
+    assert get(cache, "pd", "/mmr/v1/players/b") is None
+    assert get(cache, "pd", "/mmr/v1/players/a") == {"a": 1}
+    assert get(cache, "pd", "/mmr/v1/players/c") == {"c": 1}
+
+
+def test_invalidate_by_prefix(clock):
+    cache = ResponseCache(policies)
+    put(cache, "pd", "/mmr/v1/players/a", {})
+    put(cache, "pd", "/mmr/v1/players/a/competitiveupdates?startIndex=0", {})
+    put(cache, "shared", "/content-service/v3/content", {})
+    assert cache.invalidate(prefix="/mmr/v1/players/") == 1
+    assert get(cache, "pd", "/mmr/v1/players/a") is None
+    assert get(cache, "pd", "/mmr/v1/players/a/competitiveupdates?startIndex=0") == {}
+    assert cache.invalidate(per_phase=True) == 1
+    assert get(cache, "shared", "/content-service/v3/content") == {}
+    assert cache.stats()["pd /mmr/v1/players/"]["invalidated"] == 1
+
+
+def test_counts_hits_and_misses(clock):
+    cache = ResponseCache(policies)
+    assert get(cache, "pd", "/mmr/v1/players/a") is None
+    put(cache, "pd", "/mmr/v1/players/a", {"a": 1})
+    hit = get(cache, "pd", "/mmr/v1/players/a")
+    hit["a"] = 2
+    assert get(cache, "pd", "/mmr/v1/players/a") == {"a": 1}
+    # endpoints without a policy are neither cached nor counted
+    put(cache, "pd", "/match-history/v1/history/a", {})
+    assert get(cache, "pd", "/match-history/v1/history/a") is None
+    stats = cache.stats()["pd /mmr/v1/players/"]
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_rate"] == pytest.approx(2/3)
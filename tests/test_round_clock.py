@@ -0,0 +1,55 @@
+import time
+
+from presences.ingame.round_clock import RoundClock
+
+def test_counts_down_between_timer_reads():
+   round_clock = RoundClock()
+   assert round_clock.observe(100, 'buy phase', 0, 30) == 30
+   assert round_clock.observe(110, 'buy phase', 0, None) == 20
+   assert round_clock.deadline_at() == 130
+
+def test_resyncs_on_a_phase_change():
+   round_clock = RoundClock()
+   round_clock.observe(100, 'buy phase', 0, 30)
+   # the buy phase ended, the old deadline says nothing about the round
+   assert round_clock.observe(131, 'in progress', 0, None) is None
+   assert round_clock.deadline_at() is None
+   assert round_clock.needs_timer()
+   assert round_clock.observe(132, 'in progress', 0, 99) == 99
+   assert round_clock.deadline_at() == 231
+
+def test_resyncs_on_a_round_change():
+   round_clock = RoundClock()
+   round_clock.observe(100, 'in progress', 3, 50)
+   assert round_clock.observe(101, 'in progress', 4, None) is None
+   assert round_clock.observe(102, 'in progress', 4, 98) == 98
+
+def test_keeps_the_deadline_within_max_drift():
+   round_clock = RoundClock(max_drift=1.5)
+   round_clock.observe(100, 'in progress', 1, 100)
+   # read as 91 where the clock has 90, close enough
+   assert round_clock.observe(110, 'in progress', 1, 91) == 90
+   assert round_clock.deadline_at() == 200
+   assert round_clock.resyncs == 1
+
+def test_resyncs_past_max_drift():
+   round_clock = RoundClock(max_drift=1.5)
+   round_clock.observe(100, 'in progress', 1, 100)
+   assert round_clock.observe(120, 'in progress', 1, 75) == 75
+   assert round_clock.deadline_at() == 195
+   assert round_clock.resyncs == 2
+
+def test_needs_the_timer_again_after_verify_interval():
+   round_clock = RoundClock(verify_interval=15)
+   now = time.time()
+   round_clock.observe(now - 20, 'in progress', 1, 90)
+   assert round_clock.needs_timer()
+   round_clock.observe(now, 'in progress', 1, 70)
+   assert not round_clock.needs_timer()
+
+def test_no_top_bar_forgets_the_phase():
+   round_clock = RoundClock()
+   round_clock.observe(100, 'buy phase', 0, 30)
+   assert round_clock.observe(101, None, None, None) is None
+   assert round_clock.deadline_at() is None
+   assert round_clock.state is None
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+import subprocess
+
+import pytest
+
+from presences.ingame.capture_worker import TimedResult, capture_cpu_time
+from presences.ingame.round_clock import RoundClock
+from presences.ingame.scheduler import CaptureScheduler, phase_intervals
+
+def reading(state):
+   return TimedResult(0, 0.1, ((0, 0), (None, None, None), state), False)
+
+def test_cpu_budget_stretches_the_delay():
+   scheduler = CaptureScheduler(cpu_budget=0.05, max_interval=60)
+   scheduler.record(0.5)
+   # 0.5s a frame at 5% of a core is one frame every 10s
+   assert scheduler.next_delay(reading('buy phase')) == pytest.approx(10)
+   assert scheduler.last_reason == 'cpu budget'
+
+def test_cpu_budget_is_capped_by_max_interval():
+   scheduler = CaptureScheduler(cpu_budget=0.05, max_interval=15)
+   scheduler.record(2)
+   assert scheduler.next_delay(reading('buy phase')) == 15
+
+def test_cheap_frames_keep_the_phase_pace():
+   scheduler = CaptureScheduler(cpu_budget=0.05)
+   scheduler.record(0.01)
+   assert scheduler.next_delay(reading('buy phase')) == phase_intervals['buy phase']
+   assert scheduler.last_reason == 'phase'
+
+@pytest.mark.skipif(os.name == 'nt', reason="os.times() has no children's time on Windows")
+def test_capture_cpu_time_counts_finished_subprocesses():
+   started = capture_cpu_time()
+   subprocess.run([sys.executable, '-c', 'sum(range(20_000_000))'], check=True)
+   assert capture_cpu_time() - started > 0.1
+
+def test_bursts_while_the_phase_is_about_to_end():
+   round_clock = RoundClock()
+   round_clock.observe(time.time(), 'buy phase', 0, 2)
+   scheduler = CaptureScheduler(round_clock)
+   assert scheduler.next_delay(reading('buy phase')) == 0.5
+   assert scheduler.last_reason == 'burst'
+
+def test_wakes_up_in_time_for_the_burst():
+   round_clock = RoundClock()
+   round_clock.observe(time.time(), 'in progress', 1, 4.5)
+   scheduler = CaptureScheduler(round_clock)
+   # the phase pace is 5s, the burst starts 3s before the deadline
+   assert scheduler.next_delay(reading('in progress')) == pytest.approx(1.5, abs=0.1)
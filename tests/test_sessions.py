@@ -0,0 +1,67 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from riot_client import sessions
+from riot_client.sessions import SessionPool
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"ok": 1}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_keep_alive_reuses_one_connection(url):
+    pool = SessionPool()
+    for _ in range(5):
+        assert pool.request("pd", "GET", url).json() == {"ok": 1}
+    assert pool.stats()["pd"] == {"requests": 5, "connections": 1, "reused": 4, "reuse_rate": 0.8}
+    pool.close()
+
+
+def test_without_keep_alive_every_request_connects(url):
+    pool = SessionPool(keep_alive=False)
+    for _ in range(3):
+        pool.request("glz", "GET", url)
+    assert pool.stats()["glz"] == {"requests": 3, "connections": 3, "reused": 0, "reuse_rate": 0.0}
+    pool.close()
+
+
+def test_sessions_count_apart(url):
+    pool = SessionPool()
+    pool.request("pd", "GET", url)
+    pool.request("glz", "GET", url)
+    pool.request("glz", "GET", url)
+    stats = pool.stats()
+    assert stats["pd"]["connections"] == 1 and stats["glz"]["connections"] == 1
+    assert stats["glz"]["reused"] == 1
+    pool.close()
+
+
+def test_pools_are_the_module_classes(url):
+    pool = SessionPool()
+    pool.request("pd", "GET", url)
+    adapter = pool.session("pd").get_adapter(url)
+    pools = [adapter.poolmanager.pools[key] for key in adapter.poolmanager.pools.keys()]
+    assert [type(p) for p in pools] == [sessions._CountingHTTPConnectionPool]
+    pool.close()
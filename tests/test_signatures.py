@@ -0,0 +1,73 @@
+import os
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from presences.ingame.frame import Frame
+from presences.ingame.pixel_list import (buy_phase_bwpixel_list, match_point_bwpixel_list,
+                                         match_point_ot_pixel_list, round_lost_bwpixel_list,
+                                         round_won_bwpixel_list, clutch_pixel_list,
+                                         ot_pixel_list, endgame_pixel_list)
+from presences.ingame.reader_util import TopBarReader, state_signatures
+
+captures_path = os.path.join(os.path.dirname(__file__), '..', 'captures')
+with open(os.path.join(captures_path, 'labels.json')) as f:
+   labels = json.load(f)
+
+# the sequential checks get_match_status made before PixelSignatures, as the oracle
+def check_bwpixel_list(mask: np.ndarray, bwpixel_list: list) -> bool:
+   height, width = mask.shape
+   for pixel_check in bwpixel_list:
+      pos = (
+         round(pixel_check[0][0] * width),
+         round(pixel_check[0][1] * height)
+      )
+      if mask[pos[1], pos[0]] != pixel_check[1]:
+         return False
+   return True
+
+def loop_state(mask: np.ndarray):
+   if check_bwpixel_list(mask, buy_phase_bwpixel_list):
+      return 'buy phase'
+   elif check_bwpixel_list(mask, match_point_bwpixel_list) or check_bwpixel_list(mask, match_point_ot_pixel_list):
+      return 'match point'
+   elif check_bwpixel_list(mask, round_won_bwpixel_list):
+      return 'round won'
+   elif check_bwpixel_list(mask, round_lost_bwpixel_list):
+      return 'round lost'
+   elif check_bwpixel_list(mask, clutch_pixel_list):
+      return 'clutch'
+   elif check_bwpixel_list(mask, ot_pixel_list):
+      return 'overtime'
+   elif check_bwpixel_list(mask, endgame_pixel_list):
+      return 'endgame'
+   return None
+
+@pytest.fixture(scope='module')
+def state_masks():
+   reader = TopBarReader(False, False, 'tesseract', glyph_atlas_path=None)
+   masks = {}
+   for name in labels:
+      frame = Frame(Image.open(os.path.join(captures_path, name)).convert('RGB'))
+      masks[name] = reader.hud_masks(frame, ('state',))['state'].copy()
+   return masks
+
+@pytest.mark.parametrize('name', sorted(labels))
+def test_same_state_as_the_sequential_checks(state_masks, name):
+   mask = state_masks[name]
+   assert state_signatures.classify(mask)[0] == loop_state(mask)
+
+@pytest.mark.parametrize('name', sorted(labels))
+def test_same_state_with_probes_flipped(state_masks, name):
+   # flipping a few probed pixels takes the frames through near misses and
+   # other states' lists
+   rng = np.random.default_rng(sorted(labels).index(name))
+   mask = state_masks[name]
+   probes = state_signatures.compile(mask.shape)
+   for _ in range(50):
+      flipped = mask.copy()
+      picked = rng.choice(probes, size=rng.integers(1, 4), replace=False)
+      flipped.flat[picked] = 255 - flipped.flat[picked]
+      assert state_signatures.classify(flipped)[0] == loop_state(flipped)
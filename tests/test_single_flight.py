@@ -0,0 +1,129 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from riot_client.single_flight import SingleFlight, AsyncSingleFlight
+
+callers = 8
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "callers never joined the call in flight"
+        time.sleep(0.001)
+
+
+def run_together(flight, fn):
+    '''Results (or exceptions) of `callers` threads calling flight.do at once'''
+    def call(_):
+        try:
+            return flight.do("key", fn)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(callers) as executor:
+        return list(executor.map(call, range(callers)))
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    sent = []
+
+    def fn():
+        sent.append(1)
+        wait_for(lambda: flight.coalesced == callers - 1)
+        return {"players": [1, 2]}
+
+    results = run_together(flight, fn)
+    assert len(sent) == 1
+    assert results == [{"players": [1, 2]}]*callers
+    assert flight.stats() == {"calls": 1, "coalesced": callers - 1, "in_flight": 0}
+
+
+def test_every_caller_gets_its_own_copy():
+    flight = SingleFlight()
+
+    def fn():
+        wait_for(lambda: flight.coalesced == callers - 1)
+        return {"players": [1, 2]}
+
+    results = run_together(flight, fn)
+    results[0]["players"].append(3)
+    assert all(result == {"players": [1, 2]} for result in results[1:])
+    assert len({id(result) for result in results}) == callers
+
+
+def test_an_error_reaches_every_waiter_and_clears_the_key():
+    flight = SingleFlight()
+
+    def fn():
+        wait_for(lambda: flight.coalesced == callers - 1)
+        raise ValueError("rejected")
+
+    results = run_together(flight, fn)
+    assert all(isinstance(result, ValueError) for result in results)
+    # the next call runs again instead of getting the old error
+    assert flight.do("key", lambda: "ok") == "ok"
+    assert flight.stats()["calls"] == 2
+
+
+async def run_together_async(flight, fn):
+    return await asyncio.gather(*[flight.do("key", fn) for _ in range(callers)], return_exceptions=True)
+
+
+def test_async_concurrent_callers_share_one_call():
+    flight = AsyncSingleFlight()
+    sent = []
+
+    async def fn():
+        sent.append(1)
+        await asyncio.sleep(0.01)
+        return {"players": [1, 2]}
+
+    results = asyncio.run(run_together_async(flight, fn))
+    assert len(sent) == 1
+    assert results == [{"players": [1, 2]}]*callers
+    assert flight.stats() == {"calls": 1, "coalesced": callers - 1, "in_flight": 0}
+    results[0]["players"].append(3)
+    assert all(result == {"players": [1, 2]} for result in results[1:])
+
+
+def test_async_error_reaches_every_waiter_and_clears_the_key():
+    flight = AsyncSingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise ValueError("rejected")
+
+    async def ok():
+        return "ok"
+
+    async def main():
+        results = await run_together_async(flight, fn)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert await flight.do("key", ok) == "ok"
+
+    asyncio.run(main())
+    assert flight.stats()["calls"] == 2
+
+
+def test_async_cancelled_caller_leaves_the_call_to_the_others():
+    flight = AsyncSingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("key", fn))
+        second = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from riot_client import Client, version
+from riot_client.exceptions import ResponseError
+from riot_client.version import VersionProvider
+
+running = "release-08.09-shipping-10-2521387"
+cached = "release-08.08-shipping-15-2494112"
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    def get(*args, **kwargs):
+        raise AssertionError("valorant-api.com was asked")
+    monkeypatch.setattr(version.requests, "get", get)
+
+
+def write_log(path, version_string):
+    path.write_text(
+        "[2024.05.01-10.00.00:000][  0]LogInit: Build: ++Ares-Core+release-08.09\n"
+        f"[2024.05.01-10.00.00:001][  0]LogShooter: Display: CI server version: {version_string}\n"
+        "[2024.05.01-10.00.00:002][  0]LogInit: Engine is initialized.\n"
+    )
+
+
+def test_reads_the_version_from_the_log(tmp_path):
+    log = tmp_path / "ShooterGame.log"
+    write_log(log, running)
+    provider = VersionProvider(cache_path=str(tmp_path / "version.json"), log_path=str(log))
+    assert provider.get() == running
+    saved = json.loads((tmp_path / "version.json").read_text())
+    assert (saved["version"], saved["build"], saved["source"]) == (running, "10-2521387", "log")
+
+
+def test_falls_back_to_the_cache_without_a_log(tmp_path):
+    (tmp_path / "version.json").write_text(json.dumps(
+        {"version": cached, "build": "15-2494112", "source": "log", "checked_at": 0}))
+    provider = VersionProvider(cache_path=str(tmp_path / "version.json"), log_path=str(tmp_path / "missing.log"), max_age=float("inf"))
+    assert provider.get() == cached
+    # the log it was read from is gone, so it is only a cached version now
+    assert provider._entry["source"] == "cache"
+
+
+def test_log_takes_over_from_the_cache(tmp_path):
+    (tmp_path / "version.json").write_text(json.dumps(
+        {"version": cached, "build": "15-2494112", "source": "cache", "checked_at": 0}))
+    log = tmp_path / "ShooterGame.log"
+    write_log(log, running)
+    provider = VersionProvider(cache_path=str(tmp_path / "version.json"), log_path=str(log))
+    assert provider.get() == running
+
+
+def test_refreshes_from_the_api_with_neither(monkeypatch, tmp_path):
+    class Response:
+        def json(self):
+            return {"data": {"branch": "release-08.09", "buildVersion": "10", "version": "08.09.00.2521387"}}
+    monkeypatch.setattr(version.requests, "get", lambda *args, **kwargs: Response())
+    provider = VersionProvider(cache_path=str(tmp_path / "version.json"), log_path=str(tmp_path / "missing.log"))
+    assert provider.get() == running
+    assert json.loads((tmp_path / "version.json").read_text())["source"] == "valorant-api"
+
+
+class RecordingProvider:
+    def __init__(self):
+        self.forced = []
+
+    def get(self, force=False):
+        self.forced.append(force)
+        return running if force else cached
+
+
+class Auth:
+    def authenticate(self):
+        return "player", {"Authorization": "Bearer token"}, None
+
+
+def serve(replies):
+    '''Local pd endpoint answering with replies in order, and the headers it was sent'''
+    sent = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            sent.append(dict(self.headers))
+            body = json.dumps(replies[min(len(sent), len(replies)) - 1]).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, sent
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path))
+    client = Client(cache=False, version_provider=RecordingProvider())
+    client.auth = Auth()
+    client.activate()
+    client.headers = client._client_headers(client.headers, client.version_provider.get())
+    yield client
+    client.close()
+
+
+def test_a_rejected_request_is_retried_once_with_a_fresh_version(client):
+    server, sent = serve([{"httpStatus": 400}, {"ok": 1}])
+    client.base_url = f"http://127.0.0.1:{server.server_port}"
+    assert client.fetch("/x", "pd") == {"ok": 1}
+    server.shutdown()
+    server.server_close()
+    assert client.version_provider.forced == [False, True]
+    assert [headers["X-Riot-ClientVersion"] for headers in sent] == [cached, running]
+
+
+def test_a_second_rejection_is_raised(client):
+    server, sent = serve([{"httpStatus": 400}])
+    client.base_url = f"http://127.0.0.1:{server.server_port}"
+    with pytest.raises(ResponseError):
+        client.fetch("/x", "pd")
+    server.shutdown()
+    server.server_close()
+    assert len(sent) == 2
+    assert client.version_provider.forced == [False, True]
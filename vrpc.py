@@ -5,20 +5,23 @@ import os
 import time
 import sys
 import psutil
+import multiprocessing
 from threading import Thread
 import traceback
 import logging
 from pathlib import Path
 
-import nest_asyncio
-
 from versioning import VersioningHandler
 from sys_tray import SystemTrayApp
 from assets.assets_manager import AssetsManager
 from disc_presence import Presence
 from presences.ingame.reader_util import ScreenReader, TopBarReader
+from presences.ingame.profiling import profiler_from_env
+from presences.ingame.ocr_executor import executor_from_env
 from riot_client import Client as RiotClient
 from riot_client import resources as riot_client_resources
+from riot_client.async_client import AsyncClient as AsyncRiotClient
+from riot_client.version import VersionProvider
 from presences.websocket_listener import WebsocketListener
 
 
@@ -32,10 +35,15 @@ class VRPCClient:
       else:
          # On Linux, assume tesseract is installed system-wide
          tesseract_path = '/usr/bin/tesseract'
-      self.score_reader = TopBarReader(False, False, tesseract_path)
-      self.screen_reader = ScreenReader(self.score_reader)
+      self.score_reader = TopBarReader(
+         False, False, tesseract_path,
+         batch_ocr=os.getenv('VALORPC_OCR_BATCH', '0') == '1',
+         ocr_executor=executor_from_env(tesseract_path)
+      )
+      self.score_reader.profiler = profiler_from_env(os.path.join(self.appdata_path, 'logs', 'stage_profile.json'))
+      self.screen_reader = ScreenReader(self.score_reader, calibration_path=os.path.join(self.appdata_path, 'calibration'))
 
-      self.riot_client = RiotClient()
+      self.riot_client = RiotClient(version_provider=VersionProvider(cache_path=os.path.join(self.appdata_path, 'client_version.json')))
       self.riot_client.activate()
       self.riot_client.region = self.get_region()
       self.riot_client.shard = self.get_region()
@@ -44,6 +52,8 @@ class VRPCClient:
       if self.riot_client.shard in riot_client_resources.shard_region_override.keys():
          self.riot_client.region = riot_client_resources.shard_region_override[self.riot_client.shard]
       self.riot_client.base_url, self.riot_client.base_url_glz, self.riot_client.base_url_shared = self.riot_client._build_urls()
+      # same auth and region, for calls made from the websocket listener's event loop
+      self.async_riot_client = AsyncRiotClient.from_client(self.riot_client)
 
       self.assets_manager = AssetsManager(self.appdata_path)
       self.assets_manager.bulk_download_all_assets()
@@ -57,7 +67,11 @@ class VRPCClient:
       return regex.search('"-ares-deployment=(.*)", "-config-endpoint', val_proc_info).group(1)
 
    def loop(self) -> None:
-      asyncio.run(self.websocket.start_loop())
+      try:
+         asyncio.run(self.websocket.start_loop())
+      finally:
+         # OCR workers and their shared memory, capture handles
+         self.screen_reader.close()
 
 class VRPCMaster:
    def __init__(self) -> None:
@@ -98,10 +112,9 @@ class VRPCMaster:
       self.main_thread.start()
 
    def loop(self) -> None:
+      # pypresence's loop; the presences send their updates from worker
+      # threads, so it is never run inside the websocket listener's loop
       asyncio.set_event_loop(self.asyncio_loop)
-      # # required for stupid pypresence to work inside an already existing asyncio
-      # # loop. :(
-      nest_asyncio.apply(self.asyncio_loop)
       
       # Check if --always-show flag is set
       always_show = '--always-show' in sys.argv
@@ -294,6 +307,9 @@ class VRPCMaster:
       exit(0)
 
 if __name__ == '__main__':
+   # OCR worker processes are spawned, frozen builds need this to start them
+   multiprocessing.freeze_support()
+
    # Simple mutex using file lock for cross-platform compatibility
    import fcntl
    import tempfile